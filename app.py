@@ -2,19 +2,17 @@ import streamlit as st
 import numpy as np
 import cv2
 import time
-import tempfile
-from PIL import Image
 import io
 import os
 from datetime import datetime
-import torch
 
-# Add torch import for YOLOv8
-try:
-    from ultralytics import YOLO
-except ImportError:
-    st.error("Please install ultralytics: pip install ultralytics")
-    st.stop()
+from model_backends import BACKENDS, load_detector
+from stride_controller import AdaptiveStride
+from foreground import ForegroundCropper, offset_detections
+from frame_sampler import FrameSampler, plan_frames
+
+# Inference backend: "pytorch" or "onnx" (ONNX falls back to PyTorch if it cannot be loaded)
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "pytorch")
 
 # Set page configuration
 st.set_page_config(
@@ -230,13 +228,17 @@ if 'page' not in st.session_state:
     st.session_state.page = 'image'
 
 
-# Load the PyTorch model
+# Load the model (PyTorch or ONNX Runtime backend)
 @st.cache_resource
-def load_model(model_path=r"E:\ML\Weapon Detection System\best.pt"):
+def load_model(model_path=r"E:\ML\Weapon Detection System\best.pt", backend=MODEL_BACKEND):
     try:
-        # Load YOLOv8 model using ultralytics
-        model = YOLO(model_path)
+        # Load YOLOv8 model, falling back to PyTorch if the ONNX backend fails
+        # (torch and ultralytics are only imported here, the first time a model is needed)
+        model, _ = load_detector(model_path, backend)
         return model
+    except ImportError:
+        st.error("Please install ultralytics: pip install ultralytics")
+        st.stop()
     except Exception as e:
         st.error(f"Failed to load model: {e}")
         return None
@@ -256,6 +258,25 @@ def resize_image_to_square(img, target_size=(640, 640)):
     return resized_img
 
 
+# Empty detection array: float32 [N, 6] rows of x1, y1, x2, y2, score, class_id
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+# Extract detections from a single YOLOv8 result with one device-to-host copy
+def extract_detections(result):
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return EMPTY_DETECTIONS
+
+    # boxes.data is [N, 6] (or [N, 7] with a track id before score and class)
+    data = boxes.data
+    data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+    detections = np.empty((len(data), 6), dtype=np.float32)
+    detections[:, :4] = data[:, :4]
+    detections[:, 4:] = data[:, -2:]
+    return detections
+
+
 # Modified detect_weapons function for PyTorch model
 def detect_weapons(model, img, conf_threshold=0.25, input_size=(640, 640)):
     # Track time
@@ -268,33 +289,59 @@ def detect_weapons(model, img, conf_threshold=0.25, input_size=(640, 640)):
         # Run inference with YOLOv8
         results = model(resized_img, conf=conf_threshold)
 
-        # Process results
-        detections = []
-
         # Extract detection results
-        for result in results:
-            boxes = result.boxes
+        detections = [extract_detections(result) for result in results]
+        detections = np.concatenate(detections) if detections else EMPTY_DETECTIONS
 
-            # Process each detection
-            for i, box in enumerate(boxes):
-                # Get box coordinates (in xyxy format)
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+        proc_time = time.time() - start_time
+        return detections, proc_time
+
+    except Exception as e:
+        st.error(f"Inference error: {e}")
+        return EMPTY_DETECTIONS, time.time() - start_time
 
-                # Get confidence
-                conf = float(box.conf[0].cpu().numpy())
 
-                # Get class ID
-                cls_id = int(box.cls[0].cpu().numpy())
+# Detect only on native-resolution crops of the moving regions, with boxes scaled to the 640x640 view
+def detect_weapons_foreground(model, img, cropper, conf_threshold=0.25, view_size=(640, 640)):
+    start_time = time.time()
+    crops, offsets = cropper.crops(img)
+    if not crops:
+        return EMPTY_DETECTIONS, time.time() - start_time
 
-                # Format: [x1, y1, x2, y2, score, class_id]
-                detections.append([int(x1), int(y1), int(x2), int(y2), conf, cls_id])
+    try:
+        # All crops go through the model as one batch
+        results = model(crops, conf=conf_threshold)
+        detections = offset_detections([extract_detections(result) for result in results], offsets)
 
-        proc_time = time.time() - start_time
-        return detections, proc_time
+        h, w = img.shape[:2]
+        detections[:, [0, 2]] *= view_size[0] / w
+        detections[:, [1, 3]] *= view_size[1] / h
+        return detections, time.time() - start_time
 
     except Exception as e:
         st.error(f"Inference error: {e}")
-        return [], time.time() - start_time
+        return EMPTY_DETECTIONS, time.time() - start_time
+
+
+# Class ids that count as weapons for this model
+def weapon_class_ids(model=None):
+    try:
+        class_names = model.names
+        # Look for weapon-related classes
+        weapon_classes = [cls_id for cls_id, name in class_names.items()
+                          if 'weapon' in name.lower() or 'gun' in name.lower()
+                          or 'pistol' in name.lower() or 'rifle' in name.lower()
+                          or 'knife' in name.lower()]
+    except:
+        weapon_classes = []
+
+    # If no weapon class found, assume class 0 is weapon (common in custom models)
+    return weapon_classes if weapon_classes else [0]
+
+
+# Count weapon detections in a detection array
+def count_weapons(detections, model=None):
+    return int(np.count_nonzero(np.isin(detections[:, 5], weapon_class_ids(model))))
 
 
 # Draw bounding boxes on image
@@ -335,9 +382,12 @@ def draw_detections(img, detections, model=None):
         # Default class_names if we can't get them from the model
         class_names = {0: 'weapon', 1: 'background'}
 
-    for box in detections:
-        x1, y1, x2, y2, score, class_id = box
+    # Convert coordinates and classes once for the whole array
+    boxes = detections[:, :4].astype(np.int32).tolist()
+    scores = detections[:, 4].tolist()
+    class_ids = detections[:, 5].astype(np.int32).tolist()
 
+    for (x1, y1, x2, y2), score, class_id in zip(boxes, scores, class_ids):
         # Make sure class_id is within range of class_names
         if isinstance(class_names, dict) and class_id in class_names:
             label = f"{class_names[class_id]} {score:.2f}"
@@ -369,31 +419,8 @@ def draw_detections(img, detections, model=None):
 def save_detection(img, detections, source_type, model=None):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    # Get class names if model is provided
-    class_names = None
-    if model is not None:
-        try:
-            class_names = model.names
-        except:
-            class_names = None
-
     # Determine what to count as weapons based on available classes
-    weapon_count = 0
-    if class_names is not None:
-        # Look for weapon-related classes
-        weapon_classes = [cls_id for cls_id, name in class_names.items()
-                          if 'weapon' in name.lower() or 'gun' in name.lower()
-                          or 'pistol' in name.lower() or 'rifle' in name.lower()
-                          or 'knife' in name.lower()]
-
-        if weapon_classes:
-            weapon_count = sum(1 for det in detections if det[5] in weapon_classes)
-        else:
-            # If no weapon class found, assume class 0 is weapon (common in custom models)
-            weapon_count = sum(1 for det in detections if det[5] == 0)
-    else:
-        # Default: assume class 0 is weapon
-        weapon_count = sum(1 for det in detections if det[5] == 0)
+    weapon_count = count_weapons(detections, model)
 
     # Record only if weapons are detected
     if weapon_count > 0:
@@ -499,23 +526,7 @@ def image_detection_page():
                     save_detection(image, detections, "Image Upload", model)
 
             # Display results - determine what counts as a weapon
-            weapon_count = 0
-            try:
-                class_names = model.names
-                # Look for weapon-related classes
-                weapon_classes = [cls_id for cls_id, name in class_names.items()
-                                  if 'weapon' in name.lower() or 'gun' in name.lower()
-                                  or 'pistol' in name.lower() or 'rifle' in name.lower()
-                                  or 'knife' in name.lower()]
-
-                if weapon_classes:
-                    weapon_count = sum(1 for det in detections if det[5] in weapon_classes)
-                else:
-                    # If no weapon class found, assume class 0 is weapon (common in custom models)
-                    weapon_count = sum(1 for det in detections if det[5] == 0)
-            except:
-                # Default: assume class 0 is weapon
-                weapon_count = sum(1 for det in detections if det[5] == 0)
+            weapon_count = count_weapons(detections, model)
 
             if weapon_count > 0:
                 st.markdown(
@@ -537,7 +548,7 @@ def image_detection_page():
             if len(detections) > 0:
                 st.markdown("### Detection Details:")
                 for i, det in enumerate(detections):
-                    x1, y1, x2, y2, score, cls_id = det
+                    score, cls_id = float(det[4]), int(det[5])
                     try:
                         class_name = model.names[cls_id]
                     except:
@@ -599,6 +610,19 @@ def video_detection_page():
         # Detection parameters
         conf_threshold = st.slider("Confidence threshold", min_value=0.1, max_value=0.9, value=0.25, step=0.05)
         frame_skip = st.slider("Process every N frames", min_value=1, max_value=10, value=2)
+        sample_fps = st.slider("Or analyse frames per second of video (0 = every N frames)",
+                               min_value=0, max_value=30, value=0,
+                               help="Samples by video time, so the result does not depend on the video's frame rate")
+
+        # Adaptive mode adjusts N from the measured processing time
+        adaptive_skip = st.checkbox("Adaptive frame skip", value=False,
+                                    help="Pick N on the fly to keep up with the target throughput")
+        target_rtf, target_fps = None, None
+        if adaptive_skip:
+            target_rtf = st.slider("Target real-time factor", min_value=0.25, max_value=2.0, value=1.0, step=0.25,
+                                   help="Seconds of video analysed per second of processing")
+            target_fps = st.slider("Analysed frames per second of video (0 = no limit)",
+                                   min_value=0, max_value=30, value=0)
 
         # Start detection button
         start_detection = st.button("Start Detection")
@@ -615,6 +639,7 @@ def video_detection_page():
                 'frames_processed': 0,
                 'weapons_detected': 0,
                 'current_fps': 0,
+                'stride': 0,
             }
 
         st.markdown('<div class="detection-card">', unsafe_allow_html=True)
@@ -625,6 +650,8 @@ def video_detection_page():
         with stats_cols[0]:
             st.metric("Frames Processed", st.session_state.video_stats['frames_processed'])
             st.metric("Processing FPS", f"{st.session_state.video_stats['current_fps']:.1f}")
+            if st.session_state.video_stats.get('stride'):
+                st.metric("Frame Skip", st.session_state.video_stats['stride'])
 
         with stats_cols[1]:
             st.metric("Weapons Detected", st.session_state.video_stats['weapons_detected'])
@@ -648,6 +675,7 @@ def video_detection_page():
                 'frames_processed': 0,
                 'weapons_detected': 0,
                 'current_fps': 0,
+                'stride': 0,
             }
             st.session_state.run_detection = True
 
@@ -668,6 +696,8 @@ def video_detection_page():
             else:
                 # Save uploaded video to temporary file with improved handling
                 try:
+                    import tempfile
+
                     tfile = tempfile.NamedTemporaryFile(delete=False)
                     tfile_name = tfile.name  # Store the name for later cleanup
                     tfile.write(uploaded_file.read())
@@ -688,17 +718,27 @@ def video_detection_page():
             height = int(video_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             fps = video_cap.get(cv2.CAP_PROP_FPS)
 
-            frame_count = 0
+            # The stride controller starts from the slider value and adapts from there
+            controller = None
+            if adaptive_skip:
+                controller = AdaptiveStride(fps, target_rtf, target_fps or None, initial_stride=frame_skip)
 
-            # Process frames until video ends or stop is requested
-            while video_cap.isOpened() and st.session_state.run_detection:
-                ret, frame = video_cap.read()
+            # Frames to analyse are planned from the frame rate; adaptive mode moves the stride as it goes.
+            # Frames in between are only grabbed, never fully decoded
+            plan = None
+            if controller is None:
+                plan = plan_frames(int(video_cap.get(cv2.CAP_PROP_FRAME_COUNT)), fps, sample_fps or None, frame_skip)
+            sampler = FrameSampler(video_cap, plan, stride=frame_skip)
 
-                if not ret:
+            # Process frames until video ends or stop is requested
+            for frame_count, frame in sampler:
+                if not st.session_state.run_detection:
                     break
+                if controller is not None:
+                    controller.observe_read(sampler.last_read_time)
 
-                # Process every N frames
-                if frame_count % frame_skip == 0:
+                # Process the sampled frames
+                if frame is not None:
                     start_time = time.time()
 
                     # Convert from BGR to RGB
@@ -711,23 +751,7 @@ def video_detection_page():
                     detections, proc_time = detect_weapons(model, rgb_frame, conf_threshold)
 
                     # Determine what counts as weapons
-                    weapon_count = 0
-                    try:
-                        class_names = model.names
-                        # Look for weapon-related classes
-                        weapon_classes = [cls_id for cls_id, name in class_names.items()
-                                          if 'weapon' in name.lower() or 'gun' in name.lower()
-                                          or 'pistol' in name.lower() or 'rifle' in name.lower()
-                                          or 'knife' in name.lower()]
-
-                        if weapon_classes:
-                            weapon_count = sum(1 for det in detections if det[5] in weapon_classes)
-                        else:
-                            # If no weapon class found, assume class 0 is weapon (common in custom models)
-                            weapon_count = sum(1 for det in detections if det[5] == 0)
-                    except:
-                        # Default: assume class 0 is weapon
-                        weapon_count = sum(1 for det in detections if det[5] == 0)
+                    weapon_count = count_weapons(detections, model)
 
                     if weapon_count > 0:
                         st.session_state.video_stats['weapons_detected'] += weapon_count
@@ -748,8 +772,8 @@ def video_detection_page():
                         status_text = f"ALERT: {weapon_count} weapons detected!"
                         cv2.putText(result_img, status_text, (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
 
-                        # Save significant detections
-                        if frame_count % (5 * frame_skip) == 0:  # Save every 5 processed frames with weapons
+                        # Save significant detections (every 5 processed frames with weapons)
+                        if st.session_state.video_stats['frames_processed'] % 5 == 0:
                             save_detection(rgb_frame, detections, "Video", model)
 
                     # Update stats
@@ -759,7 +783,12 @@ def video_detection_page():
                     # Display the frame
                     video_placeholder.image(result_img, caption="Video Detection (640x640)", use_container_width=True)
 
-                frame_count += 1
+                    # Drawing and display also hold up the loop, so the controller sees the whole step
+                    if controller is not None:
+                        sampler.stride = controller.observe(time.time() - start_time, frame_count)
+                    next_index = sampler.next_index
+                    st.session_state.video_stats['stride'] = (next_index - frame_count if next_index is not None
+                                                              else sampler.stride)
 
             # Clean up
             video_cap.release()
@@ -776,6 +805,13 @@ def video_detection_page():
 
             st.success("Video processing complete!")
 
+            # Show how the adaptive frame skip evolved
+            if controller is not None and controller.history:
+                st.markdown("#### Frame skip over time")
+                st.line_chart({"frame": [h["frame"] for h in controller.history],
+                               "frame skip": [h["stride"] for h in controller.history]},
+                              x="frame", y="frame skip")
+
         else:
             st.info("Upload a video and click 'Start Detection' to begin")
 
@@ -806,6 +842,10 @@ def webcam_detection_page():
         # Detection settings
         conf_threshold = st.slider("Confidence threshold", min_value=0.1, max_value=0.9, value=0.25, step=0.05)
 
+        # Fixed cameras: only run the model where something moves
+        use_foreground = st.checkbox("Foreground cropping (fixed camera)", value=False,
+                                     help="Learn the background and detect only on moving regions")
+
         # Start/Stop camera
         start_cam = st.button("Start Camera")
         stop_cam = st.button("Stop Camera")
@@ -818,7 +858,7 @@ def webcam_detection_page():
 
         if 'screenshot_img' not in st.session_state:
             st.session_state.screenshot_img = None
-            st.session_state.screenshot_detections = []
+            st.session_state.screenshot_detections = EMPTY_DETECTIONS
 
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -853,23 +893,7 @@ def webcam_detection_page():
             st.image(st.session_state.screenshot_img, caption="Screenshot", use_container_width=True)
 
             # Determine what counts as weapons
-            weapon_count = 0
-            try:
-                class_names = model.names
-                # Look for weapon-related classes
-                weapon_classes = [cls_id for cls_id, name in class_names.items()
-                                  if 'weapon' in name.lower() or 'gun' in name.lower()
-                                  or 'pistol' in name.lower() or 'rifle' in name.lower()
-                                  or 'knife' in name.lower()]
-
-                if weapon_classes:
-                    weapon_count = sum(1 for det in st.session_state.screenshot_detections if det[5] in weapon_classes)
-                else:
-                    # If no weapon class found, assume class 0 is weapon (common in custom models)
-                    weapon_count = sum(1 for det in st.session_state.screenshot_detections if det[5] == 0)
-            except:
-                # Default: assume class 0 is weapon
-                weapon_count = sum(1 for det in st.session_state.screenshot_detections if det[5] == 0)
+            weapon_count = count_weapons(st.session_state.screenshot_detections, model)
 
             if weapon_count > 0:
                 st.markdown(f"⚠️ **{weapon_count}** weapon{'s' if weapon_count > 1 else ''} detected!")
@@ -878,6 +902,8 @@ def webcam_detection_page():
 
             if st.button("Save Screenshot"):
                 # Convert image to bytes
+                from PIL import Image
+
                 img = Image.fromarray(st.session_state.screenshot_img)
                 buf = io.BytesIO()
                 img.save(buf, format="PNG")
@@ -935,6 +961,9 @@ def webcam_detection_page():
                 fps_update_interval = 10  # Update FPS every 10 frames
                 frame_times = []
 
+                # Background model for this camera session
+                cropper = ForegroundCropper() if use_foreground else None
+
                 # Process frames until stop is requested
                 while video_cap.isOpened() and st.session_state.run_webcam:
                     ret, frame = video_cap.read()
@@ -946,19 +975,23 @@ def webcam_detection_page():
                     start_time = time.time()
 
                     # Convert from BGR to RGB
-                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    native_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
                     # Resize frame to 640x640 for processing
-                    rgb_frame = resize_image_to_square(rgb_frame, target_size=(640, 640))
+                    rgb_frame = resize_image_to_square(native_frame, target_size=(640, 640))
 
                     # Take screenshot if requested
                     if take_screenshot and frame_count % 3 == 0:  # Only check every few frames to avoid multiple screenshots
                         st.session_state.screenshot_img = rgb_frame.copy()
-                        st.session_state.screenshot_detections = []
+                        st.session_state.screenshot_detections = EMPTY_DETECTIONS
                         take_screenshot = False  # Reset flag
 
                     # Perform detection
-                    detections, proc_time = detect_weapons(model, rgb_frame, conf_threshold)
+                    if cropper is not None:
+                        detections, proc_time = detect_weapons_foreground(model, native_frame, cropper,
+                                                                          conf_threshold)
+                    else:
+                        detections, proc_time = detect_weapons(model, rgb_frame, conf_threshold)
 
                     # If this is a screenshot, save detections
                     if st.session_state.screenshot_img is not None and np.array_equal(st.session_state.screenshot_img,
@@ -966,23 +999,7 @@ def webcam_detection_page():
                         st.session_state.screenshot_detections = detections
 
                     # Determine what counts as weapons
-                    weapon_count = 0
-                    try:
-                        class_names = model.names
-                        # Look for weapon-related classes
-                        weapon_classes = [cls_id for cls_id, name in class_names.items()
-                                          if 'weapon' in name.lower() or 'gun' in name.lower()
-                                          or 'pistol' in name.lower() or 'rifle' in name.lower()
-                                          or 'knife' in name.lower()]
-
-                        if weapon_classes:
-                            weapon_count = sum(1 for det in detections if det[5] in weapon_classes)
-                        else:
-                            # If no weapon class found, assume class 0 is weapon (common in custom models)
-                            weapon_count = sum(1 for det in detections if det[5] == 0)
-                    except:
-                        # Default: assume class 0 is weapon
-                        weapon_count = sum(1 for det in detections if det[5] == 0)
+                    weapon_count = count_weapons(detections, model)
 
                     if weapon_count > 0:
                         st.session_state.webcam_stats['weapons_detected'] += weapon_count
@@ -1170,6 +1187,10 @@ def settings_page():
     # Model path
     model_path = st.text_input("PyTorch Model Path", value=r"E:\ML\Weapon Detection System\best.pt")
 
+    # Inference backend (ONNX is exported next to the .pt file on first use)
+    backend = st.selectbox("Inference Backend", options=list(BACKENDS),
+                           index=list(BACKENDS).index(MODEL_BACKEND) if MODEL_BACKEND in BACKENDS else 0)
+
     # Default confidence threshold
     default_conf = st.slider("Default Confidence Threshold",
                              min_value=0.1,
@@ -1183,7 +1204,7 @@ def settings_page():
         if 'model' in st.session_state:
             del st.session_state.model
 
-        st.session_state.model = load_model(model_path)
+        st.session_state.model = load_model(model_path, backend)
         if st.session_state.model is not None:
             st.success("Model reloaded successfully!")
             st.session_state.default_conf = default_conf
@@ -1236,17 +1257,6 @@ def main():
     # Display header
     display_header()
 
-    # Load model on startup and store in session state
-    if 'model' not in st.session_state:
-        with st.spinner("Loading model..."):
-            model = load_model()
-            if model is not None:
-                st.session_state.model = model
-                # Display success in sidebar
-                st.sidebar.success("Model loaded successfully!")
-            else:
-                st.sidebar.error("Failed to load model. Check the model path.")
-
     # Sidebar navigation
     st.sidebar.markdown("## 🛠️ Navigation")
 
@@ -1267,6 +1277,17 @@ def main():
         if selection == value:
             st.session_state.page = key
 
+    # Load the model only for pages that run detection, and keep it in session state
+    if 'model' not in st.session_state and st.session_state.page in ("image", "video", "webcam"):
+        with st.spinner("Loading model..."):
+            model = load_model()
+            if model is not None:
+                st.session_state.model = model
+                # Display success in sidebar
+                st.sidebar.success("Model loaded successfully!")
+            else:
+                st.sidebar.error("Failed to load model. Check the model path.")
+
     # Display selected page
     try:
         if st.session_state.page == "image":
@@ -0,0 +1,287 @@
+import ast
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Supported inference backends for get_model()/load_model()
+BACKENDS = ("pytorch", "onnx")
+
+# Ultralytics predict() defaults, kept so both backends return the same detections
+DEFAULT_IOU_THRESHOLD = 0.7
+DEFAULT_MAX_DET = 300
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+class HostArray(np.ndarray):
+    """ndarray that also answers the torch-style ``.cpu()`` / ``.numpy()`` calls made on YOLO boxes"""
+
+    def __getitem__(self, idx):
+        out = super().__getitem__(idx)
+        # Keep scalars wrapped so box.conf[0].cpu().numpy() works like on a tensor
+        return out if isinstance(out, np.ndarray) else np.asarray(out).view(HostArray)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.view(np.ndarray)
+
+
+class OnnxBoxes:
+    """Minimal stand-in for ultralytics ``Boxes`` backed by a float32 [N, 6] array"""
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 6).view(HostArray)
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, 4]
+
+    @property
+    def cls(self):
+        return self.data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        return OnnxBoxes(self.data.numpy()[idx])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class OnnxResult:
+    """Minimal stand-in for ultralytics ``Results`` exposing ``boxes`` and ``names``"""
+
+    def __init__(self, boxes, names, orig_shape):
+        self.boxes = OnnxBoxes(boxes)
+        self.names = names
+        self.orig_shape = orig_shape
+
+
+# Vectorised non-maximum suppression, returns kept indices sorted by score
+def nms(boxes, scores, iou_threshold=DEFAULT_IOU_THRESHOLD):
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        # IoU of the best remaining box against all others at once
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+# Class-aware NMS: offset boxes per class so different classes never suppress each other
+def batched_nms(boxes, scores, classes, iou_threshold=DEFAULT_IOU_THRESHOLD, max_wh=7680):
+    offsets = classes.astype(np.float32)[:, None] * max_wh
+    return nms(boxes + offsets, scores, iou_threshold)
+
+
+# Decode a raw YOLOv8 head output ([4 + num_classes, anchors]) into [N, 6] detections
+def decode_yolo_output(output, conf_threshold=0.25, iou_threshold=DEFAULT_IOU_THRESHOLD,
+                       max_det=DEFAULT_MAX_DET):
+    preds = output.T
+    class_scores = preds[:, 4:]
+
+    # Best class per anchor
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_scores)), class_ids]
+
+    mask = scores >= conf_threshold
+    if not mask.any():
+        return np.zeros((0, 6), dtype=np.float32)
+
+    xywh = preds[mask, :4]
+    scores = scores[mask]
+    class_ids = class_ids[mask]
+
+    # Convert center-x, center-y, width, height to corner coordinates
+    xyxy = np.empty_like(xywh)
+    xyxy[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+    xyxy[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+    xyxy[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+    xyxy[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+
+    keep = batched_nms(xyxy, scores, class_ids, iou_threshold)[:max_det]
+
+    return np.concatenate(
+        [xyxy[keep], scores[keep, None], class_ids[keep, None].astype(np.float32)], axis=1
+    ).astype(np.float32)
+
+
+# Resize with unchanged aspect ratio and pad to the network input size
+def letterbox(img, new_shape=(640, 640)):
+    h, w = img.shape[:2]
+    scale = min(new_shape[0] / h, new_shape[1] / w)
+    new_h, new_w = int(round(h * scale)), int(round(w * scale))
+
+    if (new_h, new_w) != (h, w):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_h, pad_w = new_shape[0] - new_h, new_shape[1] - new_w
+    top, left = int(round(pad_h / 2 - 0.1)), int(round(pad_w / 2 - 0.1))
+    bottom, right = pad_h - top, pad_w - left
+    if pad_h or pad_w:
+        img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+
+    return img, scale, (left, top)
+
+
+# YOLOv8 detector running on an ONNX Runtime CPU session
+class OnnxYOLO:
+    """ONNX Runtime replacement for ``ultralytics.YOLO`` inference.
+
+    Called like the ultralytics model (``model(img_or_list, conf=...)``) and
+    returns results whose ``boxes`` expose ``xyxy``/``conf``/``cls``/``data``,
+    so ``detect_weapons`` works unchanged on either backend.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, onnx_path, names=None, intra_op_threads=0, iou_threshold=DEFAULT_IOU_THRESHOLD,
+                 max_det=DEFAULT_MAX_DET):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+
+        self.onnx_path = onnx_path
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.iou_threshold = iou_threshold
+        self.max_det = max_det
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_type = np.float16 if "float16" in model_input.type else np.float32
+
+        # Dynamic axes come back as strings; fall back to the ultralytics default size
+        _, _, in_h, in_w = model_input.shape
+        self.dynamic_size = not isinstance(in_h, int) or not isinstance(in_w, int)
+        self.imgsz = (in_h if isinstance(in_h, int) else 640, in_w if isinstance(in_w, int) else 640)
+        self.dynamic_batch = not isinstance(model_input.shape[0], int) or model_input.shape[0] != 1
+
+        # Ultralytics stores class names in the ONNX metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if names is None and "names" in metadata:
+            names = ast.literal_eval(metadata["names"])
+        self.names = names if names is not None else {0: "weapon"}
+
+    def preprocess(self, images, imgsz=None):
+        batch = []
+        meta = []
+        for img in images:
+            padded, scale, pad = letterbox(img, imgsz or self.imgsz)
+            batch.append(padded)
+            meta.append((scale, pad, img.shape[:2]))
+
+        # Match ultralytics: numpy inputs are treated as BGR and flipped to RGB, BHWC -> BCHW
+        blob = np.stack(batch)[..., ::-1].transpose(0, 3, 1, 2)
+        blob = np.ascontiguousarray(blob, dtype=self.input_type) / self.input_type(255.0)
+        return blob, meta
+
+    def forward(self, blob):
+        if self.dynamic_batch or len(blob) == 1:
+            return self.session.run(None, {self.input_name: blob})[0]
+        # Static batch-1 graph: run images one at a time
+        return np.concatenate([self.session.run(None, {self.input_name: blob[i:i + 1]})[0]
+                               for i in range(len(blob))])
+
+    def __call__(self, source, conf=0.25, iou=None, imgsz=None, **kwargs):
+        images = source if isinstance(source, (list, tuple)) else [source]
+        if not images:
+            return []
+
+        # Like ultralytics, imgsz sets the network input size; static graphs keep their own
+        if imgsz and self.dynamic_size:
+            imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else tuple(imgsz)
+        else:
+            imgsz = None
+
+        blob, meta = self.preprocess(images, imgsz)
+        outputs = self.forward(blob).astype(np.float32)
+
+        results = []
+        for output, (scale, (pad_x, pad_y), (orig_h, orig_w)) in zip(outputs, meta):
+            dets = decode_yolo_output(output, conf, iou or self.iou_threshold, self.max_det)
+
+            # Map boxes from network input space back to the original image
+            dets[:, [0, 2]] = np.clip((dets[:, [0, 2]] - pad_x) / scale, 0, orig_w)
+            dets[:, [1, 3]] = np.clip((dets[:, [1, 3]] - pad_y) / scale, 0, orig_h)
+            results.append(OnnxResult(dets, self.names, (orig_h, orig_w)))
+
+        return results
+
+
+# Export a PyTorch checkpoint to ONNX with ultralytics
+def export_onnx(model_path, onnx_path=None, imgsz=640):
+    from ultralytics import YOLO
+
+    logging.info(f"Exporting {model_path} to ONNX")
+    start_time = time.time()
+    exported_path = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+
+    if onnx_path and os.path.abspath(exported_path) != os.path.abspath(onnx_path):
+        os.replace(exported_path, onnx_path)
+        exported_path = onnx_path
+
+    logging.info(f"ONNX export finished in {time.time() - start_time:.1f}s: {exported_path}")
+    return exported_path
+
+
+# Load an ONNX detector, exporting it from the .pt checkpoint when missing or stale
+def load_onnx_model(model_path, onnx_path=None, export=True, intra_op_threads=0):
+    onnx_path = onnx_path or os.path.splitext(model_path)[0] + ".onnx"
+
+    stale = (os.path.exists(onnx_path) and os.path.exists(model_path)
+             and os.path.getmtime(model_path) > os.path.getmtime(onnx_path))
+    if not os.path.exists(onnx_path) or stale:
+        if not export:
+            raise FileNotFoundError(f"ONNX model not found: {onnx_path}")
+        export_onnx(model_path, onnx_path)
+
+    return OnnxYOLO(onnx_path, intra_op_threads=intra_op_threads)
+
+
+# Load the detector for the requested backend, falling back to PyTorch if ONNX fails
+def load_detector(model_path, backend="pytorch", onnx_path=None, intra_op_threads=0):
+    backend = (backend or "pytorch").lower()
+    if backend not in BACKENDS:
+        logging.warning(f"Unknown model backend '{backend}', using pytorch")
+        backend = "pytorch"
+
+    if backend == "onnx":
+        try:
+            model = load_onnx_model(model_path, onnx_path, intra_op_threads=intra_op_threads)
+            logging.info(f"Using ONNX Runtime backend: {model.onnx_path}")
+            return model, "onnx"
+        except Exception as e:
+            logging.warning(f"ONNX backend unavailable ({e}), falling back to PyTorch")
+
+    from ultralytics import YOLO
+
+    return YOLO(model_path), "pytorch"
@@ -0,0 +1,84 @@
+import math
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+# Adaptive frame sampling stride driven by measured inference time
+class AdaptiveStride:
+    """Pick how many video frames to advance between detections.
+
+    ``target_rtf`` is the real-time factor to sustain (video seconds handled
+    per second of processing; 1.0 keeps up with live playback). With
+    ``target_fps`` the stride also aims for that many analysed frames per
+    second of video. When both are set the larger stride wins, so the
+    throughput goal is never exceeded. The stride follows the rolling mean
+    of the last ``window`` inference times and stays within
+    ``[min_stride, max_stride]``.
+    """
+
+    def __init__(self, video_fps: float, target_rtf: Optional[float] = 1.0, target_fps: Optional[float] = None,
+                 initial_stride: int = 1, min_stride: int = 1, max_stride: int = 60, window: int = 10):
+        self.video_fps = video_fps if video_fps and video_fps > 0 else 30.0
+        self.target_rtf = target_rtf if target_rtf and target_rtf > 0 else None
+        self.target_fps = target_fps if target_fps and target_fps > 0 else None
+        self.min_stride = max(1, int(min_stride))
+        self.max_stride = max(self.min_stride, int(max_stride))
+        self.stride = min(max(int(initial_stride), self.min_stride), self.max_stride)
+
+        self._inference_times = deque(maxlen=max(1, int(window)))
+        self._read_times = deque(maxlen=max(1, int(window)) * 10)
+        self.frames_analysed = 0
+        self.history: List[Dict[str, Any]] = []
+
+    def observe_read(self, seconds: float):
+        """Record the time spent decoding one frame (paid for every frame, sampled or not)"""
+        self._read_times.append(seconds)
+
+    def observe(self, inference_time: float, frame_index: int) -> int:
+        """Record one detection's inference time and return the stride to use next"""
+        self._inference_times.append(inference_time)
+        self.frames_analysed += 1
+
+        stride = self._target_stride()
+        if stride != self.stride or not self.history:
+            self.history.append({"frame": frame_index, "stride": stride,
+                                 "inference_ms": self.mean_inference_time * 1000.0})
+        self.stride = stride
+        return stride
+
+    @property
+    def mean_inference_time(self) -> float:
+        return sum(self._inference_times) / len(self._inference_times) if self._inference_times else 0.0
+
+    @property
+    def mean_read_time(self) -> float:
+        return sum(self._read_times) / len(self._read_times) if self._read_times else 0.0
+
+    def _target_stride(self) -> int:
+        stride = self.min_stride
+
+        if self.target_fps:
+            stride = max(stride, round(self.video_fps / self.target_fps))
+
+        if self.target_rtf:
+            # s frames of video last s / fps seconds and cost one inference plus s reads:
+            # keep s / fps >= rtf * (inference + s * read)
+            frame_period = 1.0 / self.video_fps
+            spare = frame_period - self.target_rtf * self.mean_read_time
+            if spare <= 0:
+                return self.max_stride
+            stride = max(stride, math.ceil(self.target_rtf * self.mean_inference_time / spare))
+
+        return min(max(int(stride), self.min_stride), self.max_stride)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "video_fps": self.video_fps,
+            "target_rtf": self.target_rtf,
+            "target_fps": self.target_fps,
+            "stride": self.stride,
+            "frames_analysed": self.frames_analysed,
+            "mean_inference_ms": self.mean_inference_time * 1000.0,
+            "mean_read_ms": self.mean_read_time * 1000.0,
+            "history": self.history,
+        }
@@ -7,15 +7,14 @@ import numpy as np
 import cv2
 import time
 import uuid
-import tempfile
 from datetime import datetime
 import os
 import io
 import shutil
-import torch
-from PIL import Image
 import logging
-from ultralytics import YOLO
+
+from model_backends import load_detector
+from tracker import SortTracker
 
 
 # Configure logging
@@ -43,7 +42,14 @@ app.add_middleware(
 
 # Global variables
 MODEL_PATH = os.environ.get("MODEL_PATH", r"E:\ML\Weapon Detection System\weapon-detection-system\backend\best.pt")
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "pytorch")  # "pytorch" or "onnx"
+ONNX_MODEL_PATH = os.environ.get("ONNX_MODEL_PATH", os.path.splitext(MODEL_PATH)[0] + ".onnx")
 UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+# Load the model at startup; workers that only serve history can set this to false
+PRELOAD_MODEL = os.environ.get("PRELOAD_MODEL", "true").lower() in ("1", "true", "yes")
+# Video job tracking: propagate boxes between keyframes, dropping tracks unseen for TRACK_MAX_AGE frames
+VIDEO_TRACKING = os.environ.get("VIDEO_TRACKING", "true").lower() in ("1", "true", "yes")
+TRACK_MAX_AGE = int(os.environ.get("TRACK_MAX_AGE", "30"))
 DETECTION_HISTORY = []
 # Ensure upload directory exists
 # os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -64,21 +70,27 @@ class DetectionRequest(BaseModel):
 class VideoDetectionRequest(BaseModel):
     conf_threshold: float = 0.25
     frame_skip: int = 2
+    tracking: bool = VIDEO_TRACKING
 
 class HistoryDeleteRequest(BaseModel):
     id: str
 
-# Load the PyTorch model
+# Load the model (PyTorch or ONNX Runtime backend)
 model = None
+model_backend = None
 
 def get_model():
-    global model
+    global model, model_backend
     if model is None:
         try:
-            # Load YOLOv8 model using ultralytics
-            logging.info(f"Loading model from {MODEL_PATH}")
-            model = YOLO(MODEL_PATH)
-            logging.info("Model loaded successfully")
+            # Load YOLOv8 model, falling back to PyTorch if the ONNX backend fails
+            # (torch and ultralytics are only imported here, on first use)
+            logging.info(f"Loading model from {MODEL_PATH} (backend: {MODEL_BACKEND})")
+            model, model_backend = load_detector(MODEL_PATH, MODEL_BACKEND, ONNX_MODEL_PATH)
+            logging.info(f"Model loaded successfully ({model_backend} backend)")
+        except ImportError as e:
+            logging.error("Please install ultralytics: pip install ultralytics")
+            raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
         except Exception as e:
             logging.error(f"Failed to load model: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
@@ -99,6 +111,25 @@ def resize_image_to_square(img, target_size=(640, 640)):
     return resized_img
 
 
+# Empty detection array: float32 [N, 6] rows of x1, y1, x2, y2, score, class_id
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+# Extract detections from a single YOLOv8 result with one device-to-host copy
+def extract_detections(result):
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return EMPTY_DETECTIONS
+
+    # boxes.data is [N, 6] (or [N, 7] with a track id before score and class)
+    data = boxes.data
+    data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+    detections = np.empty((len(data), 6), dtype=np.float32)
+    detections[:, :4] = data[:, :4]
+    detections[:, 4:] = data[:, -2:]
+    return detections
+
+
 # Detection function for images
 def detect_weapons(model, img, conf_threshold=0.25, input_size=(640, 640)):
     # Track time
@@ -111,40 +142,46 @@ def detect_weapons(model, img, conf_threshold=0.25, input_size=(640, 640)):
         # Run inference with YOLOv8
         results = model(resized_img, conf=conf_threshold)
 
-        # Process results
-        detections = []
-        confidence_scores = []
-        class_names = []
-
         # Extract detection results
-        for result in results:
-            boxes = result.boxes
-
-            # Process each detection
-            for i, box in enumerate(boxes):
-                # Get box coordinates (in xyxy format)
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-
-                # Get confidence
-                conf = float(box.conf[0].cpu().numpy())
-                confidence_scores.append(conf)
-
-                # Get class ID and name
-                cls_id = int(box.cls[0].cpu().numpy())
-                class_name = model.names[cls_id]
-                class_names.append(class_name)
-
-                # Format: [x1, y1, x2, y2, score, class_id]
-                detections.append([int(x1), int(y1), int(x2), int(y2), conf, cls_id])
+        detections = [extract_detections(result) for result in results]
+        detections = np.concatenate(detections) if detections else EMPTY_DETECTIONS
 
         proc_time = time.time() - start_time
-        return detections, confidence_scores, class_names, proc_time
+        return detections, proc_time
 
     except Exception as e:
         logging.error(f"Inference error: {e}")
         raise HTTPException(status_code=500, detail=f"Inference error: {str(e)}")
 
 
+# Count weapons (class 0 is the weapon class)
+def count_weapons(detections):
+    return int(np.count_nonzero(detections[:, 5] == 0))
+
+
+# Class name for every detection, built only when serialising a response
+def detection_class_names(detections, names):
+    return [names.get(int(cls_id), f"Class {int(cls_id)}") for cls_id in detections[:, 5]]
+
+
+# Serialise a detection array for JSON responses
+def detections_to_json(detections, names):
+    boxes = detections[:, :4].astype(np.int32).tolist()
+    scores = detections[:, 4].tolist()
+    class_ids = detections[:, 5].astype(np.int32).tolist()
+    return [
+        {
+            "x1": box[0],
+            "y1": box[1],
+            "x2": box[2],
+            "y2": box[3],
+            "confidence": score,
+            "class_id": class_id,
+            "class_name": names.get(class_id, f"Class {class_id}")
+        } for box, score, class_id in zip(boxes, scores, class_ids)
+    ]
+
+
 # Draw bounding boxes on image
 def draw_detections(img, detections, class_names=None):
     # Default colors
@@ -155,8 +192,12 @@ def draw_detections(img, detections, class_names=None):
 
     result_img = img.copy()
 
-    for box in detections:
-        x1, y1, x2, y2, score, class_id = box
+    # Convert coordinates and classes once for the whole array
+    boxes = detections[:, :4].astype(np.int32).tolist()
+    scores = detections[:, 4].tolist()
+    class_ids = detections[:, 5].astype(np.int32).tolist()
+
+    for (x1, y1, x2, y2), score, class_id in zip(boxes, scores, class_ids):
 
         # Get label
         if class_names and class_id in class_names:
@@ -190,9 +231,9 @@ def save_image(image, detection_id):
 
 
 # Add detection to history
-def add_detection_to_history(image, detections, confidence_scores, class_names, source_type, processing_time):
+def add_detection_to_history(image, detections, names, source_type, processing_time):
     # Count weapons (first class is typically the weapon class)
-    weapon_count = sum(1 for det in detections if det[5] == 0)
+    weapon_count = count_weapons(detections)
 
     # Generate unique ID
     detection_id = str(uuid.uuid4())
@@ -200,8 +241,7 @@ def add_detection_to_history(image, detections, confidence_scores, class_names,
     # Save image with detections
     image_path = None
     if image is not None:
-        image_with_boxes = draw_detections(image, detections,
-                                           {i: name for i, name in enumerate(class_names)} if class_names else None)
+        image_with_boxes = draw_detections(image, detections, names)
         image_path = save_image(image_with_boxes, detection_id)
 
     # Create detection record
@@ -210,10 +250,10 @@ def add_detection_to_history(image, detections, confidence_scores, class_names,
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "source_type": source_type,
         "weapon_count": weapon_count,
-        "confidence_scores": confidence_scores,
+        "confidence_scores": detections[:, 4].tolist(),
         "processing_time": processing_time,
         "image_path": image_path,
-        "class_names": class_names
+        "class_names": detection_class_names(detections, names)
     }
 
     # Add to history
@@ -226,7 +266,8 @@ def add_detection_to_history(image, detections, confidence_scores, class_names,
 @app.on_event("startup")
 async def startup_event():
     # Load model on startup
-    get_model()
+    if PRELOAD_MODEL:
+        get_model()
 
 
 @app.get("/")
@@ -236,7 +277,7 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model_loaded": model is not None}
+    return {"status": "healthy", "model_loaded": model is not None, "model_backend": model_backend}
 
 
 @app.get("/model/info")
@@ -244,7 +285,8 @@ async def model_info(model=Depends(get_model)):
     try:
         return {
             "class_names": model.names,
-            "model_path": r"E:\ML\Weapon Detection System\weapon-detection-system\backend\best.pt"
+            "model_path": r"E:\ML\Weapon Detection System\weapon-detection-system\backend\best.pt",
+            "backend": model_backend
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting model info: {str(e)}")
@@ -274,14 +316,14 @@ async def detect_image(
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
         # Detect weapons
-        detections, confidence_scores, class_names, proc_time = detect_weapons(
+        detections, proc_time = detect_weapons(
             model, img_rgb, conf_threshold
         )
 
         # Add to history if weapons detected
-        if any(det[5] == 0 for det in detections):  # Assuming class 0 is weapon
+        if count_weapons(detections) > 0:  # Assuming class 0 is weapon
             detection = add_detection_to_history(
-                img, detections, confidence_scores, class_names, "Image Upload", proc_time
+                img, detections, model.names, "Image Upload", proc_time
             )
             return detection
 
@@ -291,9 +333,9 @@ async def detect_image(
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "source_type": "Image Upload",
             "weapon_count": 0,
-            "confidence_scores": confidence_scores,
+            "confidence_scores": detections[:, 4].tolist(),
             "processing_time": proc_time,
-            "class_names": class_names
+            "class_names": detection_class_names(detections, model.names)
         }
 
     except Exception as e:
@@ -306,7 +348,8 @@ async def detect_video(
         background_tasks: BackgroundTasks,
         file: UploadFile = File(...),
         conf_threshold: float = Form(0.25),
-        frame_skip: int = Form(2)
+        frame_skip: int = Form(2),
+        tracking: bool = Form(VIDEO_TRACKING)
 ):
     if not file.content_type.startswith("video/"):
         raise HTTPException(status_code=400, detail="Only video files are allowed")
@@ -326,7 +369,8 @@ async def detect_video(
             temp_file_path,
             job_id,
             conf_threshold,
-            frame_skip
+            frame_skip,
+            tracking
         )
 
         return {
@@ -343,10 +387,13 @@ async def detect_video(
         raise HTTPException(status_code=500, detail=f"Error uploading video: {str(e)}")
 
 
-def process_video_file(file_path, job_id, conf_threshold, frame_skip):
+def process_video_file(file_path, job_id, conf_threshold, frame_skip, tracking=VIDEO_TRACKING):
     # Load model
     model = get_model()
 
+    # Carry boxes across the frames between keyframes; a track survives at least one missed keyframe
+    tracker = SortTracker(max_age=max(TRACK_MAX_AGE, 2 * frame_skip)) if tracking else None
+
     # Process video file
     try:
         video_cap = cv2.VideoCapture(file_path)
@@ -357,6 +404,7 @@ def process_video_file(file_path, job_id, conf_threshold, frame_skip):
 
         frame_count = 0
         weapon_frames = []
+        tracked_frames = 0
 
         # Process frames
         while video_cap.isOpened():
@@ -374,26 +422,38 @@ def process_video_file(file_path, job_id, conf_threshold, frame_skip):
                 rgb_frame = resize_image_to_square(rgb_frame)
 
                 # Detect weapons
-                detections, confidence_scores, class_names, proc_time = detect_weapons(
+                detections, proc_time = detect_weapons(
                     model, rgb_frame, conf_threshold
                 )
+                tracks = tracker.update(detections) if tracker else None
 
                 # Check if weapons detected (assume class 0 is weapon)
-                if any(det[5] == 0 for det in detections):
+                if count_weapons(detections) > 0:
                     # Save significant frame
                     detection = add_detection_to_history(
-                        frame, detections, confidence_scores, class_names,
-                        "Video Upload", proc_time
+                        frame, detections, model.names, "Video Upload", proc_time
                     )
                     weapon_frames.append(detection)
 
+            elif tracker is not None:
+                # Frames between keyframes only propagate the tracks
+                tracks = tracker.predict()
+
+            if tracker is not None and count_weapons(tracks) > 0:
+                tracked_frames += 1
+
             frame_count += 1
 
         # Clean up
         video_cap.release()
 
         # Update job status in a real app, you'd store this in a database
-        logging.info(f"Video processing complete. Job ID: {job_id}, Weapons found in {len(weapon_frames)} frames")
+        logging.info(f"Video processing complete. Job ID: {job_id}, Weapons found in {len(weapon_frames)} frames, "
+                     f"tracked in {tracked_frames}/{frame_count} frames")
+        if tracker is not None:
+            for track in tracker.summary():
+                logging.info(f"Track {track['track_id']} (class {track['class_id']}): frames "
+                             f"{track['first_frame']}-{track['last_frame']}, max score {track['max_score']:.2f}")
 
         # Clean up temp file
         if os.path.exists(file_path):
@@ -431,13 +491,12 @@ async def detect_frame(
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
         # Detect weapons
-        detections, confidence_scores, class_names, proc_time = detect_weapons(
+        detections, proc_time = detect_weapons(
             model, img_rgb, conf_threshold
         )
 
         # Draw detections on image
-        result_img = draw_detections(img_rgb, detections,
-                                     {i: name for i, name in enumerate(class_names)} if class_names else None)
+        result_img = draw_detections(img_rgb, detections, model.names)
 
         # Convert back to BGR for encoding
         result_img_bgr = cv2.cvtColor(result_img, cv2.COLOR_RGB2BGR)
@@ -446,30 +505,20 @@ async def detect_frame(
         _, encoded_img = cv2.imencode('.jpg', result_img_bgr)
 
         # Count weapons (assume class 0 is weapon)
-        weapon_count = sum(1 for det in detections if det[5] == 0)
+        weapon_count = count_weapons(detections)
 
         # If weapons detected, save to history
         if weapon_count > 0:
             add_detection_to_history(
-                img, detections, confidence_scores, class_names, "Webcam", proc_time
+                img, detections, model.names, "Webcam", proc_time
             )
 
         # Return result as JSON with base64 image
         return {
             "weapon_count": weapon_count,
-            "confidence_scores": confidence_scores,
+            "confidence_scores": detections[:, 4].tolist(),
             "processing_time": proc_time,
-            "detections": [
-                {
-                    "x1": int(det[0]),
-                    "y1": int(det[1]),
-                    "x2": int(det[2]),
-                    "y2": int(det[3]),
-                    "confidence": float(det[4]),
-                    "class_id": int(det[5]),
-                    "class_name": class_names[i] if i < len(class_names) else f"Class {det[5]}"
-                } for i, det in enumerate(detections)
-            ],
+            "detections": detections_to_json(detections, model.names),
             "image_bytes": encoded_img.tobytes()
         }
 
@@ -1,31 +1,60 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, BackgroundTasks, Depends, WebSocket, \
-    WebSocketDisconnect
+import time
+
+# Cold start is measured from the first import of the API module
+STARTUP_BEGIN = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Depends, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import numpy as np
 import cv2
-import time
 import uuid
-import tempfile
 from datetime import datetime
 import os
 import io
 import shutil
-import torch
 import json
-from PIL import Image
 import logging
 import base64
 import asyncio
+import hashlib
+import importlib
+
+from batching import InferenceBatcher
+from inference_executor import InferenceExecutor, ExecutorSaturated
+from model_backends import load_detector
+from quantization import load_reduced_precision_detector
+from result_cache import ResultCache
+from motion_gate import MotionGate, MotionGateRegistry
+from tiling import detect_tiled
+from tracker import SortTracker
+from stride_controller import AdaptiveStride
+from model_registry import ModelRegistry
+from autotune import apply_thread_settings, load_profile
+from foreground import ForegroundCropper, offset_detections
+from jobs import FINAL_STATES, QUEUED, JobStore, JobWorkerPool
+from video_pipeline import Stage, StagedPipeline
+from frame_sampler import FrameSampler, plan_frames
+from segments import run_segments, split_segments
+from stream_ingest import STREAMABLE_TYPES, open_video, partial_path
+from broadcaster import Broadcaster
+from history_store import HistoryStore
+from frame_protocol import FRAME_HEADER, FRAME_PROTOCOL_VERSION, compact_detections, pack_detections, unpack_frame
+
+# Cold-start breakdown in seconds: imports, weight load and warm-up (served by /startup)
+STARTUP_TIMINGS: Dict[str, Any] = {"imports_total": time.perf_counter() - STARTUP_BEGIN}
+
+
+# Import a module (optionally one attribute of it) and record how long it took
+def timed_import(module_name, attribute=None):
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    result = getattr(module, attribute) if attribute else module
+    STARTUP_TIMINGS[f"import_{module_name}"] = time.perf_counter() - start
+    return result
 
-# Add torch import for YOLOv8
-try:
-    from ultralytics import YOLO
-except ImportError:
-    logging.error("Please install ultralytics: pip install ultralytics")
-    raise ImportError("Ultralytics package not installed")
 
 # Configure logging
 logging.basicConfig(
@@ -48,19 +77,141 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Result metadata of binary and annotated /detect/frame responses
+    expose_headers=["X-Weapon-Count", "X-Processing-Time", "X-Model-Version", "X-Reused-Result", "X-Input-Size"],
 )
 
+# Host profile written by autotune.py; environment variables still take precedence over it
+AUTOTUNE_PROFILE = os.environ.get("AUTOTUNE_PROFILE", "autotune_profile.json")
+TUNED = load_profile(AUTOTUNE_PROFILE)
+
 # Global variables
 MODEL_PATH = os.environ.get("MODEL_PATH", "best.pt")
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", TUNED.get("backend", "pytorch"))  # "pytorch" or "onnx"
+ONNX_MODEL_PATH = os.environ.get("ONNX_MODEL_PATH", os.path.splitext(MODEL_PATH)[0] + ".onnx")
+MODEL_PRECISION = os.environ.get("MODEL_PRECISION", "fp32")  # "fp32", "int8-dynamic", "int8-static" or "bf16"
+# Folders/videos used to calibrate the static INT8 model (separated by os.pathsep)
+CALIBRATION_SOURCES = os.environ.get(
+    "CALIBRATION_SOURCES", os.pathsep.join([os.path.join("..", "..", "sample_images"),
+                                            os.path.join("..", "..", "sample_video")])
+).split(os.pathsep)
 UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
-DETECTION_HISTORY = []
 
-# WebSocket connections management
-active_connections: List[WebSocket] = []
+# Detection history: SQLite file, records kept in memory for fast lookups and seconds between batched writes
+HISTORY_DB_PATH = os.environ.get("HISTORY_DB_PATH", os.path.join(UPLOAD_DIR, "history.db"))
+HISTORY_HOT_SIZE = int(os.environ.get("HISTORY_HOT_SIZE", "1000"))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("HISTORY_FLUSH_INTERVAL", "0.5"))
+
+# Load and warm up the model at startup; workers that only serve history can set this to false
+PRELOAD_MODEL = os.environ.get("PRELOAD_MODEL", "true").lower() in ("1", "true", "yes")
+
+# Micro-batching configuration: a batch closes after BATCH_MAX_WAIT_MS or BATCH_MAX_SIZE images
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "10"))
+
+# Inference executor configuration: worker threads and requests allowed to wait for them
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", TUNED.get("inference_workers", 1)))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", "32"))
+
+# Result cache for /detect/image: entries kept and seconds before an entry expires (0 disables caching)
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "300"))
+
+# Motion gate defaults: fraction of changed pixels needed to rerun the model (0 disables the gate)
+# and the most consecutive frames that may reuse an old result
+MOTION_THRESHOLD = float(os.environ.get("MOTION_THRESHOLD", "0"))
+MOTION_MAX_SKIP = int(os.environ.get("MOTION_MAX_SKIP", "30"))
+
+# Annotated /detect/frame responses: default JPEG quality and scale of the returned image (1 keeps the frame size)
+FRAME_JPEG_QUALITY = int(os.environ.get("FRAME_JPEG_QUALITY", "80"))
+FRAME_ANNOTATED_SCALE = float(os.environ.get("FRAME_ANNOTATED_SCALE", "1.0"))
+
+# Square network input size for detection, and thread pools per inference call (0 keeps the library default)
+INPUT_SIZE = int(os.environ.get("INPUT_SIZE", TUNED.get("input_size", 640)))
+INTRA_OP_THREADS = int(os.environ.get("INTRA_OP_THREADS", TUNED.get("intra_op_threads", 0)))
+INTER_OP_THREADS = int(os.environ.get("INTER_OP_THREADS", TUNED.get("inter_op_threads", 0)))
+
+# Tiled inference for high-resolution images: tile size in pixels, overlap fraction between
+# neighbouring tiles and the overlap above which cross-tile duplicates are suppressed
+TILE_SIZE = int(os.environ.get("TILE_SIZE", "640"))
+TILE_OVERLAP = float(os.environ.get("TILE_OVERLAP", "0.2"))
+TILE_NMS_THRESHOLD = float(os.environ.get("TILE_NMS_THRESHOLD", "0.5"))
+
+# Video job tracking: propagate boxes between keyframes, dropping tracks unseen for TRACK_MAX_AGE frames
+VIDEO_TRACKING = os.environ.get("VIDEO_TRACKING", "true").lower() in ("1", "true", "yes")
+TRACK_MAX_AGE = int(os.environ.get("TRACK_MAX_AGE", "30"))
+
+# Foreground cropping for fixed cameras: detect only where MOG2 sees movement. FOREGROUND_HISTORY is the
+# background model length in analysed frames; regions covering more than FOREGROUND_MAX_COVERAGE of the
+# frame fall back to the full frame
+FOREGROUND_CROPPING = os.environ.get("FOREGROUND_CROPPING", "false").lower() in ("1", "true", "yes")
+FOREGROUND_HISTORY = int(os.environ.get("FOREGROUND_HISTORY", "500"))
+FOREGROUND_MAX_COVERAGE = float(os.environ.get("FOREGROUND_MAX_COVERAGE", "0.5"))
+
+# Warm-up: image sizes (square, comma separated) and batch sizes run through the model before /ready
+WARMUP_INPUT_SIZES = sorted({int(size) for size in os.environ.get("WARMUP_INPUT_SIZES", str(INPUT_SIZE)).split(",")
+                             if size})
+WARMUP_BATCH_SIZES = sorted({int(size) for size in os.environ.get("WARMUP_BATCH_SIZES",
+                                                                  f"1,{BATCH_MAX_SIZE}").split(",") if size})
+WARMUP_RUNS = int(os.environ.get("WARMUP_RUNS", "2"))
+
+# Adaptive frame skip: upper bound on the sampling stride it may choose
+ADAPTIVE_MAX_STRIDE = int(os.environ.get("ADAPTIVE_MAX_STRIDE", "60"))
+
+# Video jobs: worker processes running uploaded videos, and the SQLite file that keeps jobs across restarts
+VIDEO_WORKERS = int(os.environ.get("VIDEO_WORKERS", "1"))
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", os.path.join(UPLOAD_DIR, "jobs.db"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "0.5"))
+
+# Seconds between heartbeats of a worker's running job, and without one before the job goes back to the queue
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", "5"))
+JOB_HEARTBEAT_TIMEOUT = float(os.environ.get("JOB_HEARTBEAT_TIMEOUT", "60"))
+
+# Video job pipeline: frames held in each queue between the decode, pre-processing, inference, tracking and
+# evidence stages, and the most frames the inference stage runs in one forward pass
+VIDEO_QUEUE_SIZE = int(os.environ.get("VIDEO_QUEUE_SIZE", "8"))
+VIDEO_BATCH_SIZE = int(os.environ.get("VIDEO_BATCH_SIZE", "4"))
+
+# Video frame sampling: analysed frames per second of video time (0 samples every frame_skip frames), and the
+# gap in frames from which the sampler seeks instead of grabbing (0 never seeks; seeking decodes from the
+# previous keyframe, so only gaps longer than the keyframe interval gain)
+VIDEO_SAMPLE_FPS = float(os.environ.get("VIDEO_SAMPLE_FPS", "0"))
+VIDEO_SEEK_THRESHOLD = int(os.environ.get("VIDEO_SEEK_THRESHOLD", "0"))
+
+# Segmented video jobs: processes that each take one time segment of a video (1 processes it in one pass),
+# and the shortest segment in seconds worth a process of its own
+VIDEO_SEGMENT_WORKERS = int(os.environ.get("VIDEO_SEGMENT_WORKERS", "1"))
+VIDEO_MIN_SEGMENT_SECONDS = float(os.environ.get("VIDEO_MIN_SEGMENT_SECONDS", "60"))
+
+# Streamed video uploads: bytes gathered before each disk write, and seconds a worker following a growing
+# stream waits for new data before giving up
+VIDEO_UPLOAD_CHUNK_SIZE = int(os.environ.get("VIDEO_UPLOAD_CHUNK_SIZE", str(1 << 20)))
+VIDEO_STREAM_TIMEOUT = float(os.environ.get("VIDEO_STREAM_TIMEOUT", "30"))
+
+# WebSocket fan-out: messages queued per client, what happens to a client whose queue is full
+# ("drop_oldest" or "disconnect") and seconds one send may take before the client is dropped
+WS_QUEUE_SIZE = int(os.environ.get("WS_QUEUE_SIZE", "64"))
+WS_SLOW_CLIENT_POLICY = os.environ.get("WS_SLOW_CLIENT_POLICY", "drop_oldest")
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "10"))
+
+# Detection images: longest side and JPEG quality of the thumbnail made when a detection is saved, and what
+# WebSocket events carry ("thumbnail": the thumbnail inline as base64, "url": only the image URLs)
+THUMBNAIL_SIZE = int(os.environ.get("THUMBNAIL_SIZE", "240"))
+THUMBNAIL_QUALITY = int(os.environ.get("THUMBNAIL_QUALITY", "70"))
+WS_EVENT_IMAGE = os.environ.get("WS_EVENT_IMAGE", "thumbnail")
 
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Job and segment worker processes import this module to run run_video_job, so everything that only the
+# server uses is created by startup_event: the WebSocket broadcaster (each client has its own outbound queue
+# and sender task), the detection history (kept across restarts), the job table and the job worker pool
+JOB_MODULE = __name__ if __name__ != '__main__' else 'api'
+broadcaster: Optional[Broadcaster] = None
+history_store: Optional[HistoryStore] = None
+job_store: Optional[JobStore] = None
+job_pool: Optional[JobWorkerPool] = None
+
 
 # Pydantic models for request/response validation
 class DetectionResult(BaseModel):
@@ -71,7 +222,12 @@ class DetectionResult(BaseModel):
     confidence_scores: List[float] = []
     processing_time: float
     image_path: Optional[str] = None
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
     class_names: List[str] = []
+    latency: Optional[Dict[str, float]] = None
+    cached: bool = False
+    model_version: Optional[str] = None
 
 
 class DetectionRequest(BaseModel):
@@ -81,45 +237,119 @@ class DetectionRequest(BaseModel):
 class VideoDetectionRequest(BaseModel):
     conf_threshold: float = 0.25
     frame_skip: int = 2
+    sample_fps: Optional[float] = VIDEO_SAMPLE_FPS or None
+    parallelism: Optional[int] = None
+    motion_threshold: float = MOTION_THRESHOLD
+    tracking: bool = VIDEO_TRACKING
+    adaptive_skip: bool = False
+    foreground: bool = FOREGROUND_CROPPING
+    target_rtf: Optional[float] = None
+    target_fps: Optional[float] = None
 
 
 class HistoryDeleteRequest(BaseModel):
     id: str
 
 
-# Load the PyTorch model
-model = None
+class ModelLoadRequest(BaseModel):
+    version: str
+    path: str
+    backend: str = MODEL_BACKEND
+    precision: str = MODEL_PRECISION
+    onnx_path: Optional[str] = None
+    warm_up: bool = True
+    activate: bool = False
 
 
-def get_model():
-    global model
-    if model is None:
+# Set once warm-up has finished; /ready reports 503 until then
+model_ready = False
+
+# Heavy inference dependencies are imported on first use, not when the API starts
+inference_imports_done = False
+
+
+def import_inference_dependencies(backend, precision):
+    global inference_imports_done
+    if inference_imports_done or (backend == "onnx" and precision != "bf16"):
+        return
+    try:
+        timed_import("torch")
+        timed_import("ultralytics", "YOLO")
+    except ImportError:
+        logging.error("Please install ultralytics: pip install ultralytics")
+        raise HTTPException(status_code=500, detail="Ultralytics package not installed")
+    apply_thread_settings(INTRA_OP_THREADS, INTER_OP_THREADS)
+    inference_imports_done = True
+
+
+# Load one model version (PyTorch or ONNX Runtime backend, optionally reduced precision)
+def load_model_weights(path, backend, precision, onnx_path=None):
+    import_inference_dependencies(backend, precision)
+    onnx_path = onnx_path or os.path.splitext(path)[0] + ".onnx"
+
+    # Reduced-precision modes fall back to the FP32 model when unavailable
+    if precision != "fp32":
+        logging.info(f"Loading {precision} model from {path}")
         try:
-            # Load YOLOv8 model using ultralytics
-            logging.info(f"Loading model from {MODEL_PATH}")
-            model = YOLO(MODEL_PATH)
-            logging.info("Model loaded successfully")
+            model, backend_name = load_reduced_precision_detector(path, precision, onnx_path, CALIBRATION_SOURCES)
+            if model is not None:
+                return model, backend_name, precision
+            logging.warning(f"{precision} not supported on this host, using FP32")
         except Exception as e:
-            logging.error(f"Failed to load model: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
-    return model
+            logging.warning(f"{precision} model unavailable ({e}), using FP32")
 
+    # Load YOLOv8 model, falling back to PyTorch if the ONNX backend fails
+    logging.info(f"Loading model from {path} (backend: {backend})")
+    model, backend_name = load_detector(path, backend, onnx_path, intra_op_threads=INTRA_OP_THREADS)
+    return model, backend_name, "fp32"
 
-# WebSocket connection manager
-async def broadcast_detection(detection: Dict[str, Any]):
-    """Send detection results to all connected WebSocket clients"""
-    if not active_connections:
-        return
 
-    # Convert to JSON string for broadcasting
-    detection_json = json.dumps(detection)
+# Model versions held in memory; requests use whichever one is active when they start
+model_registry = ModelRegistry(load_model_weights)
 
-    # Send to all active connections
-    for connection in active_connections:
+# Version name of the model configured through MODEL_PATH
+DEFAULT_MODEL_VERSION = os.environ.get("MODEL_VERSION", os.path.splitext(os.path.basename(MODEL_PATH))[0])
+
+
+# Active model version, loading the configured default on first use
+def get_active_model():
+    entry = model_registry.active
+    if entry is None:
         try:
-            await connection.send_text(detection_json)
+            entry = model_registry.load(DEFAULT_MODEL_VERSION, MODEL_PATH, MODEL_BACKEND, MODEL_PRECISION,
+                                        ONNX_MODEL_PATH)
+        except HTTPException:
+            raise
         except Exception as e:
-            logging.error(f"Error sending to WebSocket: {e}")
+            logging.error(f"Failed to load model: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
+
+        # Another version may have been activated while the default was loading
+        if model_registry.active is None:
+            model_registry.activate(entry.version)
+        entry = model_registry.active
+        STARTUP_TIMINGS.setdefault("model_load", entry.load_time)
+        logging.info(f"Model loaded successfully ({entry.backend} backend) in {entry.load_time:.2f}s")
+    return entry
+
+
+def get_model():
+    return get_active_model().model
+
+
+# Identify the loaded weights so cached results never outlive a model change
+def model_version():
+    return get_active_model().key
+
+
+# WebSocket connection manager
+def broadcast_detection(detection: Dict[str, Any]):
+    """Queue detection results for all connected WebSocket clients (never waits on a client)"""
+    if broadcaster is None or not len(broadcaster):
+        return 0
+
+    # Convert to JSON string once for every client
+    return broadcaster.publish(json.dumps(detection))
 
 
 # Resize image to square
@@ -136,8 +366,28 @@ def resize_image_to_square(img, target_size=(640, 640)):
     return resized_img
 
 
+# Empty detection array: float32 [N, 6] rows of x1, y1, x2, y2, score, class_id
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+# Extract detections from a single YOLOv8 result with one device-to-host copy
+def extract_detections(result, conf_threshold=0.25):
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return EMPTY_DETECTIONS
+
+    # boxes.data is [N, 6] (or [N, 7] with a track id before score and class)
+    data = boxes.data
+    data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+    detections = np.empty((len(data), 6), dtype=np.float32)
+    detections[:, :4] = data[:, :4]
+    detections[:, 4:] = data[:, -2:]
+
+    return detections[detections[:, 4] >= conf_threshold]
+
+
 # Detection function for images
-def detect_weapons(model, img, conf_threshold=0.25, input_size=(640, 640)):
+def detect_weapons(model, img, conf_threshold=0.25, input_size=(INPUT_SIZE, INPUT_SIZE)):
     # Track time
     start_time = time.time()
 
@@ -146,42 +396,130 @@ def detect_weapons(model, img, conf_threshold=0.25, input_size=(640, 640)):
 
     try:
         # Run inference with YOLOv8
-        results = model(resized_img, conf=conf_threshold)
-
-        # Process results
-        detections = []
-        confidence_scores = []
-        class_names = []
+        results = model(resized_img, conf=conf_threshold, imgsz=max(input_size))
 
         # Extract detection results
-        for result in results:
-            boxes = result.boxes
+        detections = [extract_detections(result, conf_threshold) for result in results]
+        detections = np.concatenate(detections) if detections else EMPTY_DETECTIONS
 
-            # Process each detection
-            for i, box in enumerate(boxes):
-                # Get box coordinates (in xyxy format)
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+        proc_time = time.time() - start_time
+        return detections, proc_time
 
-                # Get confidence
-                conf = float(box.conf[0].cpu().numpy())
-                confidence_scores.append(conf)
+    except Exception as e:
+        logging.error(f"Inference error: {e}")
+        raise HTTPException(status_code=500, detail=f"Inference error: {str(e)}")
 
-                # Get class ID and name
-                cls_id = int(box.cls[0].cpu().numpy())
-                class_name = model.names[cls_id]
-                class_names.append(class_name)
 
-                # Format: [x1, y1, x2, y2, score, class_id]
-                detections.append([int(x1), int(y1), int(x2), int(y2), conf, cls_id])
+# Detection function for a batch of images (one forward pass)
+def detect_weapons_batch(model, images, conf_thresholds, input_size=(INPUT_SIZE, INPUT_SIZE)):
+    # Track time
+    start_time = time.time()
+
+    # Resize every image to the expected input size
+    resized_images = [resize_image_to_square(img, input_size) for img in images]
+
+    try:
+        # Run inference once at the lowest requested threshold, then filter per image
+        results = model(resized_images, conf=min(conf_thresholds), imgsz=max(input_size))
 
         proc_time = time.time() - start_time
-        return detections, confidence_scores, class_names, proc_time
+        return [(extract_detections(result, conf_threshold), proc_time)
+                for result, conf_threshold in zip(results, conf_thresholds)]
 
     except Exception as e:
-        logging.error(f"Inference error: {e}")
+        logging.error(f"Batched inference error: {e}")
+        raise HTTPException(status_code=500, detail=f"Inference error: {str(e)}")
+
+
+# Detection function for high-resolution images: overlapping tiles in one batch,
+# boxes returned in original-image coordinates
+def detect_weapons_tiled(model, img, conf_threshold=0.25, tile_size=TILE_SIZE, tile_overlap=TILE_OVERLAP):
+    # Track time
+    start_time = time.time()
+
+    # Convert to RGB if grayscale
+    if len(img.shape) == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+
+    try:
+        detections = detect_tiled(model, img, conf_threshold, tile_size, tile_overlap, TILE_NMS_THRESHOLD)
+
+        proc_time = time.time() - start_time
+        return detections, proc_time
+
+    except Exception as e:
+        logging.error(f"Tiled inference error: {e}")
         raise HTTPException(status_code=500, detail=f"Inference error: {str(e)}")
 
 
+# Count weapons (class 0 is the weapon class)
+def count_weapons(detections):
+    return int(np.count_nonzero(detections[:, 5] == 0))
+
+
+# Class name for every detection, built only when serialising a response
+def detection_class_names(detections, names):
+    return [names.get(int(cls_id), f"Class {int(cls_id)}") for cls_id in detections[:, 5]]
+
+
+# Serialise a detection array for JSON responses
+def detections_to_json(detections, names):
+    boxes = detections[:, :4].astype(np.int32).tolist()
+    scores = detections[:, 4].tolist()
+    class_ids = detections[:, 5].astype(np.int32).tolist()
+    return [
+        {
+            "x1": box[0],
+            "y1": box[1],
+            "x2": box[2],
+            "y2": box[3],
+            "confidence": score,
+            "class_id": class_id,
+            "class_name": names.get(class_id, f"Class {class_id}")
+        } for box, score, class_id in zip(boxes, scores, class_ids)
+    ]
+
+
+# Batch function handed to the micro-batching scheduler; each result also carries the model
+# version that produced it, so a version activated mid-batch only applies to later batches
+def run_detection_batch(images, conf_thresholds):
+    entry = get_active_model()
+    return [(detections, proc_time, entry)
+            for detections, proc_time in detect_weapons_batch(entry.model, images, conf_thresholds)]
+
+
+# Dedicated executor for blocking model calls
+inference_executor = InferenceExecutor(max_workers=INFERENCE_WORKERS, max_queue=INFERENCE_QUEUE_SIZE)
+
+# Shared micro-batching scheduler for /detect/image and /detect/frame
+batcher = InferenceBatcher(run_detection_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS,
+                           executor=inference_executor.executor, max_concurrent_batches=INFERENCE_WORKERS)
+
+
+# Content-hash cache with single-flight de-duplication for /detect/image
+result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL)
+
+
+# Cache key: uploaded bytes, confidence threshold, inference mode and model version
+def result_cache_key(contents, conf_threshold, mode="resize"):
+    digest = hashlib.sha256(contents).hexdigest()
+    return f"{digest}:{conf_threshold:.4f}:{mode}:{model_version()}"
+
+
+# Motion gates for /detect/frame streams, keyed by the client's stream_id
+motion_gates = MotionGateRegistry(max_skip=MOTION_MAX_SKIP)
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc: ExecutorSaturated):
+    logging.warning(f"Rejecting request, inference queue full (retry after {exc.retry_after}s)")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 # Draw bounding boxes on image
 def draw_detections(img, detections, class_names=None):
     # Default colors
@@ -192,8 +530,12 @@ def draw_detections(img, detections, class_names=None):
 
     result_img = img.copy()
 
-    for box in detections:
-        x1, y1, x2, y2, score, class_id = box
+    # Convert coordinates and classes once for the whole array
+    boxes = detections[:, :4].astype(np.int32).tolist()
+    scores = detections[:, 4].tolist()
+    class_ids = detections[:, 5].astype(np.int32).tolist()
+
+    for (x1, y1, x2, y2), score, class_id in zip(boxes, scores, class_ids):
 
         # Get label
         if class_names and class_id in class_names:
@@ -219,38 +561,143 @@ def draw_detections(img, detections, class_names=None):
 
 
 # Save image to disk
-def save_image(image, detection_id):
-    filename = f"{detection_id}.jpg"
+def save_image(image, detection_id, variant=None, quality=95):
+    filename = f"{detection_id}_{variant}.jpg" if variant else f"{detection_id}.jpg"
     filepath = os.path.join(UPLOAD_DIR, filename)
-    cv2.imwrite(filepath, image)
-    return filepath
-
+    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    with open(filepath, "wb") as f:
+        f.write(buffer.tobytes())
+    return filepath, buffer
+
+
+# Decode uploaded image bytes into BGR and RGB arrays
+def decode_image(contents):
+    nparr = np.frombuffer(contents, np.uint8)
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is None:
+        return None, None
+    return img, cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+# Draw and save a detection image and its thumbnail (blocking, run off the event loop).
+# Every encoded variant is made here, once; events and reconnects reuse them without touching the image again
+def render_detection_image(image, detections, names, detection_id):
+    image_with_boxes = draw_detections(image, detections, names)
+    image_path, _ = save_image(image_with_boxes, detection_id)
+
+    height, width = image_with_boxes.shape[:2]
+    scale = min(1.0, THUMBNAIL_SIZE / max(height, width))
+    thumbnail = cv2.resize(image_with_boxes, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA) if scale < 1 else image_with_boxes
+    thumbnail_path, thumbnail_jpeg = save_image(thumbnail, detection_id, "thumbnail", THUMBNAIL_QUALITY)
+
+    # Base64 version of the thumbnail for WebSocket events
+    thumbnail_base64 = base64.b64encode(thumbnail_jpeg).decode("utf-8")
+    return image_path, thumbnail_path, thumbnail_base64
+
+
+# Draw detections on an RGB frame and JPEG-encode it (blocking, run off the event loop)
+def encode_frame_result(img_rgb, detections, names, quality=FRAME_JPEG_QUALITY, scale=1.0):
+    # Shrink before drawing, so a downscaled response costs less to draw and encode
+    height, width = img_rgb.shape[:2]
+    if 0 < scale < 1:
+        width, height = max(1, int(width * scale)), max(1, int(height * scale))
+        img_rgb = cv2.resize(img_rgb, (width, height), interpolation=cv2.INTER_AREA)
+
+    # Boxes are in network-input pixels; map them onto the image being drawn
+    detections = detections.copy()
+    detections[:, [0, 2]] *= width / INPUT_SIZE
+    detections[:, [1, 3]] *= height / INPUT_SIZE
+    result_img = draw_detections(img_rgb, detections, names)
+
+    # Convert back to BGR for encoding
+    result_img_bgr = cv2.cvtColor(result_img, cv2.COLOR_RGB2BGR)
+
+    # Encode image to bytes
+    _, encoded_img = cv2.imencode('.jpg', result_img_bgr, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    return encoded_img
+
+
+# Pre-processing stage of a video job: BGR to RGB, then either the whole frame squashed to the input size or,
+# with a cropper, native-resolution crops of the moving regions (none when nothing moved)
+def prepare_video_frame(frame, cropper=None):
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    if cropper is not None:
+        return cropper.crops(rgb_frame)
+    return [resize_image_to_square(rgb_frame, (INPUT_SIZE, INPUT_SIZE))], [None]
+
+
+# Inference stage of a video job: one forward pass over the inputs of several frames, split back per frame.
+# Boxes of crops are moved to frame coordinates; whole frames keep input-size coordinates like detect_weapons
+def detect_video_batch(model, frames_inputs, frames_offsets, conf_threshold):
+    images = [image for inputs in frames_inputs for image in inputs]
+    if not images:
+        return [EMPTY_DETECTIONS for _ in frames_inputs]
+
+    # Crops are letterboxed by the model; whole frames already have the input size
+    results = model(images, conf=conf_threshold, imgsz=INPUT_SIZE)
+    detections = [extract_detections(result, conf_threshold) for result in results]
+
+    batch = []
+    position = 0
+    for inputs, offsets in zip(frames_inputs, frames_offsets):
+        frame_detections = detections[position:position + len(inputs)]
+        position += len(inputs)
+        if offsets == [None]:
+            batch.append(frame_detections[0])
+        else:
+            batch.append(offset_detections(frame_detections, offsets))
+    return batch
+
+
+# Run dummy batches at every configured input and batch size (blocking, run on the inference executor)
+def warm_up_model(model):
+    timings = {}
+    # Tiled requests feed TILE_SIZE crops to the model, so warm that size up too
+    for size in sorted(set(WARMUP_INPUT_SIZES) | {TILE_SIZE}):
+        for batch_size in WARMUP_BATCH_SIZES:
+            dummy = [np.zeros((size, size, 3), dtype=np.uint8)] * batch_size
+            start = time.perf_counter()
+            for _ in range(max(1, WARMUP_RUNS)):
+                model(dummy, conf=0.25, imgsz=size, verbose=False)
+            timings[f"{size}x{size} batch {batch_size}"] = time.perf_counter() - start
+    return timings
+
+
+# Warm the model up after startup and flip readiness when done
+async def warm_up():
+    global model_ready
+    start = time.perf_counter()
+    try:
+        STARTUP_TIMINGS["warmup_runs"] = await inference_executor.run(
+            model_registry.warm_up, get_active_model().version, warm_up_model
+        )
+    except Exception as e:
+        logging.warning(f"Model warm-up failed: {e}")
+    STARTUP_TIMINGS["warmup"] = time.perf_counter() - start
+    STARTUP_TIMINGS["cold_start"] = time.perf_counter() - STARTUP_BEGIN
+    model_ready = True
 
-# Convert image to base64 string
-def image_to_base64(image):
-    _, buffer = cv2.imencode('.jpg', image)
-    img_str = base64.b64encode(buffer).decode('utf-8')
-    return img_str
+    breakdown = ", ".join(f"{name}={value:.2f}s" for name, value in STARTUP_TIMINGS.items()
+                          if isinstance(value, float))
+    logging.info(f"Ready after {STARTUP_TIMINGS['cold_start']:.2f}s ({breakdown})")
 
 
-# Add detection to history
-async def add_detection_to_history(image, detections, confidence_scores, class_names, source_type, processing_time):
+# Build a detection record and save its annotated image (blocking, run off the event loop)
+def build_detection_record(image, detections, names, source_type, processing_time, model_version=None):
     # Count weapons (first class is typically the weapon class)
-    weapon_count = sum(1 for det in detections if det[5] == 0)
+    weapon_count = count_weapons(detections)
 
     # Generate unique ID
     detection_id = str(uuid.uuid4())
 
     # Save image with detections
     image_path = None
-    image_base64 = None
+    thumbnail_path = None
+    thumbnail_base64 = None
 
     if image is not None:
-        image_with_boxes = draw_detections(image, detections,
-                                           {i: name for i, name in enumerate(class_names)} if class_names else None)
-        image_path = save_image(image_with_boxes, detection_id)
-        # Create base64 version for WebSocket
-        image_base64 = image_to_base64(image_with_boxes)
+        image_path, thumbnail_path, thumbnail_base64 = render_detection_image(image, detections, names, detection_id)
 
     # Create detection record
     detection = {
@@ -258,31 +705,141 @@ async def add_detection_to_history(image, detections, confidence_scores, class_n
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "source_type": source_type,
         "weapon_count": weapon_count,
-        "confidence_scores": confidence_scores,
+        "confidence_scores": detections[:, 4].tolist(),
         "processing_time": processing_time,
         "image_path": image_path,
-        "class_names": class_names,
-        "image_base64": image_base64  # Add base64 image for WebSocket
+        "thumbnail_path": thumbnail_path,
+        "image_url": f"/image/{detection_id}" if image_path else None,
+        "thumbnail_url": f"/image/{detection_id}?variant=thumbnail" if thumbnail_path else None,
+        "class_names": detection_class_names(detections, names),
+        "boxes": compact_detections(detections),
+        "model_version": model_version
     }
+    # The inline thumbnail is only for WebSocket events; the record keeps its path
+    return detection, thumbnail_base64
+
 
-    # Add to history
-    DETECTION_HISTORY.append(detection)
+# Base64 of a saved thumbnail JPEG for a WebSocket event (blocking, run off the event loop)
+def read_thumbnail_base64(detection):
+    path = detection.get("thumbnail_path")
+    if WS_EVENT_IMAGE != "thumbnail" or not path or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
 
-    # Remove base64 from storage to save memory (it's only for real-time display)
-    detection_for_storage = detection.copy()
-    detection_for_storage.pop("image_base64", None)
+
+# WebSocket event for a detection record: metadata, boxes and the thumbnail or just the image URLs
+def detection_event(detection, thumbnail_base64=None):
+    event = {key: value for key, value in detection.items()
+             if key not in ("image_path", "thumbnail_path", "thumbnail_base64")}
+    if WS_EVENT_IMAGE == "thumbnail" and thumbnail_base64:
+        event["thumbnail_base64"] = thumbnail_base64
+    return event
+
+
+# Add detection to history
+async def add_detection_to_history(image, detections, names, source_type, processing_time, model_version=None):
+    detection, thumbnail_base64 = await asyncio.to_thread(
+        build_detection_record, image, detections, names, source_type, processing_time, model_version
+    )
+    return await publish_detection(detection, thumbnail_base64)
+
+
+# Store a detection record in the history and send it to WebSocket clients
+async def publish_detection(detection, thumbnail_base64=None):
+    # Add to history (written to disk in the background)
+    history_store.add(detection)
+
+    # Records from job workers only have the thumbnail file; read it when someone is listening
+    if thumbnail_base64 is None and broadcaster is not None and len(broadcaster):
+        thumbnail_base64 = await asyncio.to_thread(read_thumbnail_base64, detection)
 
     # Broadcast to all connected clients
-    await broadcast_detection(detection)
+    broadcast_detection(detection_event(detection, thumbnail_base64))
 
-    return detection_for_storage
+    return detection
+
+
+# Publish the weapon frames found by video job workers, which cannot reach this process' history
+async def relay_job_detections():
+    seq = await asyncio.to_thread(job_store.last_detection_seq)
+    while True:
+        try:
+            rows = await asyncio.to_thread(job_store.detections_since, seq)
+            # Job workers already made the thumbnail
+            for seq, _, detection in rows:
+                await publish_detection(detection)
+        except Exception as e:
+            logging.error(f"Error relaying job detections: {e}")
+            rows = []
+        if not rows:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+# Replace dead job workers and requeue jobs whose worker stopped sending heartbeats. Other API processes may
+# share the job table, so only the heartbeat decides, never which pool claimed the job
+async def watch_job_heartbeats():
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+        try:
+            job_pool.ensure_workers()
+            requeued = await asyncio.to_thread(job_store.recover_interrupted, None, JOB_HEARTBEAT_TIMEOUT)
+            if requeued:
+                logging.warning(f"Requeued {len(requeued)} video jobs without a worker heartbeat")
+        except Exception as e:
+            logging.error(f"Error checking job workers: {e}")
 
 
 # API endpoints
 @app.on_event("startup")
 async def startup_event():
+    global model_ready, broadcaster, history_store, job_store, job_pool
+
+    broadcaster = Broadcaster(queue_size=WS_QUEUE_SIZE, policy=WS_SLOW_CLIENT_POLICY, send_timeout=WS_SEND_TIMEOUT)
+    history_store = await asyncio.to_thread(HistoryStore, HISTORY_DB_PATH, HISTORY_HOT_SIZE, HISTORY_FLUSH_INTERVAL)
+    job_store = await asyncio.to_thread(JobStore, JOB_DB_PATH)
+    job_pool = JobWorkerPool(JOB_DB_PATH, f"{JOB_MODULE}:run_video_job", workers=VIDEO_WORKERS,
+                             poll_interval=JOB_POLL_INTERVAL, heartbeat_interval=JOB_HEARTBEAT_INTERVAL)
+
+    # Start the micro-batching scheduler
+    batcher.start()
+    logging.info(f"Micro-batching enabled: max_batch_size={BATCH_MAX_SIZE}, max_wait_ms={BATCH_MAX_WAIT_MS}")
+    logging.info(f"Inference executor: workers={INFERENCE_WORKERS}, queue_size={INFERENCE_QUEUE_SIZE}")
+
+    # Jobs that were running when the server went down go back to the queue once their heartbeat is stale
+    requeued = await asyncio.to_thread(job_store.recover_interrupted, job_pool.instance_id, JOB_HEARTBEAT_TIMEOUT)
+    if requeued:
+        logging.info(f"Requeued {len(requeued)} interrupted video jobs")
+    job_pool.start()
+    app.state.job_relay_task = asyncio.create_task(relay_job_detections())
+    app.state.job_watch_task = asyncio.create_task(watch_job_heartbeats())
+    logging.info(f"Video job workers: {VIDEO_WORKERS}, job store: {JOB_DB_PATH}")
+
+    if not PRELOAD_MODEL:
+        # The model loads on the first detection request instead
+        model_ready = True
+        logging.info("Model preloading disabled")
+        return
+
     # Load model on startup
-    get_model()
+    get_active_model()
+
+    # Warm up in the background so /health answers right away; /ready waits for it
+    app.state.warmup_task = asyncio.create_task(warm_up())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for name in ("job_relay_task", "job_watch_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    # Running jobs are handed back to the queue and restart with the next server
+    await asyncio.to_thread(job_pool.stop)
+    await broadcaster.close()
+    await batcher.stop()
+    inference_executor.shutdown()
+    await asyncio.to_thread(history_store.close)
 
 
 @app.get("/")
@@ -292,66 +849,222 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model_loaded": model is not None}
+    active = model_registry.active
+    return {"status": "healthy", "model_loaded": active is not None, "model_ready": model_ready,
+            "model_backend": active.backend if active else None,
+            "model_version": active.version if active else None}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 only once the model is loaded and warmed up"""
+    if not model_ready:
+        return JSONResponse(status_code=503, content={"ready": False,
+                                                     "model_loaded": model_registry.active is not None})
+    return {"ready": True}
+
+
+@app.get("/startup")
+async def startup_timings():
+    """Cold-start breakdown: import time per heavy dependency, weight load and warm-up"""
+    return {
+        "ready": model_ready,
+        "timings": STARTUP_TIMINGS,
+        "tuning": {
+            "profile": AUTOTUNE_PROFILE if TUNED else None,
+            "backend": MODEL_BACKEND,
+            "intra_op_threads": INTRA_OP_THREADS,
+            "inter_op_threads": INTER_OP_THREADS,
+            "inference_workers": INFERENCE_WORKERS,
+            "input_size": INPUT_SIZE
+        }
+    }
+
+
+@app.get("/stats/batching")
+async def batching_stats():
+    """Batch sizes and per-request latency of the micro-batching scheduler"""
+    return batcher.stats()
+
+
+@app.get("/stats/executor")
+async def executor_stats():
+    """Occupancy and admission counters of the inference executor"""
+    return inference_executor.stats()
+
+
+@app.get("/stats/motion")
+async def motion_stats():
+    """Share of frames the motion gate answered without running the model"""
+    return {
+        "streams": motion_gates.stats(),
+        "video_jobs": {job["id"]: (job["progress"] or {}).get("motion")
+                       for job in await asyncio.to_thread(job_store.list, None, 20)}
+    }
+
+
+@app.get("/stats/websocket")
+async def websocket_stats():
+    """Outbound queue depth, drops and delivery lag of every WebSocket client"""
+    return broadcaster.stats()
+
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """Size and hit rate of the /detect/image result cache"""
+    return result_cache.stats()
 
 
 @app.get("/model/info")
-async def model_info(model=Depends(get_model)):
+async def model_info(entry=Depends(get_active_model)):
     try:
         return {
-            "class_names": model.names,
-            "model_path": MODEL_PATH
+            "class_names": entry.model.names,
+            "model_path": entry.path,
+            "backend": entry.backend,
+            "precision": entry.precision,
+            "requested_precision": entry.requested_precision,
+            "version": entry.version
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting model info: {str(e)}")
 
 
+# Look up a loaded model version or answer 404
+def registry_entry(version):
+    try:
+        return model_registry.get(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/models")
+async def list_models():
+    """Loaded model versions with their memory footprint; one of them is active"""
+    active = model_registry.active
+    return {"active": active.version if active else None, "models": model_registry.list()}
+
+
+@app.post("/models/load")
+async def load_model_version(request: ModelLoadRequest):
+    """Load (and by default warm up) a model version next to the active one, optionally activating it"""
+    if not os.path.exists(request.path):
+        raise HTTPException(status_code=404, detail=f"Model file not found: {request.path}")
+
+    # Loading and warm-up run on their own thread so the active model keeps serving
+    try:
+        entry = await asyncio.to_thread(model_registry.load, request.version, request.path, request.backend,
+                                        request.precision, request.onnx_path)
+        if request.warm_up and not entry.warmed_up:
+            await asyncio.to_thread(model_registry.warm_up, entry.version, warm_up_model)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Failed to load model version {request.version}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
+
+    if request.activate:
+        model_registry.activate(entry.version)
+    return {**entry.summary(), "active": entry is model_registry.active}
+
+
+@app.post("/models/{version}/warmup")
+async def warm_up_model_version(version: str):
+    entry = registry_entry(version)
+    timings = await asyncio.to_thread(model_registry.warm_up, entry.version, warm_up_model)
+    return {"version": version, "warmup_time": entry.warmup_time, "runs": timings}
+
+
+@app.post("/models/{version}/activate")
+async def activate_model_version(version: str):
+    """Switch new requests to this version; requests already running finish on the previous one"""
+    entry = registry_entry(version)
+    if not entry.warmed_up:
+        await asyncio.to_thread(model_registry.warm_up, entry.version, warm_up_model)
+    model_registry.activate(version)
+    return {"active": version, "model": entry.summary()}
+
+
+@app.delete("/models/{version}")
+async def unload_model_version(version: str):
+    registry_entry(version)
+    try:
+        model_registry.unload(version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": f"Model version {version} unloaded"}
+
+
 @app.post("/detect/image", response_model=DetectionResult)
 async def detect_image(
         file: UploadFile = File(...),
-        conf_threshold: float = Form(0.25)
+        conf_threshold: float = Form(0.25),
+        tiled: bool = Form(False),
+        tile_size: int = Form(TILE_SIZE),
+        tile_overlap: float = Form(TILE_OVERLAP)
 ):
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image files are allowed")
 
     # Load model
-    model = get_model()
+    get_active_model()
 
     try:
         # Read image
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        if img is None:
-            raise HTTPException(status_code=400, detail="Invalid image file")
-
-        # Convert from BGR to RGB
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        # Detect weapons
-        detections, confidence_scores, class_names, proc_time = detect_weapons(
-            model, img_rgb, conf_threshold
+        start_time = time.perf_counter()
+        mode = f"tiled-{tile_size}-{tile_overlap:.2f}" if tiled else "resize"
+
+        async def run_detection():
+            # Only requests that miss the cache take an inference slot
+            with inference_executor.admit():
+                img, img_rgb = await asyncio.to_thread(decode_image, contents)
+
+                if img is None:
+                    raise HTTPException(status_code=400, detail="Invalid image file")
+
+                if tiled:
+                    # Slice the full-resolution image; the tiles form their own batch
+                    entry = get_active_model()
+                    detections, proc_time = await inference_executor.run(
+                        detect_weapons_tiled, entry.model, img_rgb, conf_threshold, tile_size, tile_overlap
+                    )
+                    latency = {"latency_ms": (time.perf_counter() - start_time) * 1000.0}
+                else:
+                    # Detect weapons (batched with other concurrent requests)
+                    (detections, proc_time, entry), latency = await batcher.submit(img_rgb, conf_threshold)
+
+            # Add to history if weapons detected
+            if count_weapons(detections) > 0:  # Assuming class 0 is weapon
+                detection = await add_detection_to_history(
+                    img, detections, entry.model.names, "Image Upload", proc_time, entry.version
+                )
+                return {**detection, "latency": latency}
+
+            # If no weapons, return result without adding to history
+            return {
+                "id": str(uuid.uuid4()),
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "source_type": "Image Upload",
+                "weapon_count": 0,
+                "confidence_scores": detections[:, 4].tolist(),
+                "processing_time": proc_time,
+                "class_names": detection_class_names(detections, entry.model.names),
+                "latency": latency,
+                "model_version": entry.version
+            }
+
+        # Identical uploads share one inference and reuse its result until it expires
+        result, cache_hit = await result_cache.get_or_compute(
+            result_cache_key(contents, conf_threshold, mode), run_detection
         )
+        if cache_hit:
+            result["cached"] = True
+            result["latency"] = {"latency_ms": (time.perf_counter() - start_time) * 1000.0}
+        return result
 
-        # Add to history if weapons detected
-        if any(det[5] == 0 for det in detections):  # Assuming class 0 is weapon
-            detection = await add_detection_to_history(
-                img, detections, confidence_scores, class_names, "Image Upload", proc_time
-            )
-            return detection
-
-        # If no weapons, return result without adding to history
-        return {
-            "id": str(uuid.uuid4()),
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "source_type": "Image Upload",
-            "weapon_count": 0,
-            "confidence_scores": confidence_scores,
-            "processing_time": proc_time,
-            "class_names": class_names
-        }
-
+    except (HTTPException, ExecutorSaturated):
+        raise
     except Exception as e:
         logging.error(f"Error processing image: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
@@ -359,11 +1072,23 @@ async def detect_image(
 
 @app.post("/detect/video/upload", response_model=Dict[str, Any])
 async def detect_video(
-        background_tasks: BackgroundTasks,
         file: UploadFile = File(...),
         conf_threshold: float = Form(0.25),
-        frame_skip: int = Form(2)
+        frame_skip: int = Form(2),
+        sample_fps: Optional[float] = Form(VIDEO_SAMPLE_FPS or None),
+        parallelism: Optional[int] = Form(None),
+        motion_threshold: float = Form(MOTION_THRESHOLD),
+        tracking: bool = Form(VIDEO_TRACKING),
+        adaptive_skip: bool = Form(False),
+        target_rtf: Optional[float] = Form(None),
+        target_fps: Optional[float] = Form(None),
+        foreground: bool = Form(FOREGROUND_CROPPING)
 ):
+    """Upload a video as a multipart form (kept for existing form-based clients).
+
+    The form body is spooled by the framework and then copied to the job's file, so the video is
+    written twice; /detect/video/stream takes the raw body and writes it once, as it arrives.
+    """
     if not file.content_type.startswith("video/"):
         raise HTTPException(status_code=400, detail="Only video files are allowed")
 
@@ -371,24 +1096,35 @@ async def detect_video(
     job_id = str(uuid.uuid4())
     temp_file_path = os.path.join(UPLOAD_DIR, f"temp_{job_id}.mp4")
 
+    # The job runs on the model version that is active now, even if another one is activated later
+    entry = get_active_model()
+
     try:
         # Save uploaded file to temp location
         with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Start background processing
-        background_tasks.add_task(
-            process_video_file,
-            temp_file_path,
-            job_id,
-            conf_threshold,
-            frame_skip
-        )
+            await asyncio.to_thread(shutil.copyfileobj, file.file, buffer)
+
+        # Queue the job; a video worker process picks it up when one is free
+        await asyncio.to_thread(job_store.create, job_id, "video", temp_file_path, {
+            "conf_threshold": conf_threshold,
+            "frame_skip": frame_skip,
+            "sample_fps": sample_fps,
+            "parallelism": parallelism,
+            "motion_threshold": motion_threshold,
+            "tracking": tracking,
+            "adaptive_skip": adaptive_skip,
+            "target_rtf": target_rtf,
+            "target_fps": target_fps,
+            "foreground": foreground,
+            "model": {"version": entry.version, "path": entry.path, "backend": entry.requested_backend,
+                      "precision": entry.precision}
+        })
 
         return {
             "job_id": job_id,
-            "status": "processing",
-            "message": "Video processing started"
+            "status": QUEUED,
+            "status_url": f"/jobs/{job_id}",
+            "message": "Video processing queued"
         }
 
     except Exception as e:
@@ -399,136 +1135,485 @@ async def detect_video(
         raise HTTPException(status_code=500, detail=f"Error uploading video: {str(e)}")
 
 
-async def process_video_file(file_path, job_id, conf_threshold, frame_skip):
-    # Load model
-    model = get_model()
+# Write one chunk of a streamed upload and make it visible to a worker following the file
+def write_upload_chunk(f, data):
+    f.write(data)
+    f.flush()
+
+
+@app.post("/detect/video/stream", response_model=Dict[str, Any])
+async def detect_video_stream(
+        request: Request,
+        conf_threshold: float = 0.25,
+        frame_skip: int = 2,
+        sample_fps: Optional[float] = VIDEO_SAMPLE_FPS or None,
+        fps: Optional[float] = None,
+        motion_threshold: float = MOTION_THRESHOLD,
+        tracking: bool = VIDEO_TRACKING,
+        adaptive_skip: bool = False,
+        target_rtf: Optional[float] = None,
+        target_fps: Optional[float] = None,
+        foreground: bool = FOREGROUND_CROPPING,
+        parallelism: Optional[int] = None
+):
+    """Upload a video as the raw request body, written to disk chunk by chunk without a separate copy.
+
+    MJPEG bodies (video/x-motion-jpeg, video/mjpeg, multipart/x-mixed-replace) are queued at once and
+    processed while they arrive; pass ``fps`` for time-based sampling. Any other video type (including
+    fragmented MP4, which OpenCV cannot read while it grows) is queued right after the last byte.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    stream_format = STREAMABLE_TYPES.get(content_type)
+    if stream_format is None and not content_type.startswith("video/"):
+        raise HTTPException(status_code=400, detail="Only video files are allowed")
 
-    # Process video file
+    job_id = str(uuid.uuid4())
+    temp_file_path = os.path.join(UPLOAD_DIR, f"temp_{job_id}.{stream_format or 'mp4'}")
+    part_path = partial_path(temp_file_path)
+
+    entry = get_active_model()
+    params = {
+        "conf_threshold": conf_threshold,
+        "frame_skip": frame_skip,
+        "sample_fps": sample_fps,
+        "fps": fps,
+        "stream_format": stream_format,
+        "motion_threshold": motion_threshold,
+        "tracking": tracking,
+        "adaptive_skip": adaptive_skip,
+        "target_rtf": target_rtf,
+        "target_fps": target_fps,
+        "foreground": foreground,
+        "parallelism": parallelism,
+        "model": {"version": entry.version, "path": entry.path, "backend": entry.requested_backend,
+                  "precision": entry.precision}
+    }
+
+    buffer = await asyncio.to_thread(open, part_path, "wb")
+    received = 0
     try:
-        video_cap = cv2.VideoCapture(file_path)
+        # A streamable upload is queued before its first byte; the worker follows the file as it grows
+        if stream_format:
+            await asyncio.to_thread(job_store.create, job_id, "video", temp_file_path, params)
+
+        pending = bytearray()
+        async for chunk in request.stream():
+            pending += chunk
+            received += len(chunk)
+            if len(pending) >= VIDEO_UPLOAD_CHUNK_SIZE:
+                await asyncio.to_thread(write_upload_chunk, buffer, bytes(pending))
+                pending.clear()
+        if pending:
+            await asyncio.to_thread(write_upload_chunk, buffer, bytes(pending))
+        await asyncio.to_thread(buffer.close)
+
+        # The rename tells a following worker that the upload is complete
+        os.replace(part_path, temp_file_path)
+        status = QUEUED
+        if not stream_format:
+            await asyncio.to_thread(job_store.create, job_id, "video", temp_file_path, params)
+        else:
+            # The job may already be running, or have been cancelled while the upload was running
+            job = await asyncio.to_thread(job_store.get, job_id)
+            status = job["status"] if job is not None else status
+            if status in FINAL_STATES and os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+
+        return {
+            "job_id": job_id,
+            "status": status,
+            "status_url": f"/jobs/{job_id}",
+            "bytes_received": received,
+            "streamed": stream_format is not None,
+            "message": "Video processing queued"
+        }
 
-        if not video_cap.isOpened():
-            logging.error(f"Could not open video file: {file_path}")
-            return
+    except Exception as e:
+        logging.error(f"Error receiving video stream: {e}")
+        buffer.close()
+        if stream_format:
+            await asyncio.to_thread(job_store.request_cancel, job_id)
+        for path in (part_path, temp_file_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise HTTPException(status_code=500, detail=f"Error receiving video stream: {str(e)}")
+
+
+# Process frames [start_frame, end_frame) of a job's video, by default all of it (blocking, runs in a video
+# worker process or in one of its segment processes)
+def process_video_segment(job, start_frame=0, end_frame=None):
+    params = job.params
+    conf_threshold = params.get("conf_threshold", 0.25)
+    frame_skip = max(1, int(params.get("frame_skip", 2)))
+
+    # Load the model version the job was submitted with (kept loaded for the next jobs of this worker)
+    spec = params.get("model") or {}
+    entry = model_registry.load(spec.get("version", DEFAULT_MODEL_VERSION), spec.get("path", MODEL_PATH),
+                                spec.get("backend", MODEL_BACKEND), spec.get("precision", MODEL_PRECISION))
+    model = entry.model
+
+    # Skip inference on sampled frames that barely changed since the last inferred one
+    gate = MotionGate(threshold=params.get("motion_threshold", MOTION_THRESHOLD), max_skip=MOTION_MAX_SKIP)
+
+    # Background model of this video's camera, so only moving regions reach the detector
+    cropper = None
+    if params.get("foreground", FOREGROUND_CROPPING):
+        cropper = ForegroundCropper(history=FOREGROUND_HISTORY, max_coverage=FOREGROUND_MAX_COVERAGE)
+
+    # Carry boxes across the frames between keyframes; a track survives at least one missed keyframe
+    tracker = None
+    if params.get("tracking", VIDEO_TRACKING):
+        tracker = SortTracker(max_age=max(TRACK_MAX_AGE, 2 * frame_skip))
+        # Track frames are numbered in the whole video
+        tracker.frame_index = start_frame - 1
+
+    video_cap = open_video(job.file_path, params.get("stream_format"), params.get("fps"), VIDEO_STREAM_TIMEOUT)
+    if not video_cap.isOpened():
+        raise RuntimeError("Could not open video file")
+
+    try:
+        video_frames = int(video_cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        if end_frame is None:
+            end_frame = video_frames
+        total_frames = end_frame - start_frame if end_frame is not None else None
+
+        # Adaptive mode picks the stride from measured inference time instead of a fixed frame_skip
+        controller = None
+        if params.get("adaptive_skip"):
+            target_rtf, target_fps = params.get("target_rtf"), params.get("target_fps")
+            controller = AdaptiveStride(video_cap.get(cv2.CAP_PROP_FPS),
+                                        target_rtf if target_rtf or target_fps else 1.0, target_fps,
+                                        initial_stride=frame_skip, max_stride=ADAPTIVE_MAX_STRIDE)
+
+        # Keyframes are planned up front from the frame rate: sample_fps per second of video, or every
+        # frame_skip frames. Adaptive mode changes the stride as it goes, so it has no fixed plan
+        sample_fps = params.get("sample_fps")
+        video_fps = video_cap.get(cv2.CAP_PROP_FPS)
+        plan = None
+        stride = frame_skip
+        if controller is None:
+            plan = plan_frames(video_frames or 0, video_fps, sample_fps, frame_skip)
+            # Streams of unknown length still sample by video time when the frame rate is known
+            if plan is None and sample_fps and video_fps:
+                stride = max(1, round(video_fps / sample_fps))
+        sampler = FrameSampler(video_cap, plan, stride=stride, seek_threshold=VIDEO_SEEK_THRESHOLD,
+                               start=start_frame, end=end_frame)
 
         frame_count = 0
+        weapon_frame_count = 0
         weapon_frames = []
+        tracked_frames = 0
+        tracks = None
+        current_stride = frame_skip
+
+        # Decode: walk every frame in order but only decode fully the keyframes; keep pixels for those the
+        # model sees
+        def decode():
+            nonlocal current_stride
+            for frame_index, frame in sampler:
+                if controller is not None:
+                    controller.observe_read(sampler.last_read_time)
+
+                # Process the sampled frames, unless the scene has not changed
+                keyframe = frame is not None
+                infer = keyframe and gate.check(frame, frame_index)
+                stride = None
+                if keyframe:
+                    if controller is not None:
+                        sampler.stride = max(1, controller.stride)
+                    next_index = sampler.next_index
+                    stride = next_index - frame_index if next_index is not None else sampler.stride
+                    current_stride = stride
+
+                yield {"index": frame_index, "keyframe": keyframe, "infer": infer, "stride": stride,
+                       "frame": frame if infer else None}
+
+        # Pre-process: colour conversion and resizing (or foreground crops) for the frames the model sees
+        def preprocess(item):
+            if item["infer"]:
+                start = time.perf_counter()
+                item["inputs"], item["offsets"] = prepare_video_frame(item["frame"], cropper)
+                item["proc_time"] = time.perf_counter() - start
+            return item
+
+        # Infer: frames that are already waiting share one forward pass
+        def infer(batch):
+            frames = [item for item in batch if item["infer"]]
+            if frames:
+                start = time.perf_counter()
+                detections = detect_video_batch(model, [item["inputs"] for item in frames],
+                                                 [item["offsets"] for item in frames], conf_threshold)
+                elapsed = time.perf_counter() - start
+
+                # Each frame is charged its share of the pass, so the stride follows the per-frame cost
+                images = sum(len(item["inputs"]) for item in frames)
+                for item, frame_detections in zip(frames, detections):
+                    item["detections"] = frame_detections
+                    if images:
+                        item["proc_time"] += elapsed * len(item["inputs"]) / images
+                    del item["inputs"]
+                    if controller is not None:
+                        controller.observe(item["proc_time"], item["index"])
+            return batch
+
+        # Track: gate results, tracker and counters, strictly in frame order
+        def track(item):
+            nonlocal frame_count, weapon_frame_count, tracked_frames, tracks
+            evidence = None
+            if item["infer"]:
+                detections = item["detections"]
+                gate.update(detections, item["index"])
+                tracks = tracker.update(detections) if tracker else None
 
-        # Process frames
-        while video_cap.isOpened():
-            ret, frame = video_cap.read()
+                # Check if weapons detected (assume class 0 is weapon)
+                if count_weapons(detections) > 0:
+                    weapon_frame_count += 1
+                    evidence = item
+
+            elif tracker is not None:
+                # Unchanged keyframes reuse the last result, the frames in between only propagate the tracks
+                if item["keyframe"] and gate.last_result is not None:
+                    tracks = tracker.update(gate.last_result)
+                else:
+                    tracks = tracker.predict()
+
+            if tracker is not None and count_weapons(tracks) > 0:
+                tracked_frames += 1
+
+            if item["keyframe"] and tracker is not None:
+                tracker.max_age = max(TRACK_MAX_AGE, 2 * item["stride"])
+
+            frame_count = item["index"] + 1 - start_frame
+
+            # Throttled progress write; raises if the job was cancelled or the worker is stopping
+            job.progress(frame_count, total_frames, weapon_frames=weapon_frame_count, tracked_frames=tracked_frames,
+                         motion=gate.stats(),
+                         current_stride=current_stride,
+                         foreground_regions=cropper.stats() if cropper is not None else None,
+                         pipeline=pipeline.stats())
+            return evidence
+
+        # Evidence: draw and save significant frames; the API process publishes them to history and WebSocket
+        def save_evidence(item):
+            detection, _ = build_detection_record(item["frame"], item["detections"], model.names, "Video Upload",
+                                                  item["proc_time"], entry.version)
+            job.add_detection(detection)
+            weapon_frames.append(detection["id"])
+
+        pipeline = StagedPipeline(decode(), [Stage("preprocess", preprocess),
+                                             Stage("inference", infer, batch_size=VIDEO_BATCH_SIZE),
+                                             Stage("tracking", track),
+                                             Stage("evidence", save_evidence)],
+                                  queue_size=VIDEO_QUEUE_SIZE, source_name="decode")
+        pipeline.run()
+    finally:
+        video_cap.release()
 
-            if not ret:
-                break
+    pipeline_stats = pipeline.stats()
+    logging.info(f"Video processing complete. Job ID: {job.job_id}, Frames: {start_frame}-{start_frame + frame_count}, "
+                 f"Weapons found in {len(weapon_frames)} frames, "
+                 f"tracked in {tracked_frames}/{frame_count} frames, "
+                 f"motion gate skipped {gate.skipped}/{gate.frames} sampled frames, "
+                 f"pipeline bottleneck: {pipeline_stats['bottleneck']}")
+    return {
+        "model_version": entry.version,
+        "frames": frame_count,
+        "weapon_frames": len(weapon_frames),
+        "weapon_detection_ids": weapon_frames,
+        "tracked_frames": tracked_frames,
+        "tracks": tracker.summary() if tracker is not None else None,
+        "stride_control": controller.summary() if controller is not None else None,
+        "sampling": {"sample_fps": sample_fps,
+                     "planned_frames": (sum(start_frame <= index < (end_frame or index + 1) for index in plan)
+                                        if plan is not None else None),
+                     **sampler.stats()},
+        "pipeline": pipeline_stats
+    }
 
-            # Process every N frames
-            if frame_count % frame_skip == 0:
-                # Convert from BGR to RGB
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-                # Resize frame for processing
-                rgb_frame = resize_image_to_square(rgb_frame)
+# Process one queued video (blocking, runs in a video worker process; see jobs.py). With more than one segment
+# worker, videos long enough are split into time segments processed in parallel (see segments.py)
+def run_video_job(job):
+    # A stream that is still being uploaded has no known length to split
+    if job.params.get("stream_format"):
+        return process_video_segment(job)
+
+    video_cap = cv2.VideoCapture(job.file_path)
+    if not video_cap.isOpened():
+        raise RuntimeError("Could not open video file")
+    total_frames = int(video_cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    fps = video_cap.get(cv2.CAP_PROP_FPS) or 30.0
+    video_cap.release()
+
+    parallelism = max(1, int(job.params.get("parallelism") or VIDEO_SEGMENT_WORKERS))
+    ranges = split_segments(total_frames, parallelism, int(VIDEO_MIN_SEGMENT_SECONDS * fps))
+    if len(ranges) == 1:
+        return process_video_segment(job)
+
+    # The segment processes share the cores instead of each using all of them
+    threads = INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // len(ranges))
+    logging.info(f"Video job {job.job_id}: {len(ranges)} segments of ~{total_frames // len(ranges)} frames, "
+                 f"{threads} inference threads each")
+    results = run_segments(job, f"{JOB_MODULE}:process_video_segment", ranges, len(ranges), threads, total_frames)
+    return merge_segment_results(results, ranges)
+
+
+# Combine the results of a video's segments, in timestamp order
+def merge_segment_results(results, ranges):
+    tracks = None
+    if results[0]["tracks"] is not None:
+        tracks = [{**track, "segment": index} for index, result in enumerate(results) for track in result["tracks"]]
+    return {
+        "model_version": results[0]["model_version"],
+        "frames": sum(result["frames"] for result in results),
+        "weapon_frames": sum(result["weapon_frames"] for result in results),
+        "weapon_detection_ids": [id for result in results for id in result["weapon_detection_ids"]],
+        "tracked_frames": sum(result["tracked_frames"] for result in results),
+        "tracks": tracks,
+        "segments": [{"start_frame": start, "end_frame": end, "frames": result["frames"],
+                      "weapon_frames": result["weapon_frames"], "stride_control": result["stride_control"],
+                      "sampling": result["sampling"], "pipeline": result["pipeline"]}
+                     for (start, end), result in zip(ranges, results)]
+    }
 
-                # Detect weapons
-                detections, confidence_scores, class_names, proc_time = detect_weapons(
-                    model, rgb_frame, conf_threshold
-                )
 
-                # Check if weapons detected (assume class 0 is weapon)
-                if any(det[5] == 0 for det in detections):
-                    # Save significant frame
-                    detection = await add_detection_to_history(
-                        frame, detections, confidence_scores, class_names,
-                        "Video Upload", proc_time
-                    )
-                    weapon_frames.append(detection)
+# Public view of a stored job
+def job_response(job):
+    return {"job_id": job["id"], **{key: value for key, value in job.items() if key != "id"}}
 
-            frame_count += 1
 
-        # Clean up
-        video_cap.release()
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Most recent jobs, optionally filtered by status, with the queue counts and worker pool state"""
+    jobs = await asyncio.to_thread(job_store.list, status, limit)
+    counts = await asyncio.to_thread(job_store.counts)
+    return {"counts": counts, "workers": job_pool.stats(), "jobs": [job_response(job) for job in jobs]}
 
-        # Update job status in a real app, you'd store this in a database
-        logging.info(f"Video processing complete. Job ID: {job_id}, Weapons found in {len(weapon_frames)} frames")
 
-        # Clean up temp file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress (frames, frames/s, ETA), motion/tracking statistics and results of a job"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued job, or ask the worker running it to stop"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in FINAL_STATES:
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+
+    status = await asyncio.to_thread(job_store.request_cancel, job_id)
+    # Queued jobs never reach a worker, so their upload is removed here
+    if status in FINAL_STATES and job["file_path"] and os.path.exists(job["file_path"]):
+        os.remove(job["file_path"])
+    return {"job_id": job_id, "status": status, "cancel_requested": True}
 
-    except Exception as e:
-        logging.error(f"Error processing video: {e}")
-        # Clean up temp file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+
+@app.get("/detect/video/{job_id}")
+async def get_video_job(job_id: str):
+    """Progress, motion-gate statistics and weapon tracks of a video processing job"""
+    return await get_job(job_id)
 
 
 @app.post("/detect/frame")
 async def detect_frame(
         file: UploadFile = File(...),
-        conf_threshold: float = Form(0.25)
+        conf_threshold: float = Form(0.25),
+        stream_id: Optional[str] = Form(None),
+        motion_threshold: float = Form(MOTION_THRESHOLD),
+        response_mode: str = Form("json"),
+        jpeg_quality: int = Form(FRAME_JPEG_QUALITY),
+        downscale: float = Form(FRAME_ANNOTATED_SCALE)
 ):
-    """Endpoint for processing individual frames (for webcam streaming)"""
+    """Endpoint for processing individual frames (for webcam streaming).
+
+    ``response_mode`` picks the reply: "json" (detections only, the default),
+    "binary" (the detection array packed by ``frame_protocol.pack_detections``)
+    or "annotated" (a JPEG with the boxes drawn, at ``jpeg_quality`` and scaled
+    by ``downscale``). Binary and annotated replies carry the counts in headers.
+
+    JSON and binary boxes are in network-input pixels (``input_size`` / the
+    X-Input-Size header, the frame squashed to a square); the client scales them
+    to its frame. ``/ws/frames`` replies are already scaled to the sent frame.
+    """
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image files are allowed")
+    if response_mode not in ("json", "binary", "annotated"):
+        raise HTTPException(status_code=400, detail="response_mode must be json, binary or annotated")
+    if not 1 <= jpeg_quality <= 100 or not 0 < downscale <= 1:
+        raise HTTPException(status_code=400, detail="jpeg_quality must be 1-100 and downscale in (0, 1]")
 
     # Load model
-    model = get_model()
+    entry = get_active_model()
 
     try:
         # Read image
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        img, img_rgb = await asyncio.to_thread(decode_image, contents)
 
         if img is None:
             raise HTTPException(status_code=400, detail="Invalid image file")
 
-        # Convert from BGR to RGB
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        # Frames of a stream that barely changed reuse the previous result (a threshold of 0 turns this off)
+        gate = motion_gates.get(stream_id, motion_threshold) if stream_id and motion_threshold > 0 else None
+        run_model = gate is None or await asyncio.to_thread(gate.check, img)
 
-        # Detect weapons
-        detections, confidence_scores, class_names, proc_time = detect_weapons(
-            model, img_rgb, conf_threshold
-        )
-
-        # Draw detections on image
-        result_img = draw_detections(img_rgb, detections,
-                                     {i: name for i, name in enumerate(class_names)} if class_names else None)
-
-        # Convert back to BGR for encoding
-        result_img_bgr = cv2.cvtColor(result_img, cv2.COLOR_RGB2BGR)
-
-        # Encode image to bytes
-        _, encoded_img = cv2.imencode('.jpg', result_img_bgr)
+        if run_model:
+            # Detect weapons (batched with other concurrent requests)
+            with inference_executor.admit():
+                (detections, proc_time, entry), latency = await batcher.submit(img_rgb, conf_threshold)
+        else:
+            detections, proc_time, latency = gate.last_result, 0.0, None
 
         # Count weapons (assume class 0 is weapon)
-        weapon_count = sum(1 for det in detections if det[5] == 0)
+        weapon_count = count_weapons(detections)
 
-        # If weapons detected, save to history
-        if weapon_count > 0:
+        # If weapons detected, save to history (once per inference, not for reused results)
+        if weapon_count > 0 and run_model:
             await add_detection_to_history(
-                img, detections, confidence_scores, class_names, "Webcam", proc_time
+                img, detections, entry.model.names, "Webcam", proc_time, entry.version
             )
 
-        # Return result as JSON with base64 image
+        # Only a frame whose result was stored becomes the gate's reference
+        if gate is not None and run_model:
+            gate.update(detections)
+
+        headers = {
+            "X-Weapon-Count": str(weapon_count),
+            "X-Processing-Time": f"{proc_time:.6f}",
+            "X-Model-Version": entry.version if run_model else "",
+            "X-Reused-Result": str(not run_model).lower(),
+            "X-Input-Size": str(INPUT_SIZE),
+        }
+        if response_mode == "binary":
+            return Response(content=pack_detections(detections), media_type="application/octet-stream",
+                            headers=headers)
+        if response_mode == "annotated":
+            # Draw detections on the image and encode it (only when the client asks for it)
+            encoded_img = await asyncio.to_thread(encode_frame_result, img_rgb, detections, entry.model.names,
+                                                  jpeg_quality, downscale)
+            return Response(content=encoded_img.tobytes(), media_type="image/jpeg", headers=headers)
+
+        # Boxes only; the client draws them on its own frame
         return {
             "weapon_count": weapon_count,
-            "confidence_scores": confidence_scores,
+            "confidence_scores": detections[:, 4].tolist(),
             "processing_time": proc_time,
-            "detections": [
-                {
-                    "x1": int(det[0]),
-                    "y1": int(det[1]),
-                    "x2": int(det[2]),
-                    "y2": int(det[3]),
-                    "confidence": float(det[4]),
-                    "class_id": int(det[5]),
-                    "class_name": class_names[i] if i < len(class_names) else f"Class {det[5]}"
-                } for i, det in enumerate(detections)
-            ],
-            "image_bytes": encoded_img.tobytes()
+            "latency": latency,
+            "motion": {"reused_result": not run_model, **gate.stats()} if gate is not None else None,
+            "detections": detections_to_json(detections, entry.model.names),
+            "model_version": entry.version if run_model else None,
+            "input_size": INPUT_SIZE
         }
 
+    except (HTTPException, ExecutorSaturated):
+        raise
     except Exception as e:
         logging.error(f"Error processing frame: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing frame: {str(e)}")
@@ -537,30 +1622,21 @@ async def detect_frame(
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    active_connections.append(websocket)
+    # Everything this client receives goes through its queue, so sends never interleave
+    broadcaster.register(websocket)
 
     try:
         # Send initial connection message
-        await websocket.send_text(json.dumps({
+        broadcaster.send(websocket, json.dumps({
             "type": "connection_established",
             "message": "Connected to weapon detection WebSocket",
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }))
 
-        # Send latest 5 detections on connection
-        if DETECTION_HISTORY:
-            recent_detections = DETECTION_HISTORY[-5:]
-            for detection in recent_detections:
-                detection_copy = detection.copy()
-                # Re-add base64 image for these historical items
-                if detection_copy.get("image_path") and os.path.exists(detection_copy["image_path"]):
-                    try:
-                        img = cv2.imread(detection_copy["image_path"])
-                        detection_copy["image_base64"] = image_to_base64(img)
-                    except Exception as e:
-                        logging.error(f"Error reading historical image: {e}")
-
-                await websocket.send_text(json.dumps(detection_copy))
+        # Send latest 5 detections on connection, with the thumbnails saved next to them
+        for detection in history_store.recent(5):
+            thumbnail_base64 = await asyncio.to_thread(read_thumbnail_base64, detection)
+            broadcaster.send(websocket, json.dumps(detection_event(detection, thumbnail_base64)))
 
         # Keep connection alive and handle client messages
         while True:
@@ -571,11 +1647,11 @@ async def websocket_endpoint(websocket: WebSocket):
 
                 # Handle different message types
                 if message.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
+                    broadcaster.send(websocket, json.dumps({"type": "pong"}))
 
             except Exception as e:
                 logging.error(f"Error processing WebSocket message: {e}")
-                await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+                broadcaster.send(websocket, json.dumps({"type": "error", "message": str(e)}))
 
     except WebSocketDisconnect:
         logging.info("WebSocket client disconnected")
@@ -583,79 +1659,221 @@ async def websocket_endpoint(websocket: WebSocket):
         logging.error(f"WebSocket error: {e}")
     finally:
         # Remove from active connections
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        broadcaster.unregister(websocket)
+
+
+# Run one frame from the binary ingest channel; returns the reply and whether it should go to history
+async def process_ingested_frame(header, jpeg, received_at):
+    img, img_rgb = await asyncio.to_thread(decode_image, jpeg)
+    if img is None:
+        return {"type": "error", "seq": header["seq"], "message": "Invalid image data"}, None
+
+    # Frames of a stream that barely changed reuse the previous result (MOTION_THRESHOLD 0 turns this off)
+    stream_id = header["stream_id"]
+    gate = motion_gates.get(stream_id, MOTION_THRESHOLD) if stream_id and MOTION_THRESHOLD > 0 else None
+    run_model = gate is None or await asyncio.to_thread(gate.check, img)
+
+    entry = get_active_model()
+    if run_model:
+        conf_threshold = header["conf_threshold"] if header["conf_threshold"] > 0 else 0.25
+        try:
+            with inference_executor.admit():
+                (detections, proc_time, entry), latency = await batcher.submit(img_rgb, conf_threshold)
+        except ExecutorSaturated as e:
+            return {"type": "busy", "seq": header["seq"], "stream_id": stream_id, "retry_after": e.retry_after}, None
+        if gate is not None:
+            gate.update(detections)
+    else:
+        detections, proc_time, latency = gate.last_result, 0.0, None
+
+    # Boxes come back in network-input pixels; the client draws on its own frame
+    height, width = img.shape[:2]
+    weapon_count = count_weapons(detections)
+    reply = {
+        "type": "detections",
+        "seq": header["seq"],
+        "stream_id": stream_id,
+        "timestamp": header["timestamp"],
+        "weapon_count": weapon_count,
+        "boxes": compact_detections(detections, width / INPUT_SIZE, height / INPUT_SIZE),
+        "reused_result": not run_model,
+        "processing_time": proc_time,
+        "server_ms": (time.time() - received_at) * 1000.0,
+        "queue_ms": latency["queue_ms"] if latency else None,
+        "model_version": entry.version if run_model else None,
+    }
+    if weapon_count > 0 and run_model:
+        return reply, (img, detections, entry.model.names, proc_time, entry.version)
+    return reply, None
+
+
+@app.websocket("/ws/frames")
+async def frame_ingest_websocket(websocket: WebSocket):
+    """Binary frame ingest for live cameras (see frame_protocol.py for the message layout).
+
+    Each binary message carries one JPEG frame; a detections message comes
+    back on the same socket for every frame that is processed. Only the
+    newest frame waits while the model is busy: an older waiting frame is
+    dropped (and reported) so a slow model never builds up latency.
+    """
+    await websocket.accept()
+    pending: asyncio.Queue = asyncio.Queue(maxsize=1)
+    counters = {"received": 0, "processed": 0, "dropped": 0}
+
+    async def send(message):
+        await websocket.send_text(json.dumps(message))
+
+    async def process_frames():
+        while True:
+            header, jpeg, received_at = await pending.get()
+            try:
+                reply, evidence = await process_ingested_frame(header, jpeg, received_at)
+            except Exception as e:
+                logging.error(f"Error processing ingested frame: {e}")
+                reply, evidence = {"type": "error", "seq": header["seq"], "message": str(e)}, None
+            counters["processed"] += 1
+            await send(reply)
+
+            # History is written after the reply so the camera is not kept waiting for the evidence image
+            if evidence is not None:
+                img, detections, names, proc_time, version = evidence
+                await add_detection_to_history(img, detections, names, "Webcam", proc_time, version)
+
+    entry = get_active_model()
+    await send({
+        "type": "ready",
+        "protocol_version": FRAME_PROTOCOL_VERSION,
+        "header_size": FRAME_HEADER.size,
+        "input_size": INPUT_SIZE,
+        "class_names": {int(class_id): name for class_id, name in entry.model.names.items()},
+        "model_version": entry.version,
+    })
+
+    processor = asyncio.create_task(process_frames())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("bytes") is not None:
+                try:
+                    header, jpeg = unpack_frame(message["bytes"])
+                except ValueError as e:
+                    await send({"type": "error", "message": str(e)})
+                    continue
+                counters["received"] += 1
+
+                # Replace a frame still waiting for the model with the newer one
+                if pending.full():
+                    stale_header, _, _ = pending.get_nowait()
+                    counters["dropped"] += 1
+                    await send({"type": "dropped", "seq": stale_header["seq"], "stream_id": stale_header["stream_id"]})
+                pending.put_nowait((header, jpeg, time.time()))
+
+            elif message.get("text") is not None:
+                try:
+                    data = json.loads(message["text"])
+                    if data.get("type") == "ping":
+                        await send({"type": "pong", **counters})
+                except Exception as e:
+                    logging.error(f"Error processing frame WebSocket message: {e}")
+                    await send({"type": "error", "message": str(e)})
+
+            if processor.done():
+                break
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logging.error(f"Frame WebSocket error: {e}")
+    finally:
+        processor.cancel()
+        logging.info(f"Frame WebSocket closed: {counters['received']} frames received, "
+                     f"{counters['processed']} processed, {counters['dropped']} dropped")
+
+
+# Delete the full image and thumbnail of a detection
+def remove_detection_images(detection):
+    for key in ("image_path", "thumbnail_path"):
+        if detection.get(key) and os.path.exists(detection[key]):
+            try:
+                os.remove(detection[key])
+            except Exception as e:
+                logging.warning(f"Could not delete image file: {e}")
 
 
 @app.get("/history", response_model=List[DetectionResult])
-async def get_detection_history():
-    """Get all detection history"""
-    return DETECTION_HISTORY
+async def get_detection_history(
+        limit: int = 100,
+        offset: int = 0,
+        source_type: Optional[str] = None,
+        min_weapon_count: Optional[int] = None
+):
+    """Get detection history, newest first, one page at a time"""
+    if not 1 <= limit <= 1000 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be 1-1000 and offset at least 0")
+    return await asyncio.to_thread(history_store.list, limit, offset, source_type, min_weapon_count)
 
 
 @app.get("/history/{detection_id}", response_model=DetectionResult)
 async def get_detection(detection_id: str):
     """Get specific detection by ID"""
-    for detection in DETECTION_HISTORY:
-        if detection["id"] == detection_id:
-            return detection
-    raise HTTPException(status_code=404, detail="Detection not found")
+    detection = await asyncio.to_thread(history_store.get, detection_id)
+    if detection is None:
+        raise HTTPException(status_code=404, detail="Detection not found")
+    return detection
 
 
 @app.delete("/history/{detection_id}")
 async def delete_detection(detection_id: str):
     """Delete specific detection by ID"""
-    global DETECTION_HISTORY
-
-    # Find detection
-    for i, detection in enumerate(DETECTION_HISTORY):
-        if detection["id"] == detection_id:
-            # Remove image file if exists
-            if detection.get("image_path") and os.path.exists(detection["image_path"]):
-                try:
-                    os.remove(detection["image_path"])
-                except Exception as e:
-                    logging.warning(f"Could not delete image file: {e}")
-
-            # Remove from history
-            DETECTION_HISTORY.pop(i)
-            return {"status": "success", "message": f"Deleted detection {detection_id}"}
+    detection = await asyncio.to_thread(history_store.delete, detection_id)
+    if detection is None:
+        raise HTTPException(status_code=404, detail="Detection not found")
 
-    raise HTTPException(status_code=404, detail="Detection not found")
+    # Remove image file if exists
+    await asyncio.to_thread(remove_detection_images, detection)
+    return {"status": "success", "message": f"Deleted detection {detection_id}"}
 
 
 @app.delete("/history")
 async def clear_history():
     """Clear all detection history"""
-    global DETECTION_HISTORY
+    detections = await asyncio.to_thread(history_store.clear)
 
     # Delete all image files
-    for detection in DETECTION_HISTORY:
-        if detection.get("image_path") and os.path.exists(detection["image_path"]):
-            try:
-                os.remove(detection["image_path"])
-            except Exception as e:
-                logging.warning(f"Could not delete image file: {e}")
+    for detection in detections:
+        await asyncio.to_thread(remove_detection_images, detection)
 
-    # Clear history
-    DETECTION_HISTORY = []
     return {"status": "success", "message": "Detection history cleared"}
 
 
-@app.get("/image/{detection_id}")
-async def get_detection_image(detection_id: str):
-    """Get detection image by ID"""
-    for detection in DETECTION_HISTORY:
-        if detection["id"] == detection_id and detection.get("image_path"):
-            if os.path.exists(detection["image_path"]):
-                return StreamingResponse(
-                    io.open(detection["image_path"], "rb"),
-                    media_type="image/jpeg"
-                )
-            else:
-                raise HTTPException(status_code=404, detail="Image file not found")
+@app.get("/stats/history")
+async def history_stats():
+    """Size of the detection history, its in-memory part and the batched writes to disk"""
+    return history_store.stats()
+
 
-    raise HTTPException(status_code=404, detail="Detection or image not found")
+@app.get("/image/{detection_id}")
+async def get_detection_image(detection_id: str, variant: str = "full"):
+    """Get detection image by ID (``variant=thumbnail`` for the small version)"""
+    if variant not in ("full", "thumbnail"):
+        raise HTTPException(status_code=400, detail="variant must be full or thumbnail")
+    key = "thumbnail_path" if variant == "thumbnail" else "image_path"
+
+    detection = await asyncio.to_thread(history_store.get, detection_id)
+    if detection is None or not detection.get(key):
+        raise HTTPException(status_code=404, detail="Detection or image not found")
+    if not os.path.exists(detection[key]):
+        raise HTTPException(status_code=404, detail="Image file not found")
+
+    # A detection's images never change, so clients may keep them
+    return StreamingResponse(
+        io.open(detection[key], "rb"),
+        media_type="image/jpeg",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
 
 
 if __name__ == "__main__":
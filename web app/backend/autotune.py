@@ -0,0 +1,270 @@
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from model_backends import BACKENDS
+from quantization import IMAGE_EXTENSIONS
+from tiling import detect_resized
+
+# Profile read by api.py at startup
+DEFAULT_PROFILE_PATH = "autotune_profile.json"
+
+DEFAULT_INPUT_SIZES = (320, 480, 640)
+
+
+# Description of the machine a profile was tuned on
+def host_info():
+    return {
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "python": platform.python_version(),
+    }
+
+
+# Read a tuning profile; a missing file, a bad file or a profile tuned on another host yields {}
+def load_profile(path=DEFAULT_PROFILE_PATH):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable autotune profile {path}: {e}")
+        return {}
+
+    tuned_cpus = profile.get("host", {}).get("cpu_count")
+    if tuned_cpus != os.cpu_count():
+        logging.warning(f"Ignoring autotune profile {path}: tuned for {tuned_cpus} CPUs, "
+                        f"this host has {os.cpu_count()}")
+        return {}
+
+    logging.info(f"Using autotune profile {path}: backend={profile.get('backend')}, "
+                 f"threads={profile.get('intra_op_threads')}/{profile.get('inter_op_threads')}, "
+                 f"workers={profile.get('inference_workers')}, input_size={profile.get('input_size')}")
+    return profile
+
+
+# Set PyTorch intra-op and inter-op thread pools (0 keeps the library default)
+def apply_thread_settings(intra_op_threads=0, inter_op_threads=0):
+    import torch
+
+    if intra_op_threads:
+        torch.set_num_threads(int(intra_op_threads))
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(int(inter_op_threads))
+        except RuntimeError as e:
+            # Only allowed before the first parallel operation in the process
+            logging.warning(f"Could not set inter-op threads to {inter_op_threads}: {e}")
+
+
+# Thread counts worth trying on this host: 1, 2, half and all of the cores
+def default_thread_counts(cpu_count=None):
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return sorted({n for n in (1, 2, cpu_count // 2, cpu_count) if 1 <= n <= cpu_count})
+
+
+# Frames to tune on: every image in the folders plus evenly spaced frames of the video (RGB, like the API)
+def load_frames(image_sources, video_path=None, video_frames=30):
+    frames = []
+    for source in image_sources:
+        paths = sorted(p for p in glob.glob(os.path.join(source, "**", "*"), recursive=True)
+                       if p.lower().endswith(IMAGE_EXTENSIONS)) if os.path.isdir(source) else [source]
+        for path in paths:
+            img = cv2.imread(path)
+            if img is not None:
+                frames.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+    if video_path and video_frames > 0:
+        cap = cv2.VideoCapture(video_path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for index in np.linspace(0, max(total - 1, 0), num=min(video_frames, max(total, 1)), dtype=int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        cap.release()
+
+    return frames
+
+
+# Same pre-processing as detect_weapons: squash to the input size, boxes mapped back to the frame
+def detect(model, img, conf_threshold, input_size):
+    return detect_resized(model, img, conf_threshold, (input_size, input_size))
+
+
+# One backend/thread configuration, run in a fresh process so the thread pools can still be set
+def run_trial(model_path, backend, intra_op_threads, inter_op_threads, input_sizes, worker_counts,
+              image_sources, video_path, video_frames, conf_threshold=0.25, repeats=2):
+    from model_backends import load_detector
+
+    if backend != "onnx":
+        apply_thread_settings(intra_op_threads, inter_op_threads)
+    model, loaded_backend = load_detector(model_path, backend, intra_op_threads=intra_op_threads)
+    if loaded_backend != backend:
+        return []
+
+    frames = load_frames(image_sources, video_path, video_frames)
+    rows = []
+    for input_size in input_sizes:
+        # Warm up, then time frames one at a time
+        for frame in frames[:2]:
+            detect(model, frame, conf_threshold, input_size)
+
+        latencies = []
+        detections = []
+        for frame in frames:
+            start = time.perf_counter()
+            detections.append(detect(model, frame, conf_threshold, input_size))
+            latencies.append((time.perf_counter() - start) * 1000.0)
+        latencies.sort()
+
+        # Throughput with several inference workers sharing the model, like the API executor
+        for workers in worker_counts:
+            jobs = frames * max(1, repeats)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                start = time.perf_counter()
+                list(pool.map(lambda frame: detect(model, frame, conf_threshold, input_size), jobs))
+                elapsed = time.perf_counter() - start
+
+            rows.append({
+                "backend": backend,
+                "intra_op_threads": intra_op_threads,
+                "inter_op_threads": inter_op_threads,
+                "inference_workers": workers,
+                "input_size": input_size,
+                "mean_ms": float(np.mean(latencies)) if latencies else 0.0,
+                "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+                "throughput_fps": len(jobs) / elapsed if elapsed > 0 else 0.0,
+                "detections": [dets.tolist() for dets in detections],
+            })
+    return rows
+
+
+# Share of the reference boxes found again by a candidate, over all frames
+def recall_against(reference, candidate, iou_threshold=0.5):
+    from quantization import match_detections
+
+    found = 0
+    total = 0
+    for ref, cand in zip(reference, candidate):
+        ref = np.asarray(ref, dtype=np.float32).reshape(-1, 6)
+        cand = np.asarray(cand, dtype=np.float32).reshape(-1, 6)
+        matched, _ = match_detections(ref, cand, iou_threshold)
+        found += len(matched)
+        total += len(ref)
+    return found / total if total else 1.0
+
+
+def autotune(model_path, image_sources, video_path=None, backends=("pytorch",), thread_counts=None,
+             inter_op_counts=(1, 2), worker_counts=None, input_sizes=DEFAULT_INPUT_SIZES, video_frames=30,
+             conf_threshold=0.25, repeats=2, min_recall=0.9, objective="throughput"):
+    cpu_count = os.cpu_count() or 1
+    thread_counts = thread_counts or default_thread_counts(cpu_count)
+    worker_counts = worker_counts or default_thread_counts(cpu_count)
+
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    for backend in backends:
+        # ONNX Runtime runs the graph sequentially, so inter-op threads only matter for PyTorch
+        for inter_op_threads in (inter_op_counts if backend != "onnx" else (1,)):
+            for intra_op_threads in thread_counts:
+                logging.info(f"Trial: {backend}, intra-op threads {intra_op_threads}, "
+                             f"inter-op threads {inter_op_threads}")
+                workers = [w for w in worker_counts if w * intra_op_threads <= cpu_count] or [1]
+                try:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        rows.extend(pool.submit(run_trial, model_path, backend, intra_op_threads,
+                                                inter_op_threads, sorted(input_sizes), workers,
+                                                image_sources, video_path, video_frames, conf_threshold,
+                                                repeats).result())
+                except Exception as e:
+                    logging.warning(f"Trial failed ({backend}, {intra_op_threads}/{inter_op_threads}): {e}")
+
+    if not rows:
+        raise RuntimeError("No autotune trial succeeded")
+
+    # Accuracy is measured against the largest input size of the first backend
+    reference = max((row for row in rows if row["backend"] == rows[0]["backend"]),
+                    key=lambda row: row["input_size"])["detections"]
+    for row in rows:
+        row["recall"] = recall_against(reference, row.pop("detections"))
+
+    eligible = [row for row in rows if row["recall"] >= min_recall] or rows
+    if objective == "latency":
+        best = min(eligible, key=lambda row: (row["p95_ms"], -row["throughput_fps"]))
+    else:
+        best = max(eligible, key=lambda row: (row["throughput_fps"], -row["p95_ms"]))
+
+    return {
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "host": host_info(),
+        "model_path": model_path,
+        "objective": objective,
+        "min_recall": min_recall,
+        "backend": best["backend"],
+        "intra_op_threads": best["intra_op_threads"],
+        "inter_op_threads": best["inter_op_threads"],
+        "inference_workers": best["inference_workers"],
+        "input_size": best["input_size"],
+        "metrics": best,
+        "candidates": rows,
+    }
+
+
+def print_report(profile):
+    print(f"{'backend':<8} {'intra':>5} {'inter':>5} {'workers':>7} {'size':>5} {'mean ms':>9} {'p95 ms':>9} "
+          f"{'fps':>7} {'recall':>7}")
+    for row in profile["candidates"]:
+        marker = " *" if row is profile["metrics"] else ""
+        print(f"{row['backend']:<8} {row['intra_op_threads']:>5} {row['inter_op_threads']:>5} "
+              f"{row['inference_workers']:>7} {row['input_size']:>5} {row['mean_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['throughput_fps']:>7.1f} {row['recall']:>7.3f}{marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backends, thread counts, workers and input sizes on "
+                                                 "this host and save the best combination for the API")
+    parser.add_argument("--model", default=os.environ.get("MODEL_PATH", "best.pt"))
+    parser.add_argument("--images", nargs="+", default=[os.path.join("..", "..", "sample_images")])
+    parser.add_argument("--video", default=os.path.join("..", "..", "sample_video", "sample_video1.mp4"))
+    parser.add_argument("--video-frames", type=int, default=30, help="Frames sampled from the video")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--threads", nargs="+", type=int, default=None, help="Intra-op thread counts to try")
+    parser.add_argument("--interop-threads", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--workers", nargs="+", type=int, default=None, help="Inference worker counts to try")
+    parser.add_argument("--input-sizes", nargs="+", type=int, default=list(DEFAULT_INPUT_SIZES))
+    parser.add_argument("--min-recall", type=float, default=0.9,
+                        help="Smallest recall against the largest input size a candidate may have")
+    parser.add_argument("--objective", choices=("throughput", "latency"), default="throughput")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--output", default=os.environ.get("AUTOTUNE_PROFILE", DEFAULT_PROFILE_PATH))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    profile = autotune(args.model, args.images, args.video, args.backends, args.threads, args.interop_threads,
+                       args.workers, args.input_sizes, args.video_frames, args.conf, args.repeats,
+                       args.min_recall, args.objective)
+    print_report(profile)
+    with open(args.output, "w") as f:
+        json.dump(profile, f, indent=2)
+    print(f"\nSaved profile to {args.output}: backend={profile['backend']}, "
+          f"threads={profile['intra_op_threads']}/{profile['inter_op_threads']}, "
+          f"workers={profile['inference_workers']}, input_size={profile['input_size']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Dynamic micro-batching for concurrent inference requests
+class InferenceBatcher:
+    """Collect concurrent detection requests into a single batched forward pass.
+
+    A request waits at most ``max_wait_ms`` for other requests to join its
+    batch, and a batch never holds more than ``max_batch_size`` images.
+    ``batch_fn(images, conf_thresholds)`` must return one result per image.
+    Batches run on ``executor``, with up to ``max_concurrent_batches`` in flight.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any], List[float]], List[Any]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0, history_size: int = 1000,
+                 executor: Optional[Executor] = None, max_concurrent_batches: int = 1):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.executor = executor
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+
+        # Rolling statistics for reporting
+        self._latencies = deque(maxlen=history_size)
+        self._batch_sizes = deque(maxlen=history_size)
+        self.requests_served = 0
+        self.batches_run = 0
+
+    def start(self):
+        """Start the batching worker on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, img, conf_threshold: float = 0.25) -> Tuple[Any, Dict[str, float]]:
+        """Queue one image and wait for its own result and latency breakdown"""
+        if self._worker is None or self._worker.done():
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((img, conf_threshold, time.perf_counter(), future))
+        return await future
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already waiting before sleeping on the window
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            # Wait for a free executor slot first, so requests keep joining the next batch meanwhile
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._execute(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, batch):
+        loop = asyncio.get_running_loop()
+        images = [item[0] for item in batch]
+        thresholds = [item[1] for item in batch]
+
+        batch_start = time.perf_counter()
+        try:
+            # Run the forward pass off the event loop so new requests keep queuing
+            results = await loop.run_in_executor(self.executor, self.batch_fn, images, thresholds)
+        except Exception as e:
+            logging.error(f"Batched inference error: {e}")
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        batch_end = time.perf_counter()
+
+        self.batches_run += 1
+        self._batch_sizes.append(len(batch))
+
+        for (_, _, enqueued_at, future), result in zip(batch, results):
+            timing = {
+                "queue_ms": (batch_start - enqueued_at) * 1000.0,
+                "inference_ms": (batch_end - batch_start) * 1000.0,
+                "latency_ms": (batch_end - enqueued_at) * 1000.0,
+                "batch_size": len(batch),
+            }
+            self.requests_served += 1
+            self._latencies.append(timing["latency_ms"])
+            if not future.done():
+                future.set_result((result, timing))
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "requests_served": self.requests_served,
+            "batches_run": self.batches_run,
+            "avg_batch_size": sum(self._batch_sizes) / len(self._batch_sizes) if self._batch_sizes else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": latencies[-1] if latencies else 0.0,
+            },
+        }
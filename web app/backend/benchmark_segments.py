@@ -0,0 +1,84 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+# Run one video job end to end with the given number of segment processes
+def run_job(video_path, parallelism, params, store):
+    import api
+    from jobs import JobContext
+
+    job_id = f"benchmark-{parallelism}-{time.time():.0f}"
+    store.create(job_id, "video", video_path, {**params, "parallelism": parallelism})
+    job = store.claim_next(os.getpid())
+
+    start = time.perf_counter()
+    result = api.run_video_job(JobContext(store, job, None))
+    elapsed = time.perf_counter() - start
+    return {
+        "parallelism": parallelism,
+        "segments": len(result.get("segments") or [None]),
+        "seconds": elapsed,
+        "frames": result["frames"],
+        "fps": result["frames"] / elapsed if elapsed > 0 else 0.0,
+        "weapon_frames": result["weapon_frames"],
+    }
+
+
+def benchmark(video_path, parallelism_levels, params, repeats=1):
+    from jobs import JobStore
+
+    store = JobStore(os.path.join(tempfile.mkdtemp(prefix="segments-"), "jobs.db"))
+    rows = []
+    for parallelism in parallelism_levels:
+        runs = [run_job(video_path, parallelism, params, store) for _ in range(max(1, repeats))]
+        rows.append(min(runs, key=lambda row: row["seconds"]))
+
+    baseline = next((row["seconds"] for row in rows if row["parallelism"] == 1), rows[0]["seconds"])
+    for row in rows:
+        row["speedup"] = baseline / row["seconds"] if row["seconds"] > 0 else 0.0
+    return rows
+
+
+def print_report(rows):
+    print(f"Host CPUs: {os.cpu_count()} (segments beyond that compete for the same cores)")
+    print(f"{'processes':>9} {'segments':>8} {'seconds':>8} {'frames':>7} {'fps':>7} {'weapons':>7} {'speed-up':>8}")
+    for row in rows:
+        print(f"{row['parallelism']:>9} {row['segments']:>8} {row['seconds']:>8.1f} {row['frames']:>7} "
+              f"{row['fps']:>7.1f} {row['weapon_frames']:>7} {row['speedup']:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a video job processed in 1..N parallel time segments")
+    parser.add_argument("--model", default=os.environ.get("MODEL_PATH", "best.pt"))
+    parser.add_argument("--video", default=os.path.join("..", "..", "sample_video", "sample_video1.mp4"))
+    parser.add_argument("--parallelism", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--frame-skip", type=int, default=1)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--min-segment-seconds", type=float, default=0.0,
+                        help="Shortest segment per process (the API defaults to VIDEO_MIN_SEGMENT_SECONDS)")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    # Read by api.py at import time, here and in the segment processes
+    os.environ["MODEL_PATH"] = args.model
+    os.environ["VIDEO_MIN_SEGMENT_SECONDS"] = str(args.min_segment_seconds)
+    os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="segments-uploads-"))
+
+    video_path = os.path.abspath(args.video)
+    rows = benchmark(video_path, args.parallelism, {"frame_skip": args.frame_skip, "conf_threshold": args.conf},
+                     args.repeats)
+    print_report(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# Entry points measured by default, as "directory:module" relative to this folder
+DEFAULT_TARGETS = [".:api", os.path.join("..", "..", "weapon-detection-system", "backend") + ":api",
+                   os.path.join("..", "..") + ":app"]
+
+# Dependencies reported on their own in the import breakdown
+HEAVY_MODULES = ("torch", "ultralytics", "onnxruntime", "PIL", "cv2", "numpy", "fastapi", "streamlit")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def parse_target(target):
+    directory, _, module = target.rpartition(":")
+    return os.path.abspath(directory or "."), module
+
+
+# Run "python -X importtime -c 'import <module>'" and summarise the report (milliseconds)
+def import_profile(directory, module, env=None, top=10):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=directory,
+                          env=env, capture_output=True, text=True)
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us) / 1000.0, int(cumulative_us) / 1000.0, (len(indent) - 1) // 2))
+
+    total = next((cumulative for name, _, cumulative, level in rows if name == module and level == 0), None)
+    heavy = {}
+    for name, _, cumulative, _ in rows:
+        if name in HEAVY_MODULES:
+            heavy[name] = max(heavy.get(name, 0.0), cumulative)
+
+    return {
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "total_ms": total,
+        "heavy_modules_ms": heavy,
+        "slowest_self_ms": sorted(((name, self_ms) for name, self_ms, _, _ in rows), key=lambda row: -row[1])[:top],
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Start uvicorn and time the first successful response on each path (milliseconds)
+def time_to_first_response(directory, module, paths=("/health", "/ready"), env=None, timeout=300.0):
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=directory, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    timings = {}
+    try:
+        for path in paths:
+            while path not in timings and time.perf_counter() - start < timeout:
+                if proc.poll() is not None:
+                    return {"error": f"server exited with code {proc.returncode}", **timings}
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+                        if response.status == 200:
+                            timings[path] = (time.perf_counter() - start) * 1000.0
+                except (urllib.error.URLError, ConnectionError, OSError):
+                    time.sleep(0.05)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return timings
+
+
+def benchmark(targets, runs=3, serve=True, env=None):
+    report = {}
+    for target in targets:
+        directory, module = parse_target(target)
+        profiles = [import_profile(directory, module, env) for _ in range(runs)]
+        totals = [p["total_ms"] for p in profiles if p["total_ms"] is not None]
+        entry = {
+            "import_ms": statistics.median(totals) if totals else None,
+            "profile": profiles[-1],
+        }
+
+        # Only the FastAPI backends can be served; app.py is a Streamlit script
+        if serve and module == "api":
+            responses = [time_to_first_response(directory, module, env=env) for _ in range(runs)]
+            entry["first_response_ms"] = {
+                path: statistics.median(r[path] for r in responses if path in r)
+                for path in ("/health", "/ready") if any(path in r for r in responses)
+            }
+        report[target] = entry
+    return report
+
+
+def print_report(report):
+    for target, entry in report.items():
+        print(f"\n{target}")
+        profile = entry["profile"]
+        if not profile["ok"]:
+            print(f"  import failed: {profile['error']}")
+            continue
+        print(f"  import time (median): {entry['import_ms']:.1f} ms")
+        for name, ms in sorted(profile["heavy_modules_ms"].items(), key=lambda item: -item[1]):
+            print(f"    {name:<12} {ms:>9.1f} ms")
+        missing = [name for name in ("torch", "ultralytics", "PIL") if name not in profile["heavy_modules_ms"]]
+        if missing:
+            print(f"    not imported at startup: {', '.join(missing)}")
+        for path, ms in entry.get("first_response_ms", {}).items():
+            print(f"  first {path} response: {ms:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first response of the entry points")
+    parser.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS, help="directory:module entries")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-serve", action="store_true", help="Only profile imports, do not start the API")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Exit with status 1 if any import takes longer than this")
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    report = benchmark(args.targets, args.runs, serve=not args.no_serve, env=os.environ.copy())
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.budget_ms is not None:
+        over = [target for target, entry in report.items()
+                if entry["import_ms"] is None or entry["import_ms"] > args.budget_ms]
+        if over:
+            print(f"\nImport time budget of {args.budget_ms:.0f} ms exceeded by: {', '.join(over)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
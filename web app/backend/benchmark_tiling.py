@@ -0,0 +1,132 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+from model_backends import BACKENDS, load_detector
+from quantization import IMAGE_EXTENSIONS, match_detections
+from tiling import DEFAULT_TILE_NMS_THRESHOLD, DEFAULT_TILE_OVERLAP, DEFAULT_TILE_SIZE, detect_resized, \
+    detect_tiled
+
+
+# Images to benchmark, with optional YOLO-format labels (<labels>/<image stem>.txt)
+def load_images(sources, labels_dir=None):
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(p for p in glob.glob(os.path.join(source, "**", "*"), recursive=True)
+                                if p.lower().endswith(IMAGE_EXTENSIONS)))
+        elif os.path.exists(source):
+            paths.append(source)
+        else:
+            logging.warning(f"Image source not found: {source}")
+
+    images = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        labels = load_labels(path, img.shape[:2], labels_dir) if labels_dir else None
+        images.append((path, cv2.cvtColor(img, cv2.COLOR_BGR2RGB), labels))
+    return images
+
+
+# Read "class cx cy w h" (normalised) lines into [N, 6] rows of x1, y1, x2, y2, 1.0, class_id
+def load_labels(image_path, shape, labels_dir):
+    label_path = os.path.join(labels_dir, os.path.splitext(os.path.basename(image_path))[0] + ".txt")
+    if not os.path.exists(label_path):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    rows = np.loadtxt(label_path, ndmin=2, dtype=np.float32)
+    h, w = shape
+    labels = np.zeros((len(rows), 6), dtype=np.float32)
+    labels[:, 0] = (rows[:, 1] - rows[:, 3] / 2) * w
+    labels[:, 1] = (rows[:, 2] - rows[:, 4] / 2) * h
+    labels[:, 2] = (rows[:, 1] + rows[:, 3] / 2) * w
+    labels[:, 3] = (rows[:, 2] + rows[:, 4] / 2) * h
+    labels[:, 4] = 1.0
+    labels[:, 5] = rows[:, 0]
+    return labels
+
+
+def benchmark(model, images, conf_threshold=0.25, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_TILE_OVERLAP,
+              nms_threshold=DEFAULT_TILE_NMS_THRESHOLD, repeats=3, iou_threshold=0.5):
+    modes = {
+        "resize": lambda img: detect_resized(model, img, conf_threshold),
+        "tiled": lambda img: detect_tiled(model, img, conf_threshold, tile_size, overlap, nms_threshold),
+    }
+
+    # Warm up both paths before timing
+    if images:
+        for fn in modes.values():
+            fn(images[0][1])
+
+    report = {"images": len(images), "tile_size": tile_size, "overlap": overlap, "modes": {}}
+    for name, fn in modes.items():
+        latencies = []
+        detections = 0
+        labelled = 0
+        found = 0
+
+        for _, img, labels in images:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                dets = fn(img)
+                latencies.append((time.perf_counter() - start) * 1000.0)
+            detections += len(dets)
+
+            if labels is not None:
+                matched, _ = match_detections(labels, dets, iou_threshold)
+                labelled += len(labels)
+                found += len(matched)
+
+        latencies.sort()
+        report["modes"][name] = {
+            "mean_ms": float(np.mean(latencies)) if latencies else 0.0,
+            "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+            "detections": detections,
+            "recall": found / labelled if labelled else None,
+        }
+
+    return report
+
+
+def print_report(report):
+    print(f"{report['images']} images, tile size {report['tile_size']}, overlap {report['overlap']}")
+    print(f"{'mode':<8} {'mean ms':>9} {'p95 ms':>9} {'detections':>11} {'recall':>8}")
+    for name, row in report["modes"].items():
+        recall = f"{row['recall']:.3f}" if row["recall"] is not None else "n/a"
+        print(f"{name:<8} {row['mean_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['detections']:>11} {recall:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tiled and resized inference on high-resolution images")
+    parser.add_argument("--model", default=os.environ.get("MODEL_PATH", "best.pt"))
+    parser.add_argument("--backend", default=os.environ.get("MODEL_BACKEND", "pytorch"), choices=BACKENDS)
+    parser.add_argument("--images", nargs="+", default=[os.path.join("..", "..", "sample_images")])
+    parser.add_argument("--labels", default=None, help="Folder of YOLO-format labels, needed for recall")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE)
+    parser.add_argument("--overlap", type=float, default=DEFAULT_TILE_OVERLAP)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    model, _ = load_detector(args.model, args.backend)
+    images = load_images(args.images, args.labels)
+    report = benchmark(model, images, args.conf, args.tile_size, args.overlap, repeats=args.repeats)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# What to do when a client's outbound queue is full
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+SLOW_CLIENT_POLICIES = (DROP_OLDEST, DISCONNECT)
+
+
+# One connected WebSocket client: its outbound queue, sender task and counters
+class ClientChannel:
+    def __init__(self, client_id: int, websocket, queue_size: int):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.pending: deque = deque()
+        self.ready = asyncio.Event()
+        self.sender: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.closed = False
+
+        # Counters for reporting
+        self.sent = 0
+        self.dropped = 0
+        self.last_delivery_lag = 0.0
+        self.max_delivery_lag = 0.0
+
+    def lag(self) -> float:
+        """Seconds the oldest undelivered message has been waiting"""
+        return time.monotonic() - self.pending[0][1] if self.pending else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "client_id": self.client_id,
+            "connected_seconds": time.time() - self.connected_at,
+            "queued": len(self.pending),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "lag_seconds": self.lag(),
+            "last_delivery_lag_seconds": self.last_delivery_lag,
+            "max_delivery_lag_seconds": self.max_delivery_lag,
+        }
+
+
+# Fan-out of messages to WebSocket clients that never waits on a client
+class Broadcaster:
+    """Deliver messages to every registered WebSocket through its own queue and sender task.
+
+    :meth:`publish` only appends to the queues, so a client on a slow link
+    delays neither the other clients nor the code that published. When a
+    client already has ``queue_size`` messages waiting, ``policy`` decides:
+    ``"drop_oldest"`` discards its oldest waiting message, ``"disconnect"``
+    closes the client. A send that fails or takes longer than
+    ``send_timeout`` seconds also disconnects the client.
+    """
+
+    def __init__(self, queue_size: int = 64, policy: str = DROP_OLDEST, send_timeout: float = 10.0):
+        if policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy {policy!r}, expected one of {SLOW_CLIENT_POLICIES}")
+        self.queue_size = max(1, int(queue_size))
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self._clients: Dict[int, ClientChannel] = {}
+        self._next_id = 0
+        self._closing = set()
+
+        # Totals include clients that already left
+        self.published = 0
+        self.evicted = 0
+        self._retired_sent = 0
+        self._retired_dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def register(self, websocket) -> ClientChannel:
+        """Start delivering to an accepted WebSocket (must run on the event loop)"""
+        self._next_id += 1
+        client = ClientChannel(self._next_id, websocket, self.queue_size)
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self._clients[id(websocket)] = client
+        return client
+
+    def unregister(self, websocket):
+        client = self._clients.pop(id(websocket), None)
+        if client is not None:
+            self._retire(client)
+
+    def send(self, websocket, message: str) -> bool:
+        """Queue a message for one client only; False when it is not registered"""
+        client = self._clients.get(id(websocket))
+        if client is None:
+            return False
+        self._enqueue(client, message)
+        return True
+
+    def publish(self, message: str) -> int:
+        """Queue a message for every client without waiting; returns the number of clients"""
+        self.published += 1
+        clients = list(self._clients.values())
+        for client in clients:
+            self._enqueue(client, message)
+        return len(clients)
+
+    def _enqueue(self, client: ClientChannel, message: str):
+        if client.closed:
+            return
+        if len(client.pending) >= client.queue_size:
+            if self.policy == DISCONNECT:
+                self._evict(client, f"fell {len(client.pending)} messages behind")
+                return
+            client.pending.popleft()
+            client.dropped += 1
+        client.pending.append((message, time.monotonic()))
+        client.ready.set()
+
+    async def _send_loop(self, client: ClientChannel):
+        try:
+            while True:
+                if not client.pending:
+                    client.ready.clear()
+                    await client.ready.wait()
+                    continue
+                message, enqueued_at = client.pending.popleft()
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout)
+
+                client.sent += 1
+                client.last_delivery_lag = time.monotonic() - enqueued_at
+                client.max_delivery_lag = max(client.max_delivery_lag, client.last_delivery_lag)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._evict(client, f"send took longer than {self.send_timeout}s")
+        except Exception as e:
+            self._evict(client, f"send failed: {e}")
+
+    def _evict(self, client: ClientChannel, reason: str):
+        if self._clients.pop(id(client.websocket), None) is None:
+            return
+        self.evicted += 1
+        logging.warning(f"Disconnecting WebSocket client {client.client_id}: {reason}")
+        self._retire(client)
+
+        # Close in the background; the client's own receive loop then sees the disconnect
+        task = asyncio.create_task(self._close(client.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _retire(self, client: ClientChannel):
+        client.closed = True
+        client.pending.clear()
+        if client.sender is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        self._retired_sent += client.sent
+        self._retired_dropped += client.dropped
+
+    async def _close(self, websocket):
+        try:
+            # 1013: try again later
+            await asyncio.wait_for(websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+
+    async def close(self):
+        """Stop every sender task (on shutdown)"""
+        for client in list(self._clients.values()):
+            self.unregister(client.websocket)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        clients = [client.stats() for client in self._clients.values()]
+        return {
+            "clients": len(clients),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "sent": self._retired_sent + sum(client["sent"] for client in clients),
+            "dropped": self._retired_dropped + sum(client["dropped"] for client in clients),
+            "evicted": self.evicted,
+            "max_lag_seconds": max((client["lag_seconds"] for client in clients), default=0.0),
+            "per_client": clients,
+        }
@@ -0,0 +1,154 @@
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+
+# Merge rectangles that overlap until every remaining pair is disjoint
+def merge_regions(boxes: List[Tuple[int, int, int, int]]):
+    boxes = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [tuple(box) for box in boxes]
+
+
+# Shift per-crop detections back into frame coordinates (crops are disjoint, so no NMS is needed)
+def offset_detections(crop_detections, offsets):
+    shifted = []
+    for detections, (x, y) in zip(crop_detections, offsets):
+        if len(detections):
+            detections = detections.copy()
+            detections[:, [0, 2]] += x
+            detections[:, [1, 3]] += y
+            shifted.append(detections)
+    if not shifted:
+        return np.zeros((0, 6), dtype=np.float32)
+    return np.concatenate(shifted).astype(np.float32)
+
+
+# Background model for one fixed camera, yielding crops around moving regions
+class ForegroundCropper:
+    """Find the parts of a fixed camera's frame where something is moving.
+
+    A MOG2 background subtractor runs on the frame shrunk to
+    ``downscale_width``. Foreground blobs smaller than ``min_area`` (a
+    fraction of the frame) are dropped, the rest are padded by ``padding``
+    of their size, grown to at least ``min_crop`` pixels so the detector gets
+    some context, and merged while they overlap. The whole frame is used
+    instead during the first ``warmup_frames`` frames (while the background
+    is learnt) and whenever the regions cover more than ``max_coverage`` of
+    the frame or there are more than ``max_regions`` of them, e.g. after a
+    lighting change. An empty list means nothing moved.
+    """
+
+    def __init__(self, history: int = 500, var_threshold: float = 16.0, downscale_width: int = 320,
+                 min_area: float = 0.0005, padding: float = 0.25, min_crop: int = 160, max_regions: int = 8,
+                 max_coverage: float = 0.5, warmup_frames: int = 30):
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(history=history, varThreshold=var_threshold,
+                                                             detectShadows=True)
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self.downscale_width = max(32, int(downscale_width))
+        self.min_area = max(0.0, float(min_area))
+        self.padding = max(0.0, float(padding))
+        self.min_crop = max(1, int(min_crop))
+        self.max_regions = max(1, int(max_regions))
+        self.max_coverage = min(max(float(max_coverage), 0.0), 1.0)
+        self.warmup_frames = max(0, int(warmup_frames))
+
+        # Counters for reporting
+        self.frames = 0
+        self.full_frames = 0
+        self.empty_frames = 0
+        self.regions_total = 0
+        self.pixels_total = 0
+        self.pixels_processed = 0
+
+    def _foreground_boxes(self, frame):
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.downscale_width / w)
+        small = cv2.resize(frame, (max(1, round(w * scale)), max(1, round(h * scale))),
+                           interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        mask = self.subtractor.apply(small)
+
+        # MOG2 marks shadows as 127; keep only confident foreground and remove speckle
+        _, mask = cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        mask = cv2.dilate(mask, self.kernel, iterations=2)
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_pixels = self.min_area * mask.size
+        boxes = []
+        for contour in contours:
+            if cv2.contourArea(contour) < min_pixels:
+                continue
+            x, y, bw, bh = cv2.boundingRect(contour)
+            boxes.append((x / scale, y / scale, (x + bw) / scale, (y + bh) / scale))
+        return boxes
+
+    # Grow a span to at least min_crop around its centre and shift it back inside [0, limit]
+    def _fit(self, lo, hi, limit):
+        size = min(max(hi - lo, self.min_crop), limit)
+        start = min(max((lo + hi - size) / 2, 0), limit - size)
+        return int(start), int(np.ceil(start + size))
+
+    def _expand(self, box, width, height):
+        x1, y1, x2, y2 = box
+        pad = self.padding * max(x2 - x1, y2 - y1)
+        x1, x2 = self._fit(x1 - pad, x2 + pad, width)
+        y1, y2 = self._fit(y1 - pad, y2 + pad, height)
+        return x1, y1, min(x2, width), min(y2, height)
+
+    def regions(self, frame) -> List[Tuple[int, int, int, int]]:
+        """Rectangles (x1, y1, x2, y2) in frame pixels to run the detector on"""
+        h, w = frame.shape[:2]
+        self.frames += 1
+        self.pixels_total += h * w
+        boxes = self._foreground_boxes(frame)
+
+        if self.frames <= self.warmup_frames:
+            regions = [(0, 0, w, h)]
+        elif not boxes:
+            regions = []
+        else:
+            regions = merge_regions([self._expand(box, w, h) for box in boxes])
+            covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+            if len(regions) > self.max_regions or covered > self.max_coverage * h * w:
+                regions = [(0, 0, w, h)]
+
+        if regions == [(0, 0, w, h)]:
+            self.full_frames += 1
+        elif not regions:
+            self.empty_frames += 1
+        self.regions_total += len(regions)
+        self.pixels_processed += sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+        return regions
+
+    def crops(self, frame):
+        """Native-resolution crops of the moving regions and their (x, y) offsets"""
+        regions = self.regions(frame)
+        return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions], [(x1, y1) for x1, y1, _, _ in regions]
+
+    @property
+    def pixel_ratio(self) -> float:
+        """Share of the frame pixels that went to the detector"""
+        return self.pixels_processed / self.pixels_total if self.pixels_total else 1.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "full_frames": self.full_frames,
+            "empty_frames": self.empty_frames,
+            "mean_regions": self.regions_total / self.frames if self.frames else 0.0,
+            "pixel_ratio": self.pixel_ratio,
+        }
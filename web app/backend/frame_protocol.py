@@ -0,0 +1,62 @@
+import struct
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Binary frame message: a fixed header, the UTF-8 stream id, then the JPEG bytes.
+# Header fields (big-endian): protocol version, flags (reserved), stream id length, capture timestamp
+# (seconds since the epoch), confidence threshold (0 uses the server default) and a sequence number
+FRAME_PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct("!BBHdfI")
+
+# Binary detections response: a count, then that many rows of six big-endian float32 values
+# (x1, y1, x2, y2, score, class_id)
+DETECTIONS_HEADER = struct.Struct("!I")
+DETECTIONS_DTYPE = np.dtype(">f4")
+
+
+def pack_frame(jpeg: bytes, stream_id: str = "", timestamp: float = 0.0, conf_threshold: float = 0.0,
+               seq: int = 0) -> bytes:
+    stream = stream_id.encode("utf-8")
+    header = FRAME_HEADER.pack(FRAME_PROTOCOL_VERSION, 0, len(stream), timestamp, conf_threshold, seq & 0xFFFFFFFF)
+    return header + stream + jpeg
+
+
+def unpack_frame(message: bytes) -> Tuple[Dict[str, Any], bytes]:
+    """Split a binary frame message into its header fields and the JPEG bytes; raises ValueError if malformed"""
+    if len(message) < FRAME_HEADER.size:
+        raise ValueError(f"Frame message shorter than the {FRAME_HEADER.size}-byte header")
+    version, flags, stream_length, timestamp, conf_threshold, seq = FRAME_HEADER.unpack_from(message)
+    if version != FRAME_PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame protocol version {version}")
+
+    start = FRAME_HEADER.size + stream_length
+    if len(message) <= start:
+        raise ValueError("Frame message has no image data")
+    header = {
+        "stream_id": message[FRAME_HEADER.size:start].decode("utf-8", errors="replace"),
+        "timestamp": timestamp,
+        "conf_threshold": conf_threshold,
+        "seq": seq,
+        "flags": flags,
+    }
+    return header, message[start:]
+
+
+# [N, 6] detections as short rows of x1, y1, x2, y2, score, class_id, boxes scaled to the sender's frame
+def compact_detections(detections, scale_x: float = 1.0, scale_y: float = 1.0) -> List[List[float]]:
+    return [[round(float(x1) * scale_x, 1), round(float(y1) * scale_y, 1), round(float(x2) * scale_x, 1),
+             round(float(y2) * scale_y, 1), round(float(score), 3), int(class_id)]
+            for x1, y1, x2, y2, score, class_id in detections]
+
+
+# [N, 6] detections as the binary response body
+def pack_detections(detections) -> bytes:
+    rows = np.ascontiguousarray(detections, dtype=DETECTIONS_DTYPE).reshape(-1, 6)
+    return DETECTIONS_HEADER.pack(len(rows)) + rows.tobytes()
+
+
+def unpack_detections(data: bytes) -> np.ndarray:
+    (count,) = DETECTIONS_HEADER.unpack_from(data)
+    rows = np.frombuffer(data, dtype=DETECTIONS_DTYPE, count=count * 6, offset=DETECTIONS_HEADER.size)
+    return rows.reshape(count, 6).astype(np.float32)
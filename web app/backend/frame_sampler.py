@@ -0,0 +1,138 @@
+import bisect
+import math
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+
+
+# Frame indices to analyse, planned up front from the container's frame rate and length
+def plan_frames(frame_count: int, fps: Optional[float] = None, sample_fps: Optional[float] = None,
+                frame_skip: int = 1) -> Optional[List[int]]:
+    """One frame per ``1 / sample_fps`` seconds of video time when both rates are known, otherwise
+    every ``frame_skip``-th frame; None when the container does not report its length"""
+    if not frame_count or frame_count <= 0:
+        return None
+    if sample_fps and sample_fps > 0 and fps and fps > 0:
+        step = fps / sample_fps
+        if step <= 1:
+            return list(range(frame_count))
+        samples = int(math.floor((frame_count - 1) / step)) + 1
+        return sorted({min(frame_count - 1, int(round(k * step))) for k in range(samples)})
+    return list(range(0, frame_count, max(1, int(frame_skip))))
+
+
+# Frame-by-frame walk over a video that only retrieves the frames it analyses
+class FrameSampler:
+    """Step through every frame index of ``cap`` but only retrieve the sampled frames.
+
+    Sampled frames come from ``plan`` (sorted indices, see :func:`plan_frames`)
+    or, without a plan, every ``stride`` frames; ``stride`` may be changed
+    while iterating and applies from the next sampled frame. Frames in
+    between are only ``grab()``-ed: the decoder still has to decode them
+    (later frames depend on them), but the conversion to BGR and the copy
+    out are skipped. Gaps of at least ``seek_threshold`` frames are jumped
+    over with a seek instead; a seek restarts decoding from the previous
+    keyframe, so it only pays off for gaps longer than the keyframe
+    interval, and may land a frame early on containers with coarse
+    timestamps (0 never seeks).
+
+    Iterating yields ``(index, frame)`` for every frame, with ``frame`` None
+    when it was not retrieved, so trackers can still step through it.
+    ``start`` and ``end`` restrict the walk to the frames ``[start, end)``,
+    seeking to ``start`` first; the plan keeps its indices, so segments of
+    one video sample the same frames as a single pass.
+    """
+
+    def __init__(self, cap, plan: Optional[List[int]] = None, stride: int = 1, seek_threshold: int = 0,
+                 start: int = 0, end: Optional[int] = None):
+        self.cap = cap
+        self.plan = plan
+        self.stride = max(1, int(stride))
+        self.seek_threshold = max(0, int(seek_threshold))
+        self.start = max(0, int(start))
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        self.end = min(frame_count, end) if frame_count and end is not None else (end or frame_count)
+        self._plan_position = bisect.bisect_left(plan, self.start) if plan is not None else 0
+        self._last_sampled = None
+
+        # Seconds spent on the last frame (its share of a seek), for stride controllers
+        self.last_read_time = 0.0
+
+        # Counters for reporting
+        self.frames = 0
+        self.retrieved = 0
+        self.grabbed = 0
+        self.seeks = 0
+        self.seeked_frames = 0
+        self.read_time = 0.0
+
+    @property
+    def next_index(self) -> Optional[int]:
+        """Index of the next frame to retrieve, or None when the plan is exhausted"""
+        if self.plan is not None:
+            return self.plan[self._plan_position] if self._plan_position < len(self.plan) else None
+        return self.start if self._last_sampled is None else self._last_sampled + self.stride
+
+    def __iter__(self) -> Iterator[Tuple[int, Any]]:
+        index = self.start
+        if index:
+            start = time.perf_counter()
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.read_time += time.perf_counter() - start
+            self.seeks += 1
+        while self.end is None or index < self.end:
+            target = self.next_index
+            if target is None:
+                # Nothing left to analyse: the remaining frames are counted but never decoded
+                for rest in range(index, self.end or index):
+                    self.frames += 1
+                    self.last_read_time = 0.0
+                    yield rest, None
+                return
+
+            # Jump over a long gap, then report the skipped indices without touching the decoder
+            gap = target - index
+            if self.seek_threshold and gap >= self.seek_threshold:
+                start = time.perf_counter()
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                elapsed = time.perf_counter() - start
+                self.read_time += elapsed
+                self.seeks += 1
+                self.seeked_frames += gap
+                for skipped in range(index, target):
+                    self.frames += 1
+                    self.last_read_time = elapsed / gap
+                    yield skipped, None
+                index = target
+
+            start = time.perf_counter()
+            if index < target:
+                if not self.cap.grab():
+                    break
+                self.grabbed += 1
+                frame = None
+            else:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self.retrieved += 1
+                self._last_sampled = index
+                if self.plan is not None:
+                    self._plan_position += 1
+            self.last_read_time = time.perf_counter() - start
+            self.read_time += self.last_read_time
+            self.frames += 1
+
+            yield index, frame
+            index += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "retrieved": self.retrieved,
+            "grabbed": self.grabbed,
+            "seeks": self.seeks,
+            "seeked_frames": self.seeked_frames,
+            "read_seconds": self.read_time,
+        }
@@ -0,0 +1,271 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source_type TEXT NOT NULL,
+    weapon_count INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS detections_created ON detections (created_at);
+CREATE INDEX IF NOT EXISTS detections_source_created ON detections (source_type, created_at);
+CREATE INDEX IF NOT EXISTS detections_weapons_created ON detections (weapon_count, created_at);
+"""
+
+
+# Detection history: newest records in memory, everything in SQLite
+class HistoryStore:
+    """Keep detection records by id, newest first, persisted to a local SQLite file.
+
+    The newest ``hot_size`` records stay in memory, so lookups by id and
+    the first pages of the history are answered without touching the
+    database. :meth:`add` and :meth:`delete` only queue the change; a
+    writer thread commits the queue in one transaction every
+    ``flush_interval`` seconds, so the detection path never waits on disk.
+    Reads that have to go to the database flush the queue first.
+    """
+
+    def __init__(self, path: str, hot_size: int = 1000, flush_interval: float = 0.5):
+        self.path = path
+        self.hot_size = max(1, int(hot_size))
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._written_cond = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._stopping = False
+
+        # Newest records by id in time order (oldest first), and the changes not yet committed
+        self._hot: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: List[tuple] = []
+        self._enqueued = 0
+        self._written = 0
+
+        # Counters for reporting
+        self.batches_written = 0
+        self.changes_written = 0
+        self.write_errors = 0
+        self.last_flush_seconds = 0.0
+        self.hot_hits = 0
+        self.database_reads = 0
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._count, last_created = conn.execute("SELECT COUNT(*), MAX(created_at) FROM detections").fetchone()
+        self._last_created = last_created or 0.0
+        rows = conn.execute("SELECT record FROM detections ORDER BY created_at DESC LIMIT ?", (self.hot_size,))
+        for record in reversed([json.loads(row[0]) for row in rows]):
+            self._hot[record["id"]] = record
+
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._count
+
+    # Writes: queued here, committed by the writer thread
+
+    def _enqueue(self, change: tuple):
+        self._pending.append(change)
+        self._enqueued += 1
+
+    def add(self, record: Dict[str, Any]):
+        """Store a record by its "id", replacing one with the same id; never waits on the database"""
+        with self._lock:
+            # A record only in the database is counted here and corrected by the writer if it was stored already
+            counted = record["id"] not in self._hot
+            self._hot.pop(record["id"], None)
+            self._hot[record["id"]] = record
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+            if counted:
+                self._count += 1
+            # Strictly increasing, so records added within one clock tick keep their order on disk
+            self._last_created = max(time.time(), self._last_created + 1e-6)
+            self._enqueue(("put", record, self._last_created, counted))
+
+    def delete(self, detection_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a record; returns it, or None when there was no such record"""
+        record = self.get(detection_id)
+        if record is None:
+            return None
+        with self._lock:
+            self._hot.pop(detection_id, None)
+            self._count -= 1
+            self._enqueue(("delete", detection_id))
+        return record
+
+    def clear(self) -> List[Dict[str, Any]]:
+        """Remove every record; returns them so their files can be deleted"""
+        records = self.list(limit=None)
+        with self._lock:
+            self._hot.clear()
+            self._count = 0
+            self._enqueue(("clear",))
+        self.flush()
+        return records
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                changes, self._pending = self._pending, []
+                stopping = self._stopping
+            if changes:
+                self._write(changes)
+            if stopping:
+                return
+
+    def _write(self, changes: List[tuple]):
+        start = time.perf_counter()
+        conn = self._connect()
+        replaced = 0
+        try:
+            conn.execute("BEGIN")
+            for change in changes:
+                if change[0] == "put":
+                    _, record, created_at, counted = change
+                    if counted and conn.execute("SELECT 1 FROM detections WHERE id = ?",
+                                                (record["id"],)).fetchone():
+                        replaced += 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO detections (id, created_at, source_type, weapon_count, record) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (record["id"], created_at, record.get("source_type", ""), int(record.get("weapon_count", 0)),
+                         json.dumps(record))
+                    )
+                elif change[0] == "delete":
+                    conn.execute("DELETE FROM detections WHERE id = ?", (change[1],))
+                else:
+                    conn.execute("DELETE FROM detections")
+            conn.execute("COMMIT")
+            if replaced:
+                # add() counted these as new records, but the ids were already stored (a retried save)
+                with self._lock:
+                    self._count -= replaced
+            self.batches_written += 1
+            self.changes_written += len(changes)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self.write_errors += 1
+            logging.error(f"Error writing {len(changes)} history changes: {e}")
+        self.last_flush_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self._written += len(changes)
+            self._written_cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every change queued so far is committed"""
+        with self._lock:
+            target = self._enqueued
+            if self._written >= target:
+                return True
+            self._wake.set()
+            return self._written_cond.wait_for(lambda: self._written >= target or not self._writer.is_alive(),
+                                               timeout)
+
+    def close(self):
+        """Commit the queued changes and stop the writer thread"""
+        with self._lock:
+            self._stopping = True
+        self._wake.set()
+        self._writer.join()
+
+    # Reads: the hot set first, the database only for older records
+
+    def get(self, detection_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._hot.get(detection_id)
+            cold = self._count > len(self._hot)
+        if record is not None:
+            self.hot_hits += 1
+            return record
+        if not cold:
+            return None
+
+        self.flush()
+        self.database_reads += 1
+        row = self._connect().execute("SELECT record FROM detections WHERE id = ?", (detection_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """Newest ``limit`` records in time order (oldest first), from memory"""
+        with self._lock:
+            return list(self._hot.values())[-limit:] if limit > 0 else []
+
+    def list(self, limit: Optional[int] = 100, offset: int = 0, source_type: Optional[str] = None,
+             min_weapon_count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Records newest first, optionally filtered by source type and weapon count"""
+        def matches(record):
+            return ((source_type is None or record.get("source_type") == source_type) and
+                    (min_weapon_count is None or record.get("weapon_count", 0) >= min_weapon_count))
+
+        # The hot set holds the newest records without gaps, so a page found in it is the right page
+        with self._lock:
+            complete = self._count <= len(self._hot)
+            found = []
+            if limit is not None:
+                for record in reversed(self._hot.values()):
+                    if matches(record):
+                        found.append(record)
+                        if len(found) >= offset + limit:
+                            break
+        if limit is not None and (complete or len(found) >= offset + limit):
+            self.hot_hits += 1
+            return found[offset:offset + limit]
+        if complete:
+            with self._lock:
+                return [record for record in reversed(self._hot.values()) if matches(record)][offset:]
+
+        self.flush()
+        self.database_reads += 1
+        query = "SELECT record FROM detections"
+        conditions, params = [], []
+        if source_type is not None:
+            conditions.append("source_type = ?")
+            params.append(source_type)
+        if min_weapon_count is not None:
+            conditions.append("weapon_count >= ?")
+            params.append(min_weapon_count)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params += [limit if limit is not None else -1, offset]
+        return [json.loads(row[0]) for row in self._connect().execute(query, params)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+            hot = len(self._hot)
+        return {
+            "records": self._count,
+            "hot_records": hot,
+            "hot_size": self.hot_size,
+            "pending_changes": pending,
+            "batches_written": self.batches_written,
+            "changes_written": self.changes_written,
+            "mean_batch_size": self.changes_written / self.batches_written if self.batches_written else 0.0,
+            "last_flush_seconds": self.last_flush_seconds,
+            "write_errors": self.write_errors,
+            "hot_hits": self.hot_hits,
+            "database_reads": self.database_reads,
+        }
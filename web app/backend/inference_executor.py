@@ -0,0 +1,82 @@
+import asyncio
+import contextlib
+import functools
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the inference queue is full and a request must be rejected"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+# Dedicated executor for blocking model calls with bounded admission
+class InferenceExecutor:
+    """Run blocking inference on its own thread pool, away from the event loop.
+
+    At most ``max_workers + max_queue`` requests are admitted at a time; any
+    request beyond that is rejected immediately with :class:`ExecutorSaturated`
+    instead of piling up behind the model.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue: int = 32):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+        # Admission state is only touched from the event loop thread
+        self._in_flight = 0
+        self._service_times = deque(maxlen=100)
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def retry_after(self) -> int:
+        """Estimate in seconds how long until a slot frees up"""
+        if not self._service_times:
+            return 1
+        avg_service = sum(self._service_times) / len(self._service_times)
+        return max(1, math.ceil(avg_service * self._in_flight / self.max_workers))
+
+    @contextlib.contextmanager
+    def admit(self):
+        """Reserve a slot for one request, or fail fast when the queue is full"""
+        if self._in_flight >= self.capacity:
+            self.rejected += 1
+            raise ExecutorSaturated(self.retry_after())
+
+        self._in_flight += 1
+        self.admitted += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._service_times.append(time.perf_counter() - start)
+
+    async def run(self, fn, *args, **kwargs) -> Any:
+        """Run a blocking call on the inference threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_service_time": sum(self._service_times) / len(self._service_times) if self._service_times else 0.0,
+        }
@@ -0,0 +1,414 @@
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+# Job states; the last three are final
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    file_path TEXT,
+    params TEXT NOT NULL DEFAULT '{}',
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_pid INTEGER,
+    worker_id TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_detections (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+"""
+
+# Columns added after the first release, for job tables created before them
+MIGRATIONS = {
+    "worker_id": "ALTER TABLE jobs ADD COLUMN worker_id TEXT",
+    "heartbeat_at": "ALTER TABLE jobs ADD COLUMN heartbeat_at REAL",
+}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+
+class WorkerStopping(Exception):
+    """Raised inside a job when its worker is shutting down; the job goes back to the queue"""
+
+
+# SQLite-backed job table shared by the API and the worker processes
+class JobStore:
+    """Persist jobs, their progress and results in a local SQLite file.
+
+    Every process opens its own connection; WAL mode lets the API read
+    progress while a worker writes it. Claiming a job is a single write
+    transaction, so each queued job is run by exactly one worker. A running
+    job records its worker as ``"<pool instance>:<pid>"`` and a heartbeat
+    time; process ids are reused after a restart, so these two decide
+    whether the job was interrupted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ("params", "progress", "result"):
+            job[field] = json.loads(job[field]) if job[field] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def create(self, job_id: str, kind: str, file_path: Optional[str] = None,
+               params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, status, file_path, params, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, file_path, json.dumps(params or {}), time.time())
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._row(self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        if status:
+            rows = self._connect().execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                                           (status, limit))
+        else:
+            rows = self._connect().execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self._row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def claim_next(self, worker_pid: int, worker_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running for this worker"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                               (QUEUED,)).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute("UPDATE jobs SET status = ?, worker_pid = ?, worker_id = ?, started_at = ?, "
+                             "heartbeat_at = ? WHERE id = ?", (RUNNING, worker_pid, worker_id, now, now, row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"]) if row is not None else None
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]):
+        self._connect().execute("UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?",
+                                (json.dumps(progress), time.time(), job_id))
+
+    def heartbeat(self, worker_id: str):
+        """Mark the running jobs of this worker as still alive"""
+        self._connect().execute("UPDATE jobs SET heartbeat_at = ? WHERE worker_id = ? AND status = ?",
+                                (time.time(), worker_id, RUNNING))
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None, progress: Optional[Dict[str, Any]] = None):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+            "progress = COALESCE(?, progress) WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(),
+             json.dumps(progress) if progress is not None else None, job_id)
+        )
+
+    def requeue(self, job_id: str):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, worker_pid = NULL, worker_id = NULL, started_at = NULL, heartbeat_at = NULL, "
+            "progress = '{}' WHERE id = ?",
+            (QUEUED, job_id)
+        )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued job at once, or flag a running one; returns the resulting status"""
+        conn = self._connect()
+        conn.execute("UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE id = ? AND status = ?",
+                     (CANCELLED, time.time(), job_id, QUEUED))
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        job = self.get(job_id)
+        return job["status"] if job else None
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self._connect().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def recover_interrupted(self, instance_id: Optional[str] = None, stale_after: float = 60.0) -> List[str]:
+        """Put running jobs whose worker is gone back in the queue (after a crash or restart).
+
+        A job is interrupted when its heartbeat is older than ``stale_after``
+        seconds. Several API processes may share the job table, so a fresh
+        heartbeat keeps a job running whichever pool claimed it; given the
+        ``instance_id`` of a pool, that pool's own jobs are never requeued.
+        """
+        requeued = []
+        cutoff = time.time() - stale_after
+        for job in self.list(RUNNING, limit=10000):
+            instance = (job["worker_id"] or "").partition(":")[0]
+            stale = (job["heartbeat_at"] or job["started_at"] or 0) < cutoff
+            if stale and (instance_id is None or instance != instance_id):
+                self.requeue(job["id"])
+                requeued.append(job["id"])
+        return requeued
+
+    def add_detection(self, job_id: str, record: Dict[str, Any]):
+        self._connect().execute("INSERT INTO job_detections (job_id, record) VALUES (?, ?)",
+                                (job_id, json.dumps(record)))
+
+    def detections_since(self, seq: int, limit: int = 100):
+        """Detection records written by jobs after ``seq``, as (seq, job_id, record) tuples"""
+        rows = self._connect().execute(
+            "SELECT seq, job_id, record FROM job_detections WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+        )
+        return [(row["seq"], row["job_id"], json.loads(row["record"])) for row in rows]
+
+    def last_detection_seq(self) -> int:
+        row = self._connect().execute("SELECT MAX(seq) AS seq FROM job_detections").fetchone()
+        return row["seq"] or 0
+
+
+# Handed to a job function: reports progress and stops the job when asked to
+class JobContext:
+    def __init__(self, store: JobStore, job: Dict[str, Any], stop_event, interval: float = 0.5):
+        self.store = store
+        self.job = job
+        self.job_id = job["id"]
+        self.params = job["params"] or {}
+        self.file_path = job["file_path"]
+        self.stop_event = stop_event
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.state: Dict[str, Any] = {}
+        self._last_write = 0.0
+
+    def progress(self, frames_processed: int, total_frames: Optional[int] = None, force: bool = False, **fields):
+        """Record progress (written at most every ``interval`` seconds) and honour cancel/stop requests"""
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise WorkerStopping()
+
+        elapsed = time.perf_counter() - self.started
+        fps = frames_processed / elapsed if elapsed > 0 else 0.0
+        remaining = max(total_frames - frames_processed, 0) if total_frames else None
+        self.state = {
+            **self.state,
+            **fields,
+            "frames_processed": frames_processed,
+            "total_frames": total_frames,
+            "percent": min(100.0, 100.0 * frames_processed / total_frames) if total_frames else None,
+            "fps": fps,
+            "eta_seconds": remaining / fps if remaining is not None and fps > 0 else None,
+            "elapsed_seconds": elapsed,
+        }
+
+        now = time.perf_counter()
+        if force or now - self._last_write >= self.interval:
+            self._last_write = now
+            self.store.update_progress(self.job_id, self.state)
+            if self.store.cancel_requested(self.job_id):
+                raise JobCancelled()
+
+    def add_detection(self, record: Dict[str, Any]):
+        self.store.add_detection(self.job_id, record)
+
+
+# Run one claimed job and record how it ended
+def run_job(store: JobStore, job: Dict[str, Any], job_fn: Callable[[JobContext], Any], stop_event=None):
+    context = JobContext(store, job, stop_event)
+    try:
+        result = job_fn(context)
+        store.finish(job["id"], COMPLETED, result=result, progress=context.state)
+    except JobCancelled:
+        logging.info(f"Job {job['id']} cancelled")
+        store.finish(job["id"], CANCELLED, progress=context.state)
+    except WorkerStopping:
+        # The input is kept so the job can start over on the next worker
+        logging.info(f"Job {job['id']} interrupted by shutdown, back in the queue")
+        store.requeue(job["id"])
+        return
+    except Exception as e:
+        logging.exception(f"Job {job['id']} failed")
+        store.finish(job["id"], FAILED, error=str(e), progress=context.state)
+
+    if job["file_path"] and os.path.exists(job["file_path"]):
+        os.remove(job["file_path"])
+
+
+# Keep the heartbeat of a worker's running job fresh, also while the job itself is busy between progress writes
+def heartbeat_loop(store: JobStore, worker_id: str, stop_event, interval: float):
+    while not stop_event.wait(interval):
+        try:
+            store.heartbeat(worker_id)
+        except Exception as e:
+            logging.warning(f"Job worker {worker_id} heartbeat failed: {e}")
+
+
+# Entry point of a worker process: claim queued jobs and run them until told to stop
+def worker_main(db_path: str, target: str, stop_event, poll_interval: float = 0.5, instance_id: str = "",
+                heartbeat_interval: float = 5.0):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    module_name, _, function_name = target.partition(":")
+    job_fn = getattr(importlib.import_module(module_name), function_name)
+    store = JobStore(db_path)
+    pid = os.getpid()
+    parent_pid = os.getppid()
+    worker_id = f"{instance_id}:{pid}"
+    threading.Thread(target=heartbeat_loop, args=(store, worker_id, stop_event, heartbeat_interval),
+                     name="job-heartbeat", daemon=True).start()
+    logging.info(f"Job worker {pid} started")
+
+    # Workers are not daemonic (jobs may start processes of their own), so leave if the API process is gone
+    while not stop_event.is_set() and os.getppid() == parent_pid:
+        job = store.claim_next(pid, worker_id)
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+        logging.info(f"Job worker {pid} running job {job['id']}")
+        run_job(store, job, job_fn, stop_event)
+
+
+# Pool of worker processes consuming the job table
+class JobWorkerPool:
+    """Start ``workers`` processes that each run ``target`` ("module:function") on claimed jobs.
+
+    Jobs run outside the web server, so a long video never blocks requests,
+    and at most ``workers`` jobs run at a time; the rest wait in the queue.
+    :meth:`ensure_workers` replaces a worker that died; one that keeps dying
+    soon after its start is restarted after ``restart_backoff`` seconds,
+    doubling up to ``max_restart_backoff``.
+    """
+
+    def __init__(self, db_path: str, target: str, workers: int = 1, poll_interval: float = 0.5,
+                 heartbeat_interval: float = 5.0, restart_backoff: float = 1.0, max_restart_backoff: float = 60.0):
+        self.db_path = db_path
+        self.target = target
+        self.workers = max(0, int(workers))
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.restart_backoff = max(0.0, float(restart_backoff))
+        self.max_restart_backoff = max(self.restart_backoff, float(max_restart_backoff))
+        # New for every server start; jobs claimed under another instance were interrupted
+        self.instance_id = uuid.uuid4().hex
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+        self.processes: List[multiprocessing.Process] = []
+
+        # Per worker slot: its own stop event (a killed process can leave a shared one waiting forever in set()),
+        # when its process started, how often it died soon after, and when to replace it
+        self._stop_events: List[Any] = []
+        self._started_at: List[float] = []
+        self._failures: List[int] = []
+        self._restart_at: List[Optional[float]] = []
+        self.restarts = 0
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        self._stop_events[index] = self._context.Event()
+        process = self._context.Process(target=worker_main, name=f"job-worker-{index}", daemon=False,
+                                        args=(self.db_path, self.target, self._stop_events[index],
+                                              self.poll_interval, self.instance_id, self.heartbeat_interval))
+        process.start()
+        return process
+
+    def start(self):
+        if self.processes:
+            return
+        self._stopping = False
+        self._stop_events = [None] * self.workers
+        now = time.monotonic()
+        self.processes = [self._spawn(index) for index in range(self.workers)]
+        self._started_at = [now] * self.workers
+        self._failures = [0] * self.workers
+        self._restart_at = [None] * self.workers
+
+    def ensure_workers(self) -> int:
+        """Replace worker processes that died (a crash or an OOM kill); returns how many were started"""
+        if not self.processes or self._stopping:
+            return 0
+        started = 0
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if self._restart_at[index] is None:
+                # A worker that ran for a while is replaced quickly; one that keeps dying waits longer each time
+                quick = now - self._started_at[index] < self.max_restart_backoff
+                self._failures[index] = self._failures[index] + 1 if quick else 1
+                delay = min(self.max_restart_backoff, self.restart_backoff * 2 ** (self._failures[index] - 1))
+                self._restart_at[index] = now + delay
+                logging.warning(f"Job worker {process.pid} exited with code {process.exitcode}, "
+                                f"restarting in {delay:.1f}s")
+            if now >= self._restart_at[index]:
+                process.join(0)
+                self.processes[index] = self._spawn(index)
+                self._started_at[index] = now
+                self._restart_at[index] = None
+                self.restarts += 1
+                started += 1
+        return started
+
+    def stop(self, timeout: float = 10.0):
+        """Ask the workers to finish; running jobs go back to the queue"""
+        self._stopping = True
+        for process, stop_event in zip(self.processes, self._stop_events):
+            if process.is_alive():
+                stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+                process.join(1.0)
+        self.processes = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "instance_id": self.instance_id,
+            "alive": sum(process.is_alive() for process in self.processes),
+            "pids": [process.pid for process in self.processes],
+            "restarts": self.restarts,
+        }
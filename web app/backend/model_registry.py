@@ -0,0 +1,161 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Resident memory of this process in bytes, or None when it cannot be read
+def process_rss():
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Bytes held by the weights: parameters and buffers for PyTorch, the graph file for ONNX Runtime
+def model_weight_bytes(model):
+    onnx_path = getattr(model, "onnx_path", None)
+    if onnx_path:
+        return os.path.getsize(onnx_path)
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+
+# Numbers every load in this process, so two loads never share a key
+_load_ids = itertools.count(1)
+
+
+# One loaded model version
+class ModelVersion:
+    def __init__(self, version, path, backend, precision, model, backend_name, load_time, rss_delta,
+                 loaded_precision=None):
+        self.version = version
+        self.path = path
+        self.backend = backend_name
+        self.requested_backend = backend
+        self.precision = loaded_precision or precision
+        self.requested_precision = precision
+        self.model = model
+        self.loaded_at = time.time()
+        self.load_id = next(_load_ids)
+        self.load_time = load_time
+        self.weights_bytes = model_weight_bytes(model)
+        self.rss_delta_bytes = rss_delta
+        self.warmed_up = False
+        self.warmup_time = None
+        self.warmup_runs: Dict[str, float] = {}
+
+    @property
+    def key(self) -> str:
+        """Identifies this exact load, so results of a reloaded version are not confused with the old one"""
+        return f"{self.version}@{self.loaded_at:.3f}#{self.load_id}"
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "backend": self.backend,
+            "precision": self.precision,
+            "requested_precision": self.requested_precision,
+            "loaded_at": self.loaded_at,
+            "load_time": self.load_time,
+            "warmed_up": self.warmed_up,
+            "warmup_time": self.warmup_time,
+            "memory": {"weights_bytes": self.weights_bytes, "rss_delta_bytes": self.rss_delta_bytes},
+        }
+
+
+# Loaded model versions with atomic activation
+class ModelRegistry:
+    """Keep several model versions in memory and switch the active one without downtime.
+
+    ``loader(path, backend, precision, onnx_path)`` must return
+    ``(model, backend_name, loaded_precision)``, the precision that was
+    actually loaded (it differs from the requested one after a fallback). Activation only swaps a reference, so requests
+    that already picked up the previous model finish on it; the old version
+    stays loaded until it is unloaded explicitly.
+    """
+
+    def __init__(self, loader: Callable[..., Any]):
+        self.loader = loader
+        self._versions: Dict[str, ModelVersion] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self.active: Optional[ModelVersion] = None
+
+    def get(self, version: str) -> ModelVersion:
+        entry = self._versions.get(version)
+        if entry is None:
+            raise KeyError(f"Model version not loaded: {version}")
+        return entry
+
+    def load(self, version, path, backend="pytorch", precision="fp32", onnx_path=None,
+             activate=False) -> ModelVersion:
+        """Load a version (blocking); loading a version that is already loaded returns it"""
+        with self._lock:
+            version_lock = self._loading.setdefault(version, threading.Lock())
+
+        # Concurrent loads of the same version wait for the first one
+        with version_lock:
+            entry = self._versions.get(version)
+            if entry is None:
+                rss_before = process_rss()
+                start = time.perf_counter()
+                model, backend_name, loaded_precision = self.loader(path, backend, precision, onnx_path)
+                load_time = time.perf_counter() - start
+                rss_after = process_rss()
+                rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+
+                entry = ModelVersion(version, path, backend, precision, model, backend_name, load_time, rss_delta,
+                                     loaded_precision)
+                with self._lock:
+                    self._versions[version] = entry
+                logging.info(f"Loaded model version {version} ({backend_name}, {entry.precision}) in {load_time:.2f}s")
+
+        if activate:
+            self.activate(version)
+        return entry
+
+    def warm_up(self, version: str, warm_fn: Callable[[Any], Dict[str, float]]) -> Dict[str, float]:
+        """Run ``warm_fn(model)`` on a version (blocking) and mark it warmed up"""
+        entry = self.get(version)
+        start = time.perf_counter()
+        entry.warmup_runs = warm_fn(entry.model) or {}
+        entry.warmup_time = time.perf_counter() - start
+        entry.warmed_up = True
+        return entry.warmup_runs
+
+    def activate(self, version: str) -> ModelVersion:
+        entry = self.get(version)
+        with self._lock:
+            previous = self.active
+            self.active = entry
+        if previous is not entry:
+            logging.info(f"Activated model version {version}"
+                         + (f" (was {previous.version})" if previous is not None else ""))
+        return entry
+
+    def unload(self, version: str):
+        with self._lock:
+            entry = self.get(version)
+            if entry is self.active:
+                raise ValueError(f"Cannot unload the active model version: {version}")
+            del self._versions[version]
+            self._loading.pop(version, None)
+        logging.info(f"Unloaded model version {version}")
+
+    def list(self) -> List[Dict[str, Any]]:
+        active = self.active
+        return [{**entry.summary(), "active": entry is active} for entry in list(self._versions.values())]
@@ -0,0 +1,157 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+# Frames checked but still waiting for their result, per gate
+MAX_CANDIDATES = 64
+
+
+# Cheap change detector used to skip inference on static frames
+class MotionGate:
+    """Decide per frame whether the detector needs to run again.
+
+    Frames are shrunk to ``downscale_width`` pixels wide, converted to
+    grayscale and compared with the frame that last went through the model.
+    If fewer than ``threshold`` (a fraction, 0-1) of the pixels changed by more
+    than ``pixel_threshold`` grey levels, the previous result is reused.
+    ``threshold=0`` disables the gate. Inference is still forced after
+    ``max_skip`` consecutive skipped frames.
+
+    A frame only becomes the reference once :meth:`update` stores the
+    detector output for it, so a failed inference never leaves a reference
+    without a matching result. Callers that check frames ahead of their
+    results (a video pipeline) pass the frame ``index`` to both methods so
+    each result is paired with its own frame. Both methods may be called
+    from worker threads.
+    """
+
+    def __init__(self, threshold: float = 0.01, pixel_threshold: int = 25, downscale_width: int = 64,
+                 max_skip: int = 30):
+        self.threshold = max(0.0, float(threshold))
+        self.pixel_threshold = int(pixel_threshold)
+        self.downscale_width = max(8, int(downscale_width))
+        self.max_skip = max(0, int(max_skip))
+
+        self._lock = threading.Lock()
+        self._reference = None
+        # Thumbnails of frames sent to the model, by frame index, until their result arrives
+        self._candidates: "OrderedDict[Any, Any]" = OrderedDict()
+        self.last_result = None
+        self.last_score = 1.0
+        self._consecutive_skips = 0
+
+        # Counters for reporting
+        self.frames = 0
+        self.skipped = 0
+
+    def _thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.downscale_width, max(1, round(h * self.downscale_width / w)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        # Light blur so sensor noise and compression artefacts are not counted as motion
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def motion_score(self, thumbnail):
+        """Fraction of pixels that changed since the last inferred frame"""
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            return 1.0
+        diff = cv2.absdiff(thumbnail, self._reference)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+
+    def check(self, frame, index=None) -> bool:
+        """Return True when ``frame`` should be run through the model"""
+        if self.threshold == 0:
+            # Disabled: no thumbnail, every frame runs
+            with self._lock:
+                self.frames += 1
+            return True
+
+        thumbnail = self._thumbnail(frame)
+        with self._lock:
+            self.frames += 1
+            self.last_score = self.motion_score(thumbnail)
+
+            run = (self.threshold == 0 or self.last_result is None or self.last_score >= self.threshold
+                   or self._consecutive_skips >= self.max_skip)
+            if run:
+                # Becomes the reference when its result arrives in update()
+                self._candidates.pop(index, None)
+                self._candidates[index] = thumbnail
+                while len(self._candidates) > MAX_CANDIDATES:
+                    self._candidates.popitem(last=False)
+                self._consecutive_skips = 0
+            else:
+                self.skipped += 1
+                self._consecutive_skips += 1
+            return run
+
+    def update(self, result, index=None):
+        """Store the detector output of the frame checked with ``index`` to reuse for unchanged frames"""
+        with self._lock:
+            self.last_result = result
+            # Compare later frames with the one the detector actually saw
+            candidate = self._candidates.pop(index, None)
+            if candidate is not None:
+                self._reference = candidate
+            # Earlier frames still waiting never got a result
+            if index is not None:
+                for stale in [key for key in self._candidates if key is not None and key < index]:
+                    del self._candidates[stale]
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_ratio": self.skip_ratio,
+            "last_score": self.last_score,
+        }
+
+
+# Motion gates for live streams, one per stream id
+class MotionGateRegistry:
+    """Keep a :class:`MotionGate` per stream, dropping the least recently used past ``max_streams``"""
+
+    def __init__(self, max_streams: int = 256, **gate_kwargs):
+        self.max_streams = max(1, int(max_streams))
+        self.gate_kwargs = gate_kwargs
+        self._gates: "OrderedDict[str, MotionGate]" = OrderedDict()
+
+        # Totals include streams that were already dropped
+        self._retired_frames = 0
+        self._retired_skipped = 0
+
+    def get(self, stream_id: str, threshold: Optional[float] = None) -> MotionGate:
+        gate = self._gates.get(stream_id)
+        if gate is None:
+            gate = MotionGate(**self.gate_kwargs)
+            self._gates[stream_id] = gate
+            while len(self._gates) > self.max_streams:
+                _, old = self._gates.popitem(last=False)
+                self._retired_frames += old.frames
+                self._retired_skipped += old.skipped
+        self._gates.move_to_end(stream_id)
+
+        if threshold is not None:
+            gate.threshold = max(0.0, float(threshold))
+        return gate
+
+    def stats(self) -> Dict[str, Any]:
+        frames = self._retired_frames + sum(gate.frames for gate in self._gates.values())
+        skipped = self._retired_skipped + sum(gate.skipped for gate in self._gates.values())
+        return {
+            "streams": len(self._gates),
+            "frames": frames,
+            "skipped": skipped,
+            "skip_ratio": skipped / frames if frames else 0.0,
+            "per_stream": {stream_id: gate.stats() for stream_id, gate in self._gates.items()},
+        }
@@ -0,0 +1,368 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+from model_backends import OnnxYOLO, load_onnx_model
+
+# Reduced-precision model modes supported by get_model()
+PRECISIONS = ("fp32", "int8-dynamic", "int8-static", "bf16")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+
+# Run an ultralytics model under CPU bfloat16 autocast
+class Bf16YOLO:
+    """Wrap an ``ultralytics.YOLO`` model so inference runs with bfloat16 autocast on CPU"""
+
+    backend = "pytorch-bf16"
+
+    def __init__(self, model):
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __call__(self, *args, **kwargs):
+        import torch
+
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            results = self.model(*args, **kwargs)
+
+        # numpy has no bfloat16, so hand boxes back as float32
+        for result in results:
+            if result.boxes is not None:
+                result.boxes.data = result.boxes.data.float()
+        return results
+
+
+# Check whether the CPU has native bfloat16 support (AVX512-BF16 or AMX)
+def bf16_supported():
+    try:
+        import torch
+    except ImportError:
+        return False
+
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        pass
+
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+    except OSError:
+        return False
+
+
+# Load calibration frames from image folders, image files or videos
+def load_calibration_frames(sources, max_frames=200, video_stride=15, input_size=(640, 640)):
+    """Return RGB frames resized the same way as detect_weapons() resizes its input"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(p for p in glob.glob(os.path.join(source, "**", "*"), recursive=True)
+                                if p.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS)))
+        elif os.path.exists(source):
+            paths.append(source)
+        else:
+            logging.warning(f"Calibration source not found: {source}")
+
+    frames = []
+    for path in paths:
+        if len(frames) >= max_frames:
+            break
+
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            video_cap = cv2.VideoCapture(path)
+            frame_count = 0
+            while video_cap.isOpened() and len(frames) < max_frames:
+                ret, frame = video_cap.read()
+                if not ret:
+                    break
+                if frame_count % video_stride == 0:
+                    frames.append(cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), input_size))
+                frame_count += 1
+            video_cap.release()
+        else:
+            img = cv2.imread(path)
+            if img is not None:
+                frames.append(cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), input_size))
+
+    return frames
+
+
+# Feed preprocessed calibration frames to the ONNX Runtime static quantizer
+class FrameCalibrationReader:
+    def __init__(self, input_name, blobs):
+        self.input_name = input_name
+        self._blobs = iter(blobs)
+
+    def get_next(self):
+        blob = next(self._blobs, None)
+        return None if blob is None else {self.input_name: blob}
+
+    def rewind(self):
+        pass
+
+
+# Keep the YOLO Detect head (box decoding and concat) in float for accuracy
+def detect_head_nodes(onnx_path):
+    import onnx
+
+    graph = onnx.load(onnx_path).graph
+    indices = [int(m.group(1)) for node in graph.node for m in [re.match(r"/model\.(\d+)/", node.name)] if m]
+    if not indices:
+        return []
+    head_prefix = f"/model.{max(indices)}/"
+    return [node.name for node in graph.node if node.name.startswith(head_prefix)]
+
+
+def quantized_model_path(onnx_path, precision):
+    return f"{os.path.splitext(onnx_path)[0]}.{precision}.onnx"
+
+
+# Quantize an FP32 ONNX graph to INT8 (dynamic, or static with calibration frames)
+def quantize_onnx(onnx_path, precision, calibration_sources=None, output_path=None, max_frames=200):
+    from onnxruntime.quantization import (CalibrationMethod, QuantFormat, QuantType, quantize_dynamic,
+                                          quantize_static)
+
+    output_path = output_path or quantized_model_path(onnx_path, precision)
+    excluded = detect_head_nodes(onnx_path)
+    start_time = time.time()
+
+    if precision == "int8-dynamic":
+        quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QUInt8, nodes_to_exclude=excluded)
+
+    elif precision == "int8-static":
+        frames = load_calibration_frames(calibration_sources or [], max_frames=max_frames)
+        if not frames:
+            raise ValueError("Static INT8 quantization needs calibration images or videos")
+
+        fp32_model = OnnxYOLO(onnx_path)
+        blobs = [fp32_model.preprocess([frame])[0] for frame in frames]
+        logging.info(f"Calibrating static INT8 model on {len(blobs)} frames")
+
+        quantize_static(onnx_path, output_path, FrameCalibrationReader(fp32_model.input_name, blobs),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        calibrate_method=CalibrationMethod.MinMax, nodes_to_exclude=excluded)
+    else:
+        raise ValueError(f"Not an INT8 precision: {precision}")
+
+    logging.info(f"{precision} model written to {output_path} in {time.time() - start_time:.1f}s")
+    return output_path
+
+
+# Load a detector in a reduced-precision mode
+def load_reduced_precision_detector(model_path, precision, onnx_path=None, calibration_sources=None):
+    """Return ``(model, backend_name)`` for ``precision``, or ``(None, None)`` if it is unavailable"""
+    if precision == "bf16":
+        if not bf16_supported():
+            logging.warning("CPU has no native bfloat16 support, bf16 mode unavailable")
+            return None, None
+        from ultralytics import YOLO
+
+        return Bf16YOLO(YOLO(model_path)), Bf16YOLO.backend
+
+    if precision in ("int8-dynamic", "int8-static"):
+        onnx_path = onnx_path or os.path.splitext(model_path)[0] + ".onnx"
+        quant_path = quantized_model_path(onnx_path, precision)
+
+        # Re-quantize when the FP32 graph is newer than the quantized one
+        fp32_model = load_onnx_model(model_path, onnx_path)
+        if not os.path.exists(quant_path) or os.path.getmtime(onnx_path) > os.path.getmtime(quant_path):
+            quantize_onnx(onnx_path, precision, calibration_sources)
+
+        quant_model = OnnxYOLO(quant_path, names=fp32_model.names)
+        quant_model.backend = f"onnx-{precision}"
+        return quant_model, quant_model.backend
+
+    return None, None
+
+
+# Load any precision, including the FP32 PyTorch reference
+def load_precision(model_path, precision, onnx_path=None, calibration_sources=None):
+    if precision == "fp32":
+        from ultralytics import YOLO
+
+        return YOLO(model_path), "pytorch"
+    return load_reduced_precision_detector(model_path, precision, onnx_path, calibration_sources)
+
+
+# Intersection over union between one box and many
+def box_iou(box, boxes):
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.float32)
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + areas - inter + 1e-9)
+
+
+# Greedily match candidate detections to reference detections (same class, IoU >= threshold)
+def match_detections(reference, candidate, iou_threshold=0.5):
+    matched_ious = []
+    conf_deltas = []
+    used = np.zeros(len(candidate), dtype=bool)
+
+    for ref in reference[np.argsort(-reference[:, 4])] if len(reference) else []:
+        same_class = (candidate[:, 5] == ref[5]) & ~used if len(candidate) else np.zeros(0, dtype=bool)
+        ious = np.where(same_class, box_iou(ref, candidate), 0.0) if len(candidate) else np.zeros(0)
+        if len(ious) and ious.max() >= iou_threshold:
+            best = int(ious.argmax())
+            used[best] = True
+            matched_ious.append(float(ious[best]))
+            conf_deltas.append(abs(float(candidate[best, 4]) - float(ref[4])))
+
+    return matched_ious, conf_deltas
+
+
+def detections_array(model, frame, conf_threshold):
+    results = model(frame, conf=conf_threshold, verbose=False)
+    rows = [result.boxes.data.cpu().numpy() for result in results if result.boxes is not None]
+    return np.concatenate(rows).astype(np.float32) if rows else np.zeros((0, 6), dtype=np.float32)
+
+
+# Time and collect detections for every frame
+def profile_model(model, frames, conf_threshold=0.25, warmup=2, repeats=3):
+    for frame in frames[:warmup]:
+        detections_array(model, frame, conf_threshold)
+
+    latencies = []
+    outputs = []
+    for frame in frames:
+        for i in range(repeats):
+            start_time = time.perf_counter()
+            dets = detections_array(model, frame, conf_threshold)
+            latencies.append(time.perf_counter() - start_time)
+        outputs.append(dets)
+
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return outputs, {
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+
+# Compare reduced-precision modes against the FP32 PyTorch model
+def precision_report(model_path, precisions, sources, onnx_path=None, conf_threshold=0.25,
+                     iou_threshold=0.5, max_frames=50, repeats=3):
+    frames = load_calibration_frames(sources, max_frames=max_frames)
+    if not frames:
+        raise ValueError("No frames found for the precision report")
+
+    reference_model, _ = load_precision(model_path, "fp32")
+    reference_outputs, reference_latency = profile_model(reference_model, frames, conf_threshold, repeats=repeats)
+
+    report = {
+        "frames": len(frames),
+        "conf_threshold": conf_threshold,
+        "iou_threshold": iou_threshold,
+        "fp32": {"backend": "pytorch", "latency": reference_latency,
+                 "detections": int(sum(len(d) for d in reference_outputs))},
+    }
+
+    for precision in precisions:
+        if precision == "fp32":
+            continue
+        try:
+            model, backend = load_precision(model_path, precision, onnx_path, sources)
+        except Exception as e:
+            report[precision] = {"error": str(e)}
+            continue
+        if model is None:
+            report[precision] = {"error": "not supported on this host"}
+            continue
+
+        outputs, latency = profile_model(model, frames, conf_threshold, repeats=repeats)
+        ious, conf_deltas = [], []
+        for reference, candidate in zip(reference_outputs, outputs):
+            frame_ious, frame_deltas = match_detections(reference, candidate, iou_threshold)
+            ious.extend(frame_ious)
+            conf_deltas.extend(frame_deltas)
+
+        reference_total = sum(len(d) for d in reference_outputs)
+        candidate_total = sum(len(d) for d in outputs)
+        report[precision] = {
+            "backend": backend,
+            "latency": latency,
+            "speedup": reference_latency["mean_ms"] / latency["mean_ms"] if latency["mean_ms"] else 0.0,
+            "detections": int(candidate_total),
+            "agreement": {
+                # Share of FP32 detections reproduced, and share of candidate detections backed by FP32
+                "recall_vs_fp32": len(ious) / reference_total if reference_total else 1.0,
+                "precision_vs_fp32": len(ious) / candidate_total if candidate_total else 1.0,
+                "mean_iou": float(np.mean(ious)) if ious else 0.0,
+                "mean_conf_delta": float(np.mean(conf_deltas)) if conf_deltas else 0.0,
+            },
+        }
+
+    return report
+
+
+def print_report(report):
+    print(f"Frames: {report['frames']}  conf>={report['conf_threshold']}  match IoU>={report['iou_threshold']}")
+    print(f"{'mode':<14}{'backend':<22}{'mean ms':>9}{'p95 ms':>9}{'speedup':>9}"
+          f"{'recall':>9}{'precision':>11}{'IoU':>7}")
+    for mode in PRECISIONS:
+        entry = report.get(mode)
+        if entry is None:
+            continue
+        if "error" in entry:
+            print(f"{mode:<14}{entry['error']}")
+            continue
+        agreement = entry.get("agreement", {"recall_vs_fp32": 1.0, "precision_vs_fp32": 1.0, "mean_iou": 1.0})
+        print(f"{mode:<14}{entry['backend']:<22}{entry['latency']['mean_ms']:>9.1f}{entry['latency']['p95_ms']:>9.1f}"
+              f"{entry.get('speedup', 1.0):>9.2f}{agreement['recall_vs_fp32']:>9.3f}"
+              f"{agreement['precision_vs_fp32']:>11.3f}{agreement['mean_iou']:>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate reduced-precision models and compare them with FP32")
+    parser.add_argument("command", choices=["calibrate", "report"])
+    parser.add_argument("--model", default=os.environ.get("MODEL_PATH", "best.pt"), help="FP32 .pt checkpoint")
+    parser.add_argument("--onnx", default=None, help="FP32 ONNX path (default: next to the checkpoint)")
+    parser.add_argument("--precision", nargs="+", default=["int8-dynamic", "int8-static", "bf16"],
+                        choices=PRECISIONS)
+    parser.add_argument("--images", nargs="+",
+                        default=[os.path.join("..", "..", "sample_images"), os.path.join("..", "..", "sample_video")],
+                        help="Folders, images or videos used for calibration and the report")
+    parser.add_argument("--max-frames", type=int, default=50)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    if args.command == "calibrate":
+        onnx_path = args.onnx or os.path.splitext(args.model)[0] + ".onnx"
+        load_onnx_model(args.model, onnx_path)
+        for precision in args.precision:
+            if precision.startswith("int8"):
+                quantize_onnx(onnx_path, precision, args.images, max_frames=args.max_frames)
+        return
+
+    report = precision_report(args.model, args.precision, args.images, args.onnx,
+                              conf_threshold=args.conf, max_frames=args.max_frames)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
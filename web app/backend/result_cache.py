@@ -0,0 +1,116 @@
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+# LRU + TTL cache for detection responses with single-flight de-duplication
+class ResultCache:
+    """Cache detection results by key and coalesce concurrent misses.
+
+    At most ``max_entries`` results are kept (least recently used evicted
+    first) and each expires ``ttl_seconds`` after it was computed. While a
+    key is being computed, further requests for it wait on the same
+    in-flight call instead of running the model again. Failures are never
+    cached. ``max_entries=0`` disables storage but keeps de-duplication.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = max(0.0, float(ttl_seconds))
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+        # Counters for reporting
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable):
+        """Return a copy of the cached value, or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries == 0 or self.ttl == 0:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]):
+        """Return ``(value, cache_hit)``, running ``compute`` at most once per key at a time"""
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value, True
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+
+            # Join an identical request that is already running
+            try:
+                value = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The request we joined was cancelled: compute it ourselves
+                if pending.cancelled():
+                    continue
+                raise
+            self.coalesced += 1
+            return copy.deepcopy(value), True
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        self.put(key, value)
+        future.set_result(value)
+        return copy.deepcopy(value), False
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,149 @@
+import importlib
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from jobs import JobCancelled
+
+# Set in each segment worker process by init_segment_worker
+_progress_queue = None
+_cancel_event = None
+
+
+# Split [0, total_frames) into up to `segments` contiguous ranges of at least `min_frames` frames
+def split_segments(total_frames: Optional[int], segments: int, min_frames: int = 0) -> List[Tuple[int, int]]:
+    if not total_frames or total_frames <= 0:
+        return [(0, None)]
+    segments = max(1, min(int(segments), total_frames // max(1, int(min_frames)) if min_frames > 0 else total_frames))
+    bounds = [round(i * total_frames / segments) for i in range(segments + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(segments)]
+
+
+# Stand-in for jobs.JobContext inside a segment worker process
+class SegmentContext:
+    """Offer the ``JobContext`` interface to a job function running one segment.
+
+    Progress goes back to the job's process through a queue (at most every
+    ``interval`` seconds) and detections are kept to be returned with the
+    result, so the job process can publish them in timestamp order. A set
+    ``cancel_event`` stops the segment at its next progress call.
+    """
+
+    def __init__(self, job_id: str, params: Dict[str, Any], file_path: str, segment: int, progress_queue,
+                 cancel_event, interval: float = 0.5):
+        self.job_id = job_id
+        self.params = params
+        self.file_path = file_path
+        self.segment = segment
+        self.progress_queue = progress_queue
+        self.cancel_event = cancel_event
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.state: Dict[str, Any] = {}
+        self.detections: List[Dict[str, Any]] = []
+        self._last_write = 0.0
+
+    def progress(self, frames_processed: int, total_frames: Optional[int] = None, force: bool = False, **fields):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        self.state = {**self.state, **fields, "frames_processed": frames_processed, "total_frames": total_frames}
+
+        now = time.perf_counter()
+        if force or now - self._last_write >= self.interval:
+            self._last_write = now
+            self.progress_queue.put((self.segment, self.state))
+
+    def add_detection(self, record: Dict[str, Any]):
+        self.detections.append(record)
+
+
+# Runs once in every segment worker process, before the job module is imported
+def init_segment_worker(progress_queue, cancel_event, intra_op_threads: int):
+    global _progress_queue, _cancel_event
+    _progress_queue = progress_queue
+    _cancel_event = cancel_event
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    # The segments share the cores, so each one gets its share of the inference threads
+    if intra_op_threads:
+        os.environ["INTRA_OP_THREADS"] = str(intra_op_threads)
+        os.environ["INTER_OP_THREADS"] = "1"
+
+
+def run_segment(target: str, job_id: str, params: Dict[str, Any], file_path: str, segment: int, start: int,
+                end: Optional[int]):
+    module_name, _, function_name = target.partition(":")
+    segment_fn = getattr(importlib.import_module(module_name), function_name)
+    context = SegmentContext(job_id, params, file_path, segment, _progress_queue, _cancel_event)
+    result = segment_fn(context, start, end)
+    context.progress(context.state.get("frames_processed", 0), context.state.get("total_frames"), force=True)
+    return result, context.detections
+
+
+# Run a job's segments on a pool of processes, reporting combined progress through the job's own context
+def run_segments(job, target: str, ranges: List[Tuple[int, Optional[int]]], workers: int,
+                 intra_op_threads: int = 0, total_frames: Optional[int] = None, poll_interval: float = 0.2):
+    """Run ``target(context, start, end)`` ("module:function") for every range on ``workers`` processes.
+
+    Each segment's detections are passed to ``job.add_detection`` as soon as
+    every earlier segment has finished, so they arrive in timestamp order.
+    Returns the segment results in range order. Cancelling or stopping the
+    job (raised by ``job.progress``) stops the segments still running.
+    """
+    context = multiprocessing.get_context("spawn")
+    progress_queue = context.Queue()
+    cancel_event = context.Event()
+    segment_states: Dict[int, Dict[str, Any]] = {}
+    results: List[Any] = [None] * len(ranges)
+
+    pool = ProcessPoolExecutor(max_workers=max(1, int(workers)), mp_context=context,
+                               initializer=init_segment_worker,
+                               initargs=(progress_queue, cancel_event, intra_op_threads))
+
+    def drain():
+        try:
+            while True:
+                segment, state = progress_queue.get(timeout=poll_interval)
+                segment_states[segment] = state
+        except queue.Empty:
+            pass
+
+    def report(force=False):
+        states = segment_states.values()
+        job.progress(sum(state.get("frames_processed", 0) for state in states), total_frames, force=force,
+                     weapon_frames=sum(state.get("weapon_frames", 0) for state in states),
+                     tracked_frames=sum(state.get("tracked_frames", 0) for state in states),
+                     segments=[{"start": start, "end": end,
+                                "frames_processed": segment_states.get(index, {}).get("frames_processed", 0),
+                                "done": futures[index].done()}
+                               for index, (start, end) in enumerate(ranges)])
+
+    try:
+        futures = [pool.submit(run_segment, target, job.job_id, job.params, job.file_path, index, start, end)
+                   for index, (start, end) in enumerate(ranges)]
+        published = 0
+        while published < len(futures):
+            drain()
+
+            # Publish finished segments in order; a failed segment fails the job
+            while published < len(futures) and futures[published].done():
+                results[published], detections = futures[published].result()
+                for record in detections:
+                    job.add_detection(record)
+                published += 1
+
+            report()
+
+        # Every segment sent its final counts before returning
+        drain()
+        report(force=True)
+    except BaseException:
+        cancel_event.set()
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return results
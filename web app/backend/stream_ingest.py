@@ -0,0 +1,194 @@
+import os
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# Upload content types that can be decoded while the upload is still arriving
+STREAMABLE_TYPES = {
+    "video/x-motion-jpeg": "mjpeg",
+    "video/x-mjpeg": "mjpeg",
+    "video/mjpeg": "mjpeg",
+    "multipart/x-mixed-replace": "mjpeg",
+}
+
+JPEG_START = b"\xff\xd8"
+
+# JPEG markers that stand alone, without a length field: TEM, RST0-RST7 and SOI
+STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD9)}
+EOI_MARKER = 0xD9
+SOS_MARKER = 0xDA
+
+
+# Name of an upload while it is still being written; it is renamed to `path` after the last byte
+def partial_path(path: str) -> str:
+    return path + ".part"
+
+
+# End offset (exclusive) of the JPEG that starts at `start`, or None while its bytes are incomplete; raises
+# ValueError on data that is not a JPEG. Marker segments are skipped by their length, so a thumbnail embedded in
+# an EXIF (APP1) segment, with its own start and end markers, does not end the frame early
+def jpeg_end(data, start: int = 0) -> Optional[int]:
+    position = start + 2
+    size = len(data)
+    while position + 1 < size:
+        if data[position] != 0xFF:
+            raise ValueError(f"Expected a JPEG marker at offset {position}")
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            position += 1
+            continue
+        if marker == EOI_MARKER:
+            return position + 2
+        if marker in STANDALONE_MARKERS:
+            position += 2
+            continue
+
+        if position + 3 >= size:
+            return None
+        position += 2 + ((data[position + 2] << 8) | data[position + 3])
+        if marker != SOS_MARKER:
+            continue
+
+        # Entropy-coded scan data runs up to the next marker; FF00 is an escaped FF byte and RSTn stays inside
+        while True:
+            position = data.find(b"\xff", position)
+            if position < 0 or position + 1 >= size:
+                return None
+            following = data[position + 1]
+            if following == 0x00 or 0xD0 <= following <= 0xD7:
+                position += 2
+            elif following == 0xFF:
+                position += 1
+            else:
+                break
+    return None
+
+
+# Open an uploaded video: a growing MJPEG stream is followed as it is written, anything else goes to OpenCV
+def open_video(path: str, stream_format: Optional[str] = None, fps: Optional[float] = None,
+               stall_timeout: float = 30.0):
+    if stream_format == "mjpeg":
+        return GrowingMJPEGCapture(path, fps, stall_timeout)
+    return cv2.VideoCapture(path)
+
+
+# cv2.VideoCapture look-alike over an MJPEG upload that may still be arriving
+class GrowingMJPEGCapture:
+    """Read JPEG frames from ``path`` (or ``path + ".part"`` while the upload is in progress).
+
+    Frames start at a JPEG start marker and end where :func:`jpeg_end` finds
+    the end of the image, so bare concatenated JPEGs and
+    ``multipart/x-mixed-replace`` bodies both work, with or without EXIF
+    thumbnails. Data that is not a valid JPEG is skipped up to the next
+    start marker. At the end of the
+    data the reader waits for more while the ``.part`` file exists; the
+    stream ends once the upload has been renamed to ``path`` and everything
+    is read, or when nothing new arrives for ``stall_timeout`` seconds.
+    :meth:`grab` only finds the next frame's bytes; :meth:`read` also decodes
+    them, so skipped frames cost no JPEG decoding.
+    """
+
+    def __init__(self, path: str, fps: Optional[float] = None, stall_timeout: float = 30.0,
+                 chunk_size: int = 1 << 20, poll_interval: float = 0.05):
+        self.path = path
+        self.fps = fps or 0.0
+        self.stall_timeout = stall_timeout
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self._buffer = bytearray()
+        self._frame: Optional[bytes] = None
+        self._position = 0
+        self._file = None
+
+        # Rename keeps the open file, so the reader can start on the partial upload and finish on the same handle
+        for candidate in (partial_path(path), path):
+            try:
+                self._file = open(candidate, "rb")
+                break
+            except FileNotFoundError:
+                continue
+
+    def isOpened(self) -> bool:
+        return self._file is not None
+
+    def _upload_complete(self) -> bool:
+        return not os.path.exists(partial_path(self.path))
+
+    def _next_frame(self) -> Optional[bytes]:
+        idle_since = None
+        while self._file is not None:
+            start = self._buffer.find(JPEG_START)
+            if start >= 0:
+                # Drop whatever came before the frame (multipart headers)
+                del self._buffer[:start]
+                try:
+                    end = jpeg_end(self._buffer)
+                except ValueError:
+                    # Not a JPEG after all: look for the next start marker
+                    del self._buffer[:2]
+                    continue
+                if end is not None:
+                    frame = bytes(self._buffer[:end])
+                    del self._buffer[:end]
+                    return frame
+            else:
+                del self._buffer[:max(0, len(self._buffer) - 1)]
+
+            # Check for completion before reading, so data written just before the rename is not missed
+            complete = self._upload_complete()
+            chunk = self._file.read(self.chunk_size)
+            if chunk:
+                self._buffer += chunk
+                idle_since = None
+                continue
+            if complete:
+                return None
+
+            idle_since = idle_since or time.monotonic()
+            if time.monotonic() - idle_since > self.stall_timeout:
+                return None
+            time.sleep(self.poll_interval)
+        return None
+
+    def grab(self) -> bool:
+        self._frame = self._next_frame()
+        if self._frame is None:
+            return False
+        self._position += 1
+        return True
+
+    def retrieve(self):
+        if self._frame is None:
+            return False, None
+        frame = cv2.imdecode(np.frombuffer(self._frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return frame is not None, frame
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._position)
+        # The length is unknown until the upload ends
+        return 0.0
+
+    def set(self, prop, value) -> bool:
+        # Forward seeks skip frames without decoding them; backward seeks are not supported
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            while self._position < int(value):
+                if not self.grab():
+                    return False
+            return self._position == int(value)
+        return False
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
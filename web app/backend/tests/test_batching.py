@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from batching import InferenceBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def echo_batches(calls):
+    def batch_fn(images, thresholds):
+        calls.append(list(images))
+        return [(image, threshold) for image, threshold in zip(images, thresholds)]
+    return batch_fn
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_window():
+    calls = []
+    batcher = InferenceBatcher(echo_batches(calls), max_batch_size=4, max_wait_ms=5000)
+
+    async def main():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(batcher.submit(i, 0.1 * i) for i in range(4)))
+        elapsed = time.perf_counter() - start
+        await batcher.stop()
+        return results, elapsed
+
+    results, elapsed = run(main())
+    assert calls == [[0, 1, 2, 3]]
+    assert elapsed < 2.0
+    assert [result for result, _ in results] == [(i, 0.1 * i) for i in range(4)]
+    assert all(timing["batch_size"] == 4 for _, timing in results)
+
+
+def test_batch_never_exceeds_max_size():
+    calls = []
+    batcher = InferenceBatcher(echo_batches(calls), max_batch_size=3, max_wait_ms=50)
+
+    async def main():
+        await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+        await batcher.stop()
+
+    run(main())
+    assert [len(batch) for batch in calls] == [3, 3, 1]
+    assert batcher.stats()["requests_served"] == 7
+    assert batcher.stats()["batches_run"] == 3
+
+
+def test_partial_batch_is_flushed_when_the_window_expires():
+    calls = []
+    batcher = InferenceBatcher(echo_batches(calls), max_batch_size=8, max_wait_ms=50)
+
+    async def main():
+        start = time.perf_counter()
+        (result, timing), = await asyncio.gather(batcher.submit("only"))
+        elapsed = time.perf_counter() - start
+        await batcher.stop()
+        return result, timing, elapsed
+
+    result, timing, elapsed = run(main())
+    assert calls == [["only"]]
+    assert result == ("only", 0.25)
+    assert timing["batch_size"] == 1
+    assert 0.04 <= elapsed < 2.0
+
+
+def test_batch_failure_is_raised_to_every_request():
+    def batch_fn(images, thresholds):
+        raise RuntimeError("model failed")
+
+    batcher = InferenceBatcher(batch_fn, max_batch_size=2, max_wait_ms=10)
+
+    async def main():
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
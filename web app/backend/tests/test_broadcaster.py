@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from broadcaster import Broadcaster
+
+
+class FakeWebSocket:
+    """WebSocket stand-in whose sends wait on ``gate`` (open unless stalled)"""
+
+    def __init__(self, stalled=False):
+        self.gate = asyncio.Event()
+        if not stalled:
+            self.gate.set()
+        self.received = []
+        self.close_code = None
+
+    async def send_text(self, message):
+        await self.gate.wait()
+        self.received.append(message)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+# Let the sender tasks run until their queues are empty or they are stuck
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_drop_oldest_keeps_only_the_newest_messages():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=3)
+        websocket = FakeWebSocket(stalled=True)
+        broadcaster.register(websocket)
+
+        # The first message is taken by the sender, which then waits on the client
+        broadcaster.publish("m0")
+        await settle()
+        for index in range(1, 10):
+            broadcaster.publish(f"m{index}")
+
+        websocket.gate.set()
+        await settle()
+        stats = broadcaster.stats()
+        await broadcaster.close()
+        return websocket, stats
+
+    websocket, stats = asyncio.run(scenario())
+
+    assert websocket.received == ["m0", "m7", "m8", "m9"]
+    assert stats["dropped"] == 6
+    assert stats["sent"] == 4
+    assert stats["clients"] == 1
+
+
+def test_disconnect_policy_evicts_a_client_that_overflows():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=2, policy="disconnect")
+        slow, fast = FakeWebSocket(stalled=True), FakeWebSocket()
+        broadcaster.register(slow)
+        broadcaster.register(fast)
+
+        # The fast client drains its queue between messages; the stalled one only piles up
+        for index in range(5):
+            broadcaster.publish(f"m{index}")
+            await settle()
+        stats = broadcaster.stats()
+        await broadcaster.close()
+        return slow, fast, stats
+
+    slow, fast, stats = asyncio.run(scenario())
+
+    assert slow.close_code == 1013
+    assert slow.received == []
+    assert fast.received == ["m0", "m1", "m2", "m3", "m4"]
+    assert stats["evicted"] == 1
+    assert stats["clients"] == 1
+
+
+def test_send_timeout_evicts_a_stalled_client_without_blocking_the_others():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=8, send_timeout=0.05)
+        stalled, healthy = FakeWebSocket(stalled=True), FakeWebSocket()
+        broadcaster.register(stalled)
+        broadcaster.register(healthy)
+
+        broadcaster.publish("m0")
+        await settle()
+        # The healthy client got its message while the stalled send is still pending
+        delivered_before_timeout = list(healthy.received)
+        await asyncio.sleep(0.2)
+        broadcaster.publish("m1")
+        await settle()
+        stats = broadcaster.stats()
+        await broadcaster.close()
+        return stalled, healthy, delivered_before_timeout, stats
+
+    stalled, healthy, delivered_before_timeout, stats = asyncio.run(scenario())
+
+    assert delivered_before_timeout == ["m0"]
+    assert healthy.received == ["m0", "m1"]
+    assert stalled.received == []
+    assert stalled.close_code == 1013
+    assert stats["evicted"] == 1
+    assert [client["sent"] for client in stats["per_client"]] == [2]
+
+
+def test_send_targets_one_registered_client():
+    async def scenario():
+        broadcaster = Broadcaster()
+        first, second = FakeWebSocket(), FakeWebSocket()
+        broadcaster.register(first)
+        broadcaster.register(second)
+
+        assert broadcaster.send(first, "hello")
+        broadcaster.unregister(second)
+        assert not broadcaster.send(second, "hello")
+        await settle()
+        await broadcaster.close()
+        return first, second, len(broadcaster)
+
+    first, second, remaining = asyncio.run(scenario())
+
+    assert first.received == ["hello"]
+    assert second.received == []
+    assert remaining == 0
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        Broadcaster(policy="block")
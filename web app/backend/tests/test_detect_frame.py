@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from frame_protocol import unpack_detections
+
+# Boxes in network-input pixels, as the model returns them: one weapon and one other class
+DETECTIONS = np.array([[10.0, 20.0, 110.0, 220.0, 0.9, 0.0],
+                       [300.0, 40.0, 400.0, 140.0, 0.5, 1.0]], dtype=np.float32)
+
+
+@pytest.fixture(scope="module")
+def api_module(tmp_path_factory):
+    # The API reads its paths and worker settings at import time
+    data_dir = tmp_path_factory.mktemp("api")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("UPLOAD_DIR", str(data_dir))
+        mp.setenv("PRELOAD_MODEL", "false")
+        mp.setenv("VIDEO_WORKERS", "0")
+        import api
+    return api
+
+
+@pytest.fixture(scope="module")
+def client(api_module):
+    # A stub model version stands in for the weights; the batcher still runs for real
+    entry = SimpleNamespace(model=SimpleNamespace(names={0: "gun", 1: "person"}), version="stub", key="stub",
+                            backend="stub", load_time=0.0)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(api_module, "get_active_model", lambda: entry)
+        mp.setattr(api_module, "detect_weapons_batch",
+                   lambda model, images, conf_thresholds, input_size=None: [(DETECTIONS.copy(), 0.01)
+                                                                            for _ in images])
+        with TestClient(api_module.app) as test_client:
+            yield test_client
+
+
+def post_frame(client, **form):
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    _, jpeg = cv2.imencode(".jpg", frame)
+    files = {"file": ("frame.jpg", jpeg.tobytes(), "image/jpeg")}
+    return client.post("/detect/frame", files=files, data=form)
+
+
+def test_json_mode_returns_boxes_in_input_size_coordinates(client, api_module):
+    response = post_frame(client)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["weapon_count"] == 1
+    assert body["model_version"] == "stub"
+    assert body["input_size"] == api_module.INPUT_SIZE
+    assert [d["class_name"] for d in body["detections"]] == ["gun", "person"]
+    assert body["detections"][0] == {"x1": 10, "y1": 20, "x2": 110, "y2": 220, "confidence": pytest.approx(0.9),
+                                     "class_id": 0, "class_name": "gun"}
+
+
+def test_binary_mode_round_trips_through_unpack_detections(client, api_module):
+    response = post_frame(client, response_mode="binary")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["X-Weapon-Count"] == "1"
+    assert response.headers["X-Model-Version"] == "stub"
+    assert response.headers["X-Input-Size"] == str(api_module.INPUT_SIZE)
+    np.testing.assert_array_equal(unpack_detections(response.content), DETECTIONS)
+
+
+def test_annotated_mode_returns_a_downscaled_jpeg(client):
+    response = post_frame(client, response_mode="annotated", downscale="0.5", jpeg_quality="60")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["X-Weapon-Count"] == "1"
+    image = cv2.imdecode(np.frombuffer(response.content, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape == (120, 160, 3)
+    # The weapon box was drawn on the black frame
+    assert image.any()
+
+
+def test_invalid_response_options_are_rejected(client):
+    assert post_frame(client, response_mode="xml").status_code == 400
+    assert post_frame(client, downscale="0").status_code == 400
+    assert post_frame(client, jpeg_quality="101").status_code == 400
@@ -0,0 +1,81 @@
+import numpy as np
+
+from foreground import ForegroundCropper, merge_regions, offset_detections
+
+
+def background(width=640, height=480):
+    return np.full((height, width, 3), 60, dtype=np.uint8)
+
+
+# Cropper that has learnt an empty background
+def trained_cropper(**kwargs):
+    cropper = ForegroundCropper(downscale_width=640, warmup_frames=5, **kwargs)
+    for _ in range(20):
+        cropper.regions(background())
+    return cropper
+
+
+def test_overlapping_regions_are_merged():
+    regions = merge_regions([(0, 0, 10, 10), (5, 5, 20, 20), (18, 0, 30, 8), (50, 50, 60, 60)])
+
+    # The first three overlap as a chain and become one box; the last stays apart
+    assert sorted(regions) == [(0, 0, 30, 20), (50, 50, 60, 60)]
+    # Boxes that only touch are not merged
+    assert sorted(merge_regions([(0, 0, 10, 10), (10, 0, 20, 10)])) == [(0, 0, 10, 10), (10, 0, 20, 10)]
+
+
+def test_padding_is_shifted_back_inside_the_frame():
+    cropper = ForegroundCropper(padding=0.25, min_crop=10)
+
+    # 10 px of padding would leave the top-left corner; the crop keeps its size and moves inside
+    assert cropper._expand((0, 0, 40, 20), 640, 480) == (0, 0, 60, 40)
+    assert cropper._expand((620, 470, 640, 480), 640, 480) == (610, 460, 640, 480)
+    # Small boxes grow to min_crop, but never past the frame
+    assert ForegroundCropper(padding=0, min_crop=100)._expand((10, 10, 20, 20), 64, 48) == (0, 0, 64, 48)
+
+
+def test_offsets_map_crop_boxes_back_to_frame_coordinates():
+    crop_detections = [np.array([[1, 2, 11, 12, 0.9, 0]], dtype=np.float32),
+                       np.zeros((0, 6), dtype=np.float32),
+                       np.array([[0, 0, 5, 5, 0.4, 1]], dtype=np.float32)]
+
+    detections = offset_detections(crop_detections, [(100, 50), (0, 0), (300, 200)])
+
+    np.testing.assert_allclose(detections, [[101, 52, 111, 62, 0.9, 0], [300, 200, 305, 205, 0.4, 1]], rtol=1e-6)
+    # The per-crop arrays are left untouched
+    assert crop_detections[0][0, 0] == 1
+    assert offset_detections([], []).shape == (0, 6)
+
+
+def test_crops_follow_a_moving_object():
+    cropper = trained_cropper(min_crop=64)
+    frame = background()
+    frame[200:240, 300:340] = 255
+
+    crops, offsets = cropper.crops(frame)
+
+    assert len(crops) == 1
+    (x, y), crop = offsets[0], crops[0]
+    # The crop is cut from the frame at its offset and contains the whole object
+    assert x <= 300 and y <= 200 and x + crop.shape[1] >= 340 and y + crop.shape[0] >= 240
+    assert crop.shape[0] * crop.shape[1] < frame.shape[0] * frame.shape[1] / 4
+    np.testing.assert_array_equal(crop, frame[y:y + crop.shape[0], x:x + crop.shape[1]])
+
+
+def test_still_frames_give_no_regions():
+    cropper = trained_cropper()
+
+    assert cropper.regions(background()) == []
+    assert cropper.stats()["empty_frames"] > 0
+
+
+def test_whole_frame_is_used_during_warm_up_and_when_most_of_it_moves():
+    cropper = ForegroundCropper(downscale_width=640, warmup_frames=5)
+    assert cropper.regions(background()) == [(0, 0, 640, 480)]
+
+    cropper = trained_cropper()
+    frame = background()
+    frame[:, :400] = 250
+
+    assert cropper.regions(frame) == [(0, 0, 640, 480)]
+    assert cropper.stats()["full_frames"] == 6
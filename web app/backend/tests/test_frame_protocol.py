@@ -0,0 +1,53 @@
+import struct
+
+import numpy as np
+import pytest
+
+from frame_protocol import (FRAME_HEADER, FRAME_PROTOCOL_VERSION, compact_detections, pack_detections, pack_frame,
+                            unpack_detections, unpack_frame)
+
+JPEG = b"\xff\xd8\xff\xe0fake-jpeg\xff\xd9"
+
+
+def test_header_is_20_bytes():
+    assert FRAME_HEADER.size == 20
+
+
+def test_frame_round_trip():
+    message = pack_frame(JPEG, stream_id="cam-1", timestamp=1700000000.25, conf_threshold=0.5, seq=42)
+    assert len(message) == FRAME_HEADER.size + len("cam-1") + len(JPEG)
+
+    header, jpeg = unpack_frame(message)
+    assert jpeg == JPEG
+    assert header == {"stream_id": "cam-1", "timestamp": 1700000000.25, "conf_threshold": 0.5, "seq": 42,
+                      "flags": 0}
+
+
+def test_unicode_stream_id_and_sequence_wrap_around():
+    header, _ = unpack_frame(pack_frame(JPEG, stream_id="caméra", seq=2 ** 32 + 7))
+    assert header["stream_id"] == "caméra"
+    assert header["seq"] == 7
+
+
+def test_malformed_messages_are_rejected():
+    with pytest.raises(ValueError):
+        unpack_frame(b"\x01" * 10)
+    with pytest.raises(ValueError):
+        unpack_frame(pack_frame(b"", stream_id="cam"))
+
+    wrong_version = struct.pack("!BBHdfI", FRAME_PROTOCOL_VERSION + 1, 0, 0, 0.0, 0.0, 0) + JPEG
+    with pytest.raises(ValueError):
+        unpack_frame(wrong_version)
+
+
+def test_detections_round_trip():
+    detections = np.array([[1.5, 2, 30, 40, 0.9, 0], [5, 6, 7, 8, 0.25, 3]], dtype=np.float32)
+    data = pack_detections(detections)
+    assert len(data) == 4 + detections.size * 4
+    np.testing.assert_array_equal(unpack_detections(data), detections)
+    assert unpack_detections(pack_detections(np.zeros((0, 6)))).shape == (0, 6)
+
+
+def test_compact_detections_scale_to_the_sender_frame():
+    rows = compact_detections(np.array([[10, 20, 30, 40, 0.91234, 2]], dtype=np.float32), 2.0, 0.5)
+    assert rows == [[20.0, 10.0, 60.0, 20.0, 0.912, 2]]
@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+
+from frame_sampler import FrameSampler, plan_frames
+
+
+# Stand-in for cv2.VideoCapture over numbered frames
+class FakeCapture:
+    def __init__(self, frame_count):
+        self.frame_count = frame_count
+        self.position = 0
+        self.reads = []
+        self.grabs = 0
+        self.seeks = []
+
+    def get(self, prop):
+        return self.frame_count if prop == cv2.CAP_PROP_FRAME_COUNT else 0
+
+    def set(self, prop, value):
+        assert prop == cv2.CAP_PROP_POS_FRAMES
+        self.seeks.append(value)
+        self.position = value
+
+    def grab(self):
+        if self.position >= self.frame_count:
+            return False
+        self.position += 1
+        self.grabs += 1
+        return True
+
+    def read(self):
+        if self.position >= self.frame_count:
+            return False, None
+        frame = np.full((2, 2, 3), self.position, dtype=np.uint8)
+        self.reads.append(self.position)
+        self.position += 1
+        return True, frame
+
+
+def sampled(sampler):
+    return [(index, int(frame[0, 0, 0])) for index, frame in sampler if frame is not None]
+
+
+def test_plan_follows_video_time():
+    assert plan_frames(10, fps=30, sample_fps=10) == [0, 3, 6, 9]
+    assert plan_frames(5, fps=10, sample_fps=30) == [0, 1, 2, 3, 4]
+    assert plan_frames(10, frame_skip=4) == [0, 4, 8]
+    assert plan_frames(0, fps=30, sample_fps=10) is None
+
+
+def test_only_planned_frames_are_retrieved():
+    cap = FakeCapture(10)
+    sampler = FrameSampler(cap, plan=[0, 3, 6, 9])
+    frames = list(sampler)
+
+    assert [index for index, _ in frames] == list(range(10))
+    assert [(index, int(frame[0, 0, 0])) for index, frame in frames if frame is not None] == \
+        [(0, 0), (3, 3), (6, 6), (9, 9)]
+    assert cap.reads == [0, 3, 6, 9]
+    assert cap.grabs == 6
+
+
+def test_start_and_end_restrict_the_walk_to_a_segment():
+    plan = plan_frames(20, fps=30, sample_fps=10)
+    cap = FakeCapture(20)
+    sampler = FrameSampler(cap, plan=plan, start=5, end=13)
+    frames = list(sampler)
+
+    # Indices stay those of the whole video, so segments sample the same frames as one pass
+    assert [index for index, _ in frames] == list(range(5, 13))
+    assert [index for index, frame in frames if frame is not None] == [6, 9, 12]
+    assert cap.seeks == [5]
+
+
+def test_segments_cover_the_single_pass_exactly():
+    plan = plan_frames(30, fps=30, sample_fps=7)
+    whole = sampled(FrameSampler(FakeCapture(30), plan=plan))
+    parts = []
+    for start, end in [(0, 11), (11, 22), (22, 30)]:
+        parts += sampled(FrameSampler(FakeCapture(30), plan=plan, start=start, end=end))
+    assert parts == whole
+
+
+def test_exhausted_plan_stops_decoding():
+    cap = FakeCapture(100)
+    frames = list(FrameSampler(cap, plan=[0, 2], end=50))
+    assert len(frames) == 50
+    assert cap.position == 3
+
+
+def test_long_gaps_are_seeked_over():
+    cap = FakeCapture(100)
+    sampler = FrameSampler(cap, plan=[0, 50, 99], seek_threshold=10)
+    assert sampled(sampler) == [(0, 0), (50, 50), (99, 99)]
+    assert cap.seeks == [50, 99]
+    assert sampler.stats()["seeked_frames"] == 97
+
+
+def test_stride_without_a_plan_can_change_while_iterating():
+    sampler = FrameSampler(FakeCapture(12), stride=2)
+    indices = []
+    for index, frame in sampler:
+        if frame is not None:
+            indices.append(index)
+            if index == 4:
+                sampler.stride = 3
+    assert indices == [0, 2, 4, 7, 10]
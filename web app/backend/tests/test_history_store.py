@@ -0,0 +1,125 @@
+import pytest
+
+from history_store import HistoryStore
+
+
+def record(i, source_type="Webcam", weapon_count=1):
+    return {"id": f"d{i}", "source_type": source_type, "weapon_count": weapon_count, "thumbnail_path": f"/t/{i}.jpg"}
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    stores = []
+
+    def make(hot_size=1000):
+        store = HistoryStore(str(tmp_path / "history.db"), hot_size=hot_size, flush_interval=0.05)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def ids(records):
+    return [r["id"] for r in records]
+
+
+def test_records_are_listed_newest_first(make_store):
+    store = make_store()
+    for i in range(5):
+        store.add(record(i))
+    assert len(store) == 5
+    assert ids(store.list()) == ["d4", "d3", "d2", "d1", "d0"]
+    assert ids(store.list(limit=2, offset=1)) == ["d3", "d2"]
+    assert ids(store.recent(2)) == ["d3", "d4"]
+    assert store.get("d2") == record(2)
+
+
+def test_filters_by_source_and_weapon_count(make_store):
+    store = make_store()
+    store.add(record(0, "Webcam", 1))
+    store.add(record(1, "Image Upload", 3))
+    store.add(record(2, "Webcam", 2))
+    assert ids(store.list(source_type="Webcam")) == ["d2", "d0"]
+    assert ids(store.list(min_weapon_count=2)) == ["d2", "d1"]
+    assert ids(store.list(source_type="Webcam", min_weapon_count=2)) == ["d2"]
+
+
+def test_older_records_are_read_from_the_database(make_store):
+    store = make_store(hot_size=3)
+    for i in range(10):
+        store.add(record(i, "Webcam" if i % 2 else "Video Upload"))
+
+    assert store.get("d0") == record(0, "Video Upload")
+    assert ids(store.list(limit=3, offset=6)) == ["d3", "d2", "d1"]
+    assert ids(store.list(limit=None, source_type="Webcam")) == ["d9", "d7", "d5", "d3", "d1"]
+    assert store.stats()["database_reads"] >= 1
+
+
+def test_delete_and_clear(make_store):
+    store = make_store(hot_size=2)
+    for i in range(4):
+        store.add(record(i))
+
+    assert store.delete("d3") == record(3)
+    assert store.delete("d0") == record(0)
+    assert store.delete("missing") is None
+    assert len(store) == 2
+    assert ids(store.list()) == ["d2", "d1"]
+
+    assert ids(store.clear()) == ["d2", "d1"]
+    assert len(store) == 0
+    assert store.list() == []
+
+
+def test_records_survive_a_restart(make_store):
+    store = make_store()
+    for i in range(3):
+        store.add(record(i))
+    store.delete("d1")
+    store.close()
+
+    reopened = make_store(hot_size=1)
+    assert len(reopened) == 2
+    assert ids(reopened.list()) == ["d2", "d0"]
+    assert reopened.get("d0") == record(0)
+
+
+def test_flush_commits_every_queued_change(make_store):
+    store = make_store()
+    for i in range(50):
+        store.add(record(i))
+    assert store.flush(timeout=5)
+    stats = store.stats()
+    assert stats["pending_changes"] == 0
+    assert stats["changes_written"] == 50
+    assert stats["write_errors"] == 0
+
+
+def test_re_adding_an_id_replaces_the_record(make_store):
+    store = make_store()
+    store.add(record(0))
+    store.add(record(1))
+    store.add(record(0, weapon_count=5))
+
+    assert len(store) == 2
+    assert ids(store.list()) == ["d0", "d1"]
+    assert store.get("d0")["weapon_count"] == 5
+
+
+def test_re_adding_an_id_only_in_the_database_keeps_the_count(make_store):
+    store = make_store(hot_size=1)
+    store.add(record(0))
+    store.add(record(1))
+    store.flush()
+
+    # d0 is no longer in memory; saving it again must not count it twice
+    store.add(record(0, weapon_count=5))
+    store.flush()
+    assert len(store) == 2
+    store.close()
+
+    reopened = make_store()
+    assert len(reopened) == 2
+    assert reopened.get("d0")["weapon_count"] == 5
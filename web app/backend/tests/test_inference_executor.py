@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from inference_executor import ExecutorSaturated, InferenceExecutor
+
+
+def test_admits_up_to_capacity_then_rejects():
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    with executor.admit(), executor.admit():
+        with pytest.raises(ExecutorSaturated) as info:
+            with executor.admit():
+                pass
+        assert info.value.retry_after >= 1
+    assert executor.stats()["in_flight"] == 0
+    assert executor.admitted == 2
+    assert executor.rejected == 1
+
+    # Slots free up again once the requests finish
+    with executor.admit():
+        pass
+    executor.shutdown()
+
+
+def test_retry_after_follows_the_service_time():
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+    executor._service_times.extend([3.0, 3.0])
+    with executor.admit():
+        with pytest.raises(ExecutorSaturated) as info:
+            with executor.admit():
+                pass
+    assert info.value.retry_after == 3
+    executor.shutdown()
+
+
+def test_run_uses_the_inference_threads():
+    executor = InferenceExecutor(max_workers=2)
+
+    def work(a, b=0):
+        return a + b, threading.current_thread().name
+
+    total, thread_name = asyncio.run(executor.run(work, 1, b=2))
+    assert total == 3
+    assert thread_name.startswith("inference")
+    executor.shutdown()
+
+
+def test_saturated_requests_get_503_with_retry_after():
+    import api
+
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+    app = FastAPI()
+    app.add_exception_handler(ExecutorSaturated, api.executor_saturated_handler)
+
+    @app.get("/busy")
+    async def busy():
+        with executor.admit():
+            with executor.admit():
+                return {}
+
+    response = TestClient(app).get("/busy")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    executor.shutdown()
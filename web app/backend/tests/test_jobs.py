@@ -0,0 +1,215 @@
+import os
+import signal
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING, JobStore, JobWorkerPool, run_job
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def test_claim_takes_the_oldest_queued_job_once(store):
+    store.create("a", "video", params={"frame_skip": 2})
+    store.create("b", "video")
+
+    job = store.claim_next(123, "pool:123")
+    assert job["id"] == "a"
+    assert job["status"] == RUNNING
+    assert job["worker_id"] == "pool:123"
+    assert job["params"] == {"frame_skip": 2}
+    assert store.claim_next(124, "pool:124")["id"] == "b"
+    assert store.claim_next(125, "pool:125") is None
+
+
+def test_concurrent_claims_never_share_a_job(store):
+    for i in range(20):
+        store.create(f"job-{i}", "video")
+    claimed = []
+
+    def worker(pid):
+        while True:
+            job = store.claim_next(pid, f"pool:{pid}")
+            if job is None:
+                return
+            claimed.append(job["id"])
+
+    threads = [threading.Thread(target=worker, args=(pid,)) for pid in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(f"job-{i}" for i in range(20))
+
+
+def test_cancel_queued_job_is_immediate(store):
+    store.create("a", "video")
+    assert store.request_cancel("a") == CANCELLED
+    assert store.claim_next(1) is None
+    assert store.request_cancel("missing") is None
+
+
+def test_cancel_running_job_is_flagged_and_stops_it(store):
+    store.create("a", "video")
+    job = store.claim_next(1, "pool:1")
+    assert store.request_cancel("a") == RUNNING
+    assert store.cancel_requested("a")
+
+    def job_fn(context):
+        context.progress(1, 10, force=True)
+
+    run_job(store, job, job_fn)
+    assert store.get("a")["status"] == CANCELLED
+
+
+def test_run_job_records_result_and_failure(store):
+    store.create("ok", "video")
+    store.create("bad", "video")
+    run_job(store, store.claim_next(1), lambda context: {"frames": 3})
+    run_job(store, store.claim_next(1), lambda context: 1 / 0)
+
+    assert store.get("ok")["status"] == COMPLETED
+    assert store.get("ok")["result"] == {"frames": 3}
+    assert store.get("bad")["status"] == FAILED
+    assert "division" in store.get("bad")["error"]
+    assert store.counts() == {COMPLETED: 1, FAILED: 1}
+
+
+def test_recovery_keeps_fresh_jobs_of_every_pool_instance(store):
+    store.create("mine", "video")
+    store.create("other", "video")
+    store.claim_next(100, "this-boot:100")
+    store.claim_next(100, "other-api:100")
+
+    # Another API process on the same job table is still sending heartbeats
+    assert store.recover_interrupted(None, stale_after=60) == []
+    assert store.recover_interrupted("this-boot", stale_after=60) == []
+    assert store.get("other")["status"] == RUNNING
+
+
+def test_recovery_at_startup_requeues_stale_jobs_of_other_instances_only(store, monkeypatch):
+    store.create("mine", "video")
+    store.create("old", "video")
+    store.claim_next(100, "this-boot:100")
+    store.claim_next(100, "old-boot:100")
+
+    now = jobs.time.time()
+    monkeypatch.setattr(jobs.time, "time", lambda: now + 90)
+    assert store.recover_interrupted("this-boot", stale_after=60) == ["old"]
+    assert store.get("old")["status"] == QUEUED
+    assert store.get("old")["worker_id"] is None
+    assert store.get("mine")["status"] == RUNNING
+
+
+def test_recovery_requeues_jobs_with_a_stale_heartbeat(store, monkeypatch):
+    store.create("a", "video")
+    store.create("b", "video")
+    store.claim_next(1, "boot:1")
+    store.claim_next(2, "boot:2")
+
+    now = jobs.time.time()
+    monkeypatch.setattr(jobs.time, "time", lambda: now + 30)
+    store.heartbeat("boot:2")
+    monkeypatch.setattr(jobs.time, "time", lambda: now + 90)
+
+    assert store.recover_interrupted(None, stale_after=60) == ["a"]
+    assert store.get("b")["status"] == RUNNING
+
+
+def test_old_job_tables_are_migrated(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, file_path TEXT, "
+                 "params TEXT NOT NULL DEFAULT '{}', progress TEXT NOT NULL DEFAULT '{}', result TEXT, error TEXT, "
+                 "cancel_requested INTEGER NOT NULL DEFAULT 0, worker_pid INTEGER, created_at REAL NOT NULL, "
+                 "started_at REAL, finished_at REAL)")
+    conn.close()
+
+    store = JobStore(path)
+    store.create("a", "video")
+    assert store.claim_next(1, "boot:1")["worker_id"] == "boot:1"
+
+
+def test_job_detections_are_read_in_order(store):
+    assert store.last_detection_seq() == 0
+    store.add_detection("a", {"id": "d1"})
+    store.add_detection("a", {"id": "d2"})
+    rows = store.detections_since(0)
+    assert [record["id"] for _, _, record in rows] == ["d1", "d2"]
+    assert store.detections_since(rows[0][0])[0][2] == {"id": "d2"}
+    assert store.last_detection_seq() == rows[-1][0]
+
+
+
+# Job function for the worker pool test; runs in the spawned worker process
+def sleeping_job(context):
+    for step in range(10):
+        context.progress(step, 10, force=True)
+        time.sleep(0.1)
+    return {"pid": os.getpid()}
+
+
+def test_pool_replaces_a_worker_that_died(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    pool = JobWorkerPool(path, "test_jobs:sleeping_job", workers=1, poll_interval=0.05, heartbeat_interval=0.1,
+                         restart_backoff=0.1)
+    pool.start()
+    try:
+        store.create("a", "video")
+        deadline = time.monotonic() + 60
+        while store.get("a")["status"] != RUNNING:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+        # The worker is killed in the middle of the job
+        killed = pool.processes[0].pid
+        os.kill(killed, signal.SIGKILL)
+        pool.processes[0].join(10)
+        assert pool.stats()["alive"] == 0
+
+        while store.get("a")["status"] != COMPLETED:
+            assert time.monotonic() < deadline
+            pool.ensure_workers()
+            store.recover_interrupted(None, stale_after=1.0)
+            time.sleep(0.1)
+    finally:
+        pool.stop()
+
+    assert store.get("a")["result"]["pid"] != killed
+    assert pool.restarts == 1
+
+
+def test_pool_backs_off_workers_that_keep_dying(tmp_path, monkeypatch):
+    pool = JobWorkerPool(str(tmp_path / "jobs.db"), "test_jobs:sleeping_job", workers=1, restart_backoff=1.0,
+                         max_restart_backoff=60.0)
+    spawned = []
+
+    class DeadProcess:
+        pid = 0
+        exitcode = -9
+
+        def is_alive(self):
+            return False
+
+        def join(self, timeout=None):
+            pass
+
+    monkeypatch.setattr(pool, "_spawn", lambda index: spawned.append(index) or DeadProcess())
+    now = [1000.0]
+    monkeypatch.setattr(jobs.time, "monotonic", lambda: now[0])
+    pool.start()
+
+    restarts = []
+    for _ in range(40):
+        now[0] += 0.5
+        if pool.ensure_workers():
+            restarts.append(now[0] - 1000.0)
+    # Each death is noticed on the next check, half a second later; then waits of 1, 2, 4 and 8 seconds
+    assert restarts[:4] == [1.5, 4.0, 8.5, 17.0]
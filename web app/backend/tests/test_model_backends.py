@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+
+from model_backends import OnnxYOLO, decode_yolo_output, letterbox, nms
+
+
+# Raw head output ([4 + num_classes, anchors]) from center-x, center-y, width, height rows and class scores
+def head_output(xywh, class_scores):
+    return np.concatenate([np.asarray(xywh, dtype=np.float32), np.asarray(class_scores, dtype=np.float32)],
+                          axis=1).T
+
+
+class FakeSession:
+    """ONNX Runtime session stand-in that records input shapes and returns a fixed head output"""
+
+    def __init__(self, output):
+        self.output = output
+        self.input_shapes = []
+
+    def run(self, output_names, feeds):
+        (blob,) = feeds.values()
+        self.input_shapes.append(blob.shape)
+        return [np.repeat(self.output[None], len(blob), axis=0)]
+
+
+# OnnxYOLO around a fake session, with a static or dynamic input size
+def fake_model(output, imgsz=(64, 64), dynamic_size=False):
+    model = OnnxYOLO.__new__(OnnxYOLO)
+    model.session = FakeSession(output)
+    model.input_name = "images"
+    model.input_type = np.float32
+    model.imgsz = imgsz
+    model.dynamic_size = dynamic_size
+    model.dynamic_batch = True
+    model.iou_threshold = 0.7
+    model.max_det = 300
+    model.names = {0: "weapon"}
+    return model
+
+
+def test_nms_suppresses_overlaps_and_keeps_score_order():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [20, 20, 30, 30], [0, 0, 10, 9]], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.7, 0.8], dtype=np.float32)
+
+    # Box 1 (best) removes its near-duplicates 0 and 3; the disjoint box 2 survives
+    assert nms(boxes, scores, iou_threshold=0.5).tolist() == [1, 2]
+    # A threshold above every overlap keeps all boxes, best first
+    assert nms(boxes, scores, iou_threshold=0.95).tolist() == [1, 3, 2, 0]
+    assert nms(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)).size == 0
+
+
+def test_decode_filters_by_confidence_and_converts_to_corners():
+    output = head_output([[50, 50, 20, 10], [100, 100, 40, 40], [200, 200, 10, 10]],
+                         [[0.1, 0.9], [0.3, 0.2], [0.1, 0.2]])
+
+    detections = decode_yolo_output(output, conf_threshold=0.25)
+
+    # Anchor 2 is below the threshold; each kept anchor takes its best class
+    np.testing.assert_allclose(detections, [[40, 45, 60, 55, 0.9, 1], [80, 80, 120, 120, 0.3, 0]], rtol=1e-6)
+    assert decode_yolo_output(output, conf_threshold=0.95).shape == (0, 6)
+
+
+def test_decode_keeps_at_most_max_det_best_detections():
+    # Disjoint boxes, so NMS keeps all of them and max_det alone decides
+    xywh = [[i * 20 + 5, 5, 10, 10] for i in range(6)]
+    scores = [[0.3 + i / 10] for i in range(6)]
+
+    detections = decode_yolo_output(head_output(xywh, scores), conf_threshold=0.25, max_det=3)
+
+    np.testing.assert_allclose(detections[:, 4], [0.8, 0.7, 0.6], rtol=1e-6)
+
+
+def test_letterbox_scale_and_padding_round_trip():
+    img = np.zeros((100, 200, 3), dtype=np.uint8)
+    img[40:60, 80:120] = 255
+
+    padded, scale, (pad_x, pad_y) = letterbox(img, (64, 64))
+
+    assert padded.shape == (64, 64, 3)
+    assert scale == pytest.approx(0.32)
+    assert (pad_x, pad_y) == (0, 16)
+    # The padding rows are the letterbox grey and the image rows sit between them
+    assert (padded[:pad_y] == 114).all() and (padded[-pad_y:] == 114).all()
+    # A point in the original maps into the padded image and back
+    ys, xs = np.nonzero(padded[:, :, 0] == 255)
+    assert (xs.mean() - pad_x) / scale == pytest.approx(100, abs=2)
+    assert (ys.mean() - pad_y) / scale == pytest.approx(50, abs=2)
+
+
+def test_boxes_are_mapped_back_to_the_original_image():
+    # One box in network-input pixels of a 64x64 graph: corners (16, 24) - (48, 40)
+    model = fake_model(head_output([[32, 32, 32, 16], [62, 62, 8, 8]], [[0.9], [0.8]]))
+
+    (result,) = model(np.zeros((100, 200, 3), dtype=np.uint8), conf=0.5)
+
+    # Scale 0.32 and 16 rows of padding on top undo to the original frame; the box in the padding is clipped
+    np.testing.assert_allclose(result.boxes.xyxy.numpy(), [[50, 25, 150, 75], [181.25, 100, 200, 100]],
+                               rtol=1e-5)
+    assert result.orig_shape == (100, 200)
+    assert result.names == {0: "weapon"}
+
+
+def test_static_graph_ignores_imgsz():
+    model = fake_model(head_output([[32, 32, 32, 16]], [[0.9]]), imgsz=(64, 64))
+
+    model([np.zeros((100, 200, 3), dtype=np.uint8)] * 2, imgsz=320)
+
+    assert model.session.input_shapes == [(2, 3, 64, 64)]
+
+
+def test_dynamic_graph_uses_imgsz():
+    model = fake_model(head_output([[32, 32, 32, 16]], [[0.9]]), imgsz=(64, 64), dynamic_size=True)
+
+    model(np.zeros((100, 200, 3), dtype=np.uint8), imgsz=96)
+
+    assert model.session.input_shapes == [(1, 3, 96, 96)]
+
+
+def test_decode_matches_ultralytics_nms():
+    torch = pytest.importorskip("torch")
+    non_max_suppression = pytest.importorskip("ultralytics.utils.nms").non_max_suppression
+
+    # Distinct random scores, so neither side depends on how ties are broken
+    rng = np.random.default_rng(0)
+    xywh = np.column_stack([rng.uniform(0, 320, (400, 2)), rng.uniform(10, 80, (400, 2))])
+    output = head_output(xywh, rng.uniform(0, 1, (400, 3)) ** 4)
+
+    expected = non_max_suppression(torch.from_numpy(output[None]), conf_thres=0.25, iou_thres=0.7, max_det=300)[0]
+
+    np.testing.assert_allclose(decode_yolo_output(output, 0.25, 0.7, 300), expected.numpy(), atol=1e-4)
+
+
+def test_onnx_graph_matches_pytorch_model(tmp_path):
+    pytest.importorskip("onnxruntime")
+    torch = pytest.importorskip("torch")
+    ultralytics = pytest.importorskip("ultralytics")
+    from model_backends import export_onnx
+
+    # An untrained network is enough to compare the exported graph with the PyTorch one
+    weights = str(tmp_path / "yolov8n.pt")
+    ultralytics.YOLO("yolov8n.yaml").save(weights)
+    model = OnnxYOLO(export_onnx(weights, str(tmp_path / "yolov8n.onnx")))
+
+    rng = np.random.default_rng(0)
+    blob, _ = model.preprocess([rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)], (160, 160))
+    network = ultralytics.YOLO(weights).model.float().eval()
+    with torch.no_grad():
+        expected = network(torch.from_numpy(blob))
+    expected = expected[0] if isinstance(expected, (list, tuple)) else expected
+
+    np.testing.assert_allclose(model.forward(blob), expected.numpy(), atol=1e-3)
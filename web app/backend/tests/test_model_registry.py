@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from model_registry import ModelRegistry
+
+
+class FakeLoader:
+    """Registry loader returning a named stand-in model; paths listed in ``failing`` raise"""
+
+    def __init__(self):
+        self.failing = set()
+        self.calls = []
+
+    def __call__(self, path, backend, precision, onnx_path):
+        self.calls.append(path)
+        if path in self.failing:
+            raise RuntimeError(f"corrupt weights: {path}")
+        return {"path": path}, backend, precision
+
+
+@pytest.fixture
+def registry():
+    return ModelRegistry(FakeLoader())
+
+
+def test_activating_a_new_version_leaves_the_old_one_serving_requests(registry):
+    old = registry.load("v1", "v1.pt", activate=True)
+    # A request picks up the model before the switch and keeps using it
+    in_flight = registry.active
+
+    new = registry.load("v2", "v2.pt")
+    assert registry.active is old
+
+    registry.activate("v2")
+    assert registry.active is new
+    assert in_flight.model == {"path": "v1.pt"}
+    assert registry.get("v1") is old
+    assert [(entry["version"], entry["active"]) for entry in registry.list()] == [("v1", False), ("v2", True)]
+
+
+def test_failed_load_keeps_the_active_version(registry):
+    old = registry.load("v1", "v1.pt", activate=True)
+    registry.loader.failing.add("v2.pt")
+
+    with pytest.raises(RuntimeError):
+        registry.load("v2", "v2.pt", activate=True)
+
+    assert registry.active is old
+    with pytest.raises(KeyError):
+        registry.get("v2")
+
+    # The version can be loaded again once the weights are fixed
+    registry.loader.failing.clear()
+    assert registry.load("v2", "v2.pt", activate=True) is registry.active
+
+
+def test_the_active_version_cannot_be_unloaded(registry):
+    registry.load("v1", "v1.pt", activate=True)
+    registry.load("v2", "v2.pt")
+
+    with pytest.raises(ValueError):
+        registry.unload("v1")
+    registry.unload("v2")
+
+    assert registry.get("v1") is registry.active
+    with pytest.raises(KeyError):
+        registry.unload("v2")
+
+
+def test_loading_a_loaded_version_reuses_it(registry):
+    entries = []
+    threads = [threading.Thread(target=lambda: entries.append(registry.load("v1", "v1.pt"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.loader.calls == ["v1.pt"]
+    assert all(entry is entries[0] for entry in entries)
+
+
+def test_every_load_gets_its_own_key(registry):
+    registry.load("v2", "v2.pt", activate=True)
+    first = registry.load("v1", "v1.pt")
+    registry.unload("v1")
+    # Reloaded within the same millisecond
+    second = registry.load("v1", "v1.pt")
+
+    assert first.key != second.key
+    assert first.key.startswith("v1@") and second.key.startswith("v1@")
+    assert registry.get("v2").key not in (first.key, second.key)
+
+
+def test_warm_up_marks_the_version(registry):
+    registry.load("v1", "v1.pt")
+
+    runs = registry.warm_up("v1", lambda model: {"640": 0.5})
+
+    entry = registry.get("v1")
+    assert runs == {"640": 0.5}
+    assert entry.warmed_up and entry.warmup_runs == runs and entry.warmup_time is not None
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from motion_gate import MotionGate, MotionGateRegistry
+
+STILL = np.zeros((120, 160, 3), dtype=np.uint8)
+MOVED = STILL.copy()
+MOVED[:60] = 255
+
+
+def test_unchanged_frames_reuse_the_last_result():
+    gate = MotionGate(threshold=0.01)
+    assert gate.check(STILL)
+    gate.update("first")
+    assert not gate.check(STILL)
+    assert gate.last_result == "first"
+    assert gate.check(MOVED)
+    assert gate.stats()["skipped"] == 1
+
+
+def test_reference_only_moves_with_a_stored_result():
+    gate = MotionGate(threshold=0.01)
+    assert gate.check(STILL)
+    gate.update("still")
+
+    # Inference for the moved frame fails: the still frame and its result stay paired
+    assert gate.check(MOVED)
+    assert not gate.check(STILL)
+    assert gate.last_result == "still"
+
+    assert gate.check(MOVED)
+    gate.update("moved")
+    assert not gate.check(MOVED)
+    assert gate.last_result == "moved"
+
+
+def test_inference_is_forced_after_max_skip_frames():
+    gate = MotionGate(threshold=0.01, max_skip=2)
+    gate.check(STILL)
+    gate.update("result")
+    assert [gate.check(STILL) for _ in range(3)] == [False, False, True]
+
+
+def test_zero_threshold_always_runs():
+    gate = MotionGate(threshold=0)
+    gate.check(STILL)
+    gate.update("result")
+    assert gate.check(STILL)
+
+
+def test_registry_keeps_one_gate_per_stream():
+    registry = MotionGateRegistry(max_streams=2)
+    first = registry.get("a", 0.05)
+    assert registry.get("a") is first
+    assert first.threshold == 0.05
+    first.check(STILL)
+
+    registry.get("b")
+    registry.get("c")
+    stats = registry.stats()
+    assert stats["streams"] == 2
+    assert "a" not in stats["per_stream"]
+    assert stats["frames"] == 1
+
+
+def test_results_arriving_late_are_paired_with_their_own_frame():
+    gate = MotionGate(threshold=0.01)
+    # A pipeline checks frames 0 and 1 before the result of frame 0 comes back
+    assert gate.check(STILL, 0)
+    assert gate.check(MOVED, 1)
+    gate.update("still", 0)
+
+    # The reference is frame 0, the frame whose result is stored
+    assert not gate.check(STILL, 2)
+    assert gate.last_result == "still"
+    gate.update("moved", 1)
+    assert not gate.check(MOVED, 3)
+    assert gate.last_result == "moved"
+
+
+def test_disabled_gate_skips_the_thumbnail(monkeypatch):
+    gate = MotionGate(threshold=0)
+    monkeypatch.setattr(gate, "_thumbnail", lambda frame: pytest.fail("thumbnail computed"))
+    assert gate.check(STILL)
+    assert gate.stats()["frames"] == 1
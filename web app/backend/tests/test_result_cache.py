@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"boxes": [1, 2, 3]}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [hit for _, hit in results].count(False) == 1
+    assert all(value == {"boxes": [1, 2, 3]} for value, _ in results)
+    assert cache.stats()["coalesced"] == 4
+
+    # Every caller gets its own copy
+    results[0][0]["boxes"].append(4)
+    assert results[1][0] == {"boxes": [1, 2, 3]}
+
+
+def test_failures_are_shared_but_not_cached():
+    cache = ResultCache()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("key", failing) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # The next request computes again
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("key", failing))
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = ResultCache(max_entries=2, ttl_seconds=10)
+    cache.put("a", 1)
+
+    now[0] += 9.9
+    assert cache.get("a") == 1
+    now[0] += 0.2
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+
+def test_zero_entries_disables_storage():
+    cache = ResultCache(max_entries=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
@@ -0,0 +1,127 @@
+import os
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from stream_ingest import GrowingMJPEGCapture, jpeg_end, partial_path
+
+
+def encode(value, size=(48, 64)):
+    frame = np.full((*size, 3), value, dtype=np.uint8)
+    frame[::8] = 255 - value
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def with_exif_thumbnail(jpeg):
+    # APP1 "Exif" segment carrying a small JPEG thumbnail, with its own start and end markers
+    thumbnail = encode(200, size=(8, 8))
+    payload = b"Exif\x00\x00" + b"MM\x00\x2a\x00\x00\x00\x08" + thumbnail
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload + jpeg[2:]
+
+
+def read_all(capture):
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            return frames
+        frames.append(frame)
+
+
+def test_jpeg_end_skips_an_embedded_thumbnail():
+    jpeg = with_exif_thumbnail(encode(10))
+    assert jpeg.count(b"\xff\xd9") == 2
+    assert jpeg_end(jpeg) == len(jpeg)
+    assert jpeg_end(jpeg + b"--boundary") == len(jpeg)
+
+
+def test_jpeg_end_waits_for_incomplete_data():
+    jpeg = encode(10)
+    for cut in (3, 20, len(jpeg) - 1):
+        assert jpeg_end(jpeg[:cut]) is None
+
+
+def test_jpeg_end_rejects_data_that_is_not_a_jpeg():
+    with pytest.raises(ValueError):
+        jpeg_end(b"\xff\xd8not a jpeg")
+
+
+def test_reads_multipart_body_with_exif_frames(tmp_path):
+    path = str(tmp_path / "upload.mjpeg")
+    frames = [with_exif_thumbnail(encode(10)), encode(120), with_exif_thumbnail(encode(240))]
+    with open(path, "wb") as f:
+        for jpeg in frames:
+            f.write(b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n")
+
+    decoded = read_all(GrowingMJPEGCapture(path))
+    assert [frame.shape for frame in decoded] == [(48, 64, 3)] * 3
+    assert [int(frame[1, 0, 0]) for frame in decoded] == pytest.approx([10, 120, 240], abs=4)
+
+
+def test_follows_a_growing_part_file_until_the_rename(tmp_path):
+    path = str(tmp_path / "upload.mjpeg")
+    frames = [encode(value) for value in (0, 60, 120, 180)]
+
+    # The reader opens the upload while only the .part file exists
+    part = open(partial_path(path), "wb")
+    capture = GrowingMJPEGCapture(path, stall_timeout=10, poll_interval=0.01)
+    assert capture.isOpened()
+
+    def upload():
+        for jpeg in frames:
+            # Each frame arrives in two writes, so the reader sees partial frames
+            for piece in (jpeg[:len(jpeg) // 2], jpeg[len(jpeg) // 2:]):
+                part.write(piece)
+                part.flush()
+                time.sleep(0.02)
+        part.close()
+        os.replace(partial_path(path), path)
+
+    writer = threading.Thread(target=upload)
+    writer.start()
+    start = time.monotonic()
+    decoded = read_all(capture)
+    writer.join()
+
+    assert len(decoded) == 4
+    assert time.monotonic() - start < 5
+    assert capture.get(cv2.CAP_PROP_POS_FRAMES) == 4
+
+
+def test_truncated_tail_ends_the_stream(tmp_path):
+    path = str(tmp_path / "upload.mjpeg")
+    last = encode(90)
+    with open(path, "wb") as f:
+        f.write(encode(30) + encode(60) + last[:len(last) // 2])
+
+    capture = GrowingMJPEGCapture(path, stall_timeout=10)
+    assert len(read_all(capture)) == 2
+    assert not capture.grab()
+
+
+def test_stalled_upload_times_out(tmp_path):
+    path = str(tmp_path / "upload.mjpeg")
+    with open(partial_path(path), "wb") as f:
+        f.write(encode(30))
+
+    capture = GrowingMJPEGCapture(path, stall_timeout=0.2, poll_interval=0.01)
+    start = time.monotonic()
+    assert len(read_all(capture)) == 1
+    assert time.monotonic() - start < 5
+
+
+def test_forward_seek_skips_frames_without_decoding(tmp_path):
+    path = str(tmp_path / "upload.mjpeg")
+    with open(path, "wb") as f:
+        for value in (0, 80, 160):
+            f.write(encode(value))
+
+    capture = GrowingMJPEGCapture(path)
+    assert capture.set(cv2.CAP_PROP_POS_FRAMES, 2)
+    ok, frame = capture.read()
+    assert ok and int(frame[1, 0, 0]) == pytest.approx(160, abs=4)
+    assert not capture.set(cv2.CAP_PROP_POS_FRAMES, 5)
@@ -0,0 +1,61 @@
+import pytest
+
+from stride_controller import AdaptiveStride
+
+
+def test_stride_grows_when_inference_exceeds_the_frame_budget_and_shrinks_back():
+    controller = AdaptiveStride(30.0, target_rtf=1.0, window=1)
+
+    # 90 ms per detection against a 33 ms frame period: skip ahead three frames
+    assert controller.observe(0.09, frame_index=0) == 3
+    assert controller.observe(0.19, frame_index=3) == 6
+    # Inference got cheaper than one frame period again
+    assert controller.observe(0.01, frame_index=9) == 1
+    assert controller.stride == 1
+
+
+def test_stride_follows_the_rolling_mean():
+    controller = AdaptiveStride(30.0, target_rtf=1.0, window=2)
+
+    controller.observe(0.01, frame_index=0)
+    # Mean of 10 ms and 170 ms is 90 ms
+    assert controller.observe(0.17, frame_index=1) == 3
+    # 170 ms and 10 ms still average 90 ms; the first sample has left the window
+    assert controller.observe(0.01, frame_index=4) == 3
+
+
+def test_stride_stays_within_bounds():
+    controller = AdaptiveStride(30.0, target_rtf=1.0, initial_stride=100, min_stride=2, max_stride=8, window=1)
+    assert controller.stride == 8
+
+    assert controller.observe(5.0, frame_index=0) == 8
+    assert controller.observe(0.001, frame_index=8) == 2
+
+
+def test_decoding_slower_than_real_time_uses_the_largest_stride():
+    controller = AdaptiveStride(30.0, target_rtf=1.0, max_stride=20, window=1)
+    controller.observe_read(0.05)
+
+    assert controller.observe(0.001, frame_index=0) == 20
+
+
+def test_target_fps_sets_a_floor_on_the_stride():
+    controller = AdaptiveStride(30.0, target_rtf=1.0, target_fps=5.0, window=1)
+
+    assert controller.observe(0.001, frame_index=0) == 6
+    # The real-time factor can still ask for more
+    assert controller.observe(0.28, frame_index=6) == 9
+
+
+def test_history_records_each_stride_change():
+    controller = AdaptiveStride(30.0, target_rtf=1.0, window=1)
+
+    for frame_index, seconds in [(0, 0.01), (1, 0.01), (2, 0.09), (5, 0.09), (8, 0.01)]:
+        controller.observe(seconds, frame_index)
+
+    assert [(entry["frame"], entry["stride"]) for entry in controller.history] == [(0, 1), (2, 3), (8, 1)]
+    assert controller.history[1]["inference_ms"] == pytest.approx(90.0)
+    summary = controller.summary()
+    assert summary["frames_analysed"] == 5
+    assert summary["stride"] == 1
+    assert summary["history"] == controller.history
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from tiling import cross_tile_nms, detect_tiled, merge_tile_detections, tile_grid
+
+
+def rows(*detections):
+    return np.array(detections, dtype=np.float32).reshape(-1, 6)
+
+
+def test_tiles_overlap_and_end_on_the_border():
+    tiles = tile_grid(1000, 1500, tile_size=640, overlap=0.2)
+    xs = sorted({x1 for x1, _, _, _ in tiles})
+    ys = sorted({y1 for _, y1, _, _ in tiles})
+    assert xs == [0, 512, 860]
+    assert ys == [0, 360]
+    assert max(x2 for _, _, x2, _ in tiles) == 1500
+    assert max(y2 for _, _, _, y2 in tiles) == 1000
+
+
+def test_small_image_is_a_single_tile():
+    assert tile_grid(300, 400, tile_size=640) == [(0, 0, 400, 300)]
+
+
+def test_merge_moves_boxes_to_image_coordinates():
+    merged = merge_tile_detections([rows([10, 20, 30, 40, 0.9, 0]), rows()], [(100, 200), (0, 0)])
+    np.testing.assert_allclose(merged, rows([110, 220, 130, 240, 0.9, 0]))
+
+
+def test_box_cut_at_a_tile_edge_is_suppressed_by_the_complete_box():
+    # The same object: complete in the second tile, cut off at the right edge of the first
+    first = rows([600, 100, 640, 160, 0.6, 0])
+    second = rows([88, 100, 168, 160, 0.9, 0])
+    merged = merge_tile_detections([first, second], [(0, 0), (512, 0)])
+    np.testing.assert_allclose(merged, rows([600, 100, 680, 160, 0.9, 0]))
+
+
+def test_nms_is_per_class():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+    classes = np.array([0, 0, 1])
+    assert cross_tile_nms(boxes, scores, classes, threshold=0.5).tolist() == [0, 2]
+
+
+def test_separate_boxes_are_kept():
+    boxes = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    scores = np.array([0.5, 0.9], dtype=np.float32)
+    assert cross_tile_nms(boxes, scores, np.zeros(2)).tolist() == [1, 0]
+
+
+def test_merge_without_detections_is_empty():
+    assert merge_tile_detections([rows(), rows()], [(0, 0), (512, 0)]).shape == (0, 6)
+
+
+# Stand-ins for ultralytics results and model: one box in the top-left corner of every input
+class FakeBoxes:
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, images, **kwargs):
+        self.calls.append((len(images), kwargs))
+        return [SimpleNamespace(boxes=FakeBoxes(np.array([[5, 5, 25, 25, 0.8, 0]], dtype=np.float32))) for _ in images]
+
+
+def test_detect_tiled_runs_tiles_at_the_tile_size():
+    model = FakeModel()
+    detections = detect_tiled(model, np.zeros((400, 1000, 3), dtype=np.uint8), 0.25, tile_size=512, overlap=0.2)
+
+    (count, kwargs), = model.calls
+    assert count == 3 + 1
+    assert kwargs["imgsz"] == 512
+    assert kwargs["conf"] == 0.25
+    # One box per tile at its own offset; the full-image box duplicates the first tile's and is suppressed
+    assert sorted(detections[:, 0].tolist()) == [5.0, 415.0, 493.0]
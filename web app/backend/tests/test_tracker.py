@@ -0,0 +1,61 @@
+import numpy as np
+
+from tracker import SortTracker
+
+
+def detection(x, y, score=0.9, class_id=0, size=40):
+    return [x, y, x + size, y + size, score, class_id]
+
+
+def frame(*detections):
+    return np.array(detections, dtype=np.float32).reshape(-1, 6)
+
+
+def test_track_ids_follow_moving_objects():
+    tracker = SortTracker(max_age=5)
+    first = tracker.update(frame(detection(0, 0), detection(200, 200)))
+    assert first[:, 6].tolist() == [1, 2]
+
+    for step in range(1, 5):
+        out = tracker.update(frame(detection(200 + 5 * step, 200), detection(5 * step, 0)))
+        # Matched by overlap, not by position in the detection list
+        ids = {int(row[6]): row[0] for row in out}
+        assert set(ids) == {1, 2}
+        assert ids[1] < ids[2]
+
+
+def test_different_classes_get_different_tracks():
+    tracker = SortTracker()
+    tracker.update(frame(detection(0, 0, class_id=0)))
+    out = tracker.update(frame(detection(0, 0, class_id=1)))
+    assert sorted(out[:, 6].tolist()) == [1, 2]
+
+
+def test_predict_propagates_boxes_between_keyframes():
+    tracker = SortTracker(max_age=10)
+    for step in range(4):
+        tracker.update(frame(detection(10 * step, 0)))
+    predicted = tracker.predict()
+    assert predicted.shape == (1, 7)
+    assert predicted[0, 0] > 30
+
+
+def test_tracks_are_dropped_after_max_age_frames_without_detections():
+    tracker = SortTracker(max_age=3)
+    tracker.update(frame(detection(0, 0)))
+    for _ in range(3):
+        assert len(tracker.predict()) == 1
+    assert len(tracker.predict()) == 0
+    assert tracker.summary()[0]["track_id"] == 1
+
+    # A detection at the same place afterwards starts a new track
+    out = tracker.update(frame(detection(0, 0)))
+    assert out[:, 6].tolist() == [2]
+
+
+def test_min_hits_hides_new_tracks_until_confirmed():
+    tracker = SortTracker(min_hits=2)
+    tracker.update(frame(detection(0, 0)))
+    tracker.update(frame(detection(0, 0)))
+    assert len(tracker.update(frame(detection(0, 0), detection(300, 300)))) == 1
+    assert len(tracker.update(frame(detection(0, 0), detection(300, 300)))) == 2
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from video_pipeline import Stage, StagedPipeline
+
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
+
+
+def test_items_keep_their_order_through_every_stage():
+    results = []
+
+    # Uneven per-item work, a batching stage and a stage that drops items
+    def jitter(item):
+        if item % 7 == 0:
+            time.sleep(0.005)
+        return item
+
+    pipeline = StagedPipeline(range(50), [Stage("jitter", jitter),
+                                          Stage("double", lambda batch: [item * 2 for item in batch], batch_size=4),
+                                          Stage("odd_tens", lambda item: item if item % 10 else None),
+                                          Stage("sink", results.append)], queue_size=2)
+    pipeline.run()
+
+    assert results == [item * 2 for item in range(50) if item * 2 % 10]
+    stats = {stage["name"]: stage for stage in pipeline.stats()["stages"]}
+    assert stats["source"]["items"] == 50
+    assert stats["double"]["items"] == 50 and stats["double"]["mean_batch_size"] >= 1
+    assert stats["sink"]["items"] == len(results)
+
+
+def test_stage_error_reaches_the_caller_and_stops_the_other_threads():
+    closed = threading.Event()
+
+    # Endless source: only the failure can end the run
+    def frames():
+        try:
+            index = 0
+            while True:
+                yield index
+                index += 1
+        finally:
+            closed.set()
+
+    def detect(item):
+        if item == 5:
+            raise RuntimeError("inference failed")
+        return item
+
+    pipeline = StagedPipeline(frames(), [Stage("preprocess", lambda item: item), Stage("detect", detect),
+                                         Stage("sink", lambda item: None)], queue_size=2)
+
+    with pytest.raises(RuntimeError, match="inference failed"):
+        pipeline.run()
+
+    assert closed.is_set()
+    assert pipeline_threads() == []
+
+
+def test_full_queues_block_upstream_stages():
+    produced = []
+    release = threading.Event()
+
+    def frames():
+        for index in range(20):
+            produced.append(index)
+            yield index
+
+    def slow_sink(item):
+        release.wait()
+
+    pipeline = StagedPipeline(frames(), [Stage("sink", slow_sink)], queue_size=2)
+    runner = threading.Thread(target=pipeline.run)
+    runner.start()
+    time.sleep(0.3)
+
+    # One item in the sink, two queued and one the source is waiting to put
+    assert len(produced) <= 4
+    release.set()
+    runner.join(timeout=5)
+    assert not runner.is_alive()
+    assert len(produced) == 20
+
+
+def test_stats_report_occupancy_and_the_bottleneck():
+    pipeline = StagedPipeline(range(20), [Stage("fast", lambda item: item),
+                                          Stage("slow", lambda item: time.sleep(0.01))], queue_size=2)
+    assert pipeline.stats() == {"elapsed": 0.0, "bottleneck": None, "stages": []}
+
+    pipeline.run()
+
+    stats = pipeline.stats()
+    stages = {stage["name"]: stage for stage in stats["stages"]}
+    assert stats["bottleneck"] == "slow"
+    assert stages["slow"]["occupancy"] > 0.5
+    assert stages["slow"]["busy_seconds"] >= 0.2
+    # The stages upstream of the slow one spent their time waiting for room
+    assert stages["fast"]["blocked"] > stages["fast"]["occupancy"]
+    assert stages["slow"]["mean_queue_depth"] > 0
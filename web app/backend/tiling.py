@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+
+# Defaults for sliced inference on high-resolution images
+DEFAULT_TILE_SIZE = 640
+DEFAULT_TILE_OVERLAP = 0.2
+DEFAULT_TILE_NMS_THRESHOLD = 0.5
+
+
+# Start offsets along one axis so tiles overlap and the last tile ends on the border
+def _tile_starts(length, tile_size, stride):
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+# Tile rectangles (x1, y1, x2, y2) covering an image of the given size
+def tile_grid(height, width, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_TILE_OVERLAP):
+    tile_size = max(32, int(tile_size))
+    overlap = min(max(float(overlap), 0.0), 0.9)
+    stride = max(1, int(round(tile_size * (1.0 - overlap))))
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in _tile_starts(height, tile_size, stride)
+            for x in _tile_starts(width, tile_size, stride)]
+
+
+# Crop overlapping tiles from an image, returning the crops and their (x, y) offsets
+def make_tiles(img, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_TILE_OVERLAP):
+    h, w = img.shape[:2]
+    tiles = []
+    offsets = []
+    for x1, y1, x2, y2 in tile_grid(h, w, tile_size, overlap):
+        tiles.append(img[y1:y2, x1:x2])
+        offsets.append((x1, y1))
+    return tiles, offsets
+
+
+# Greedy per-class NMS on intersection over the smaller box, so a box cut off at
+# a tile edge is suppressed by the complete box from the neighbouring tile
+def cross_tile_nms(boxes, scores, classes, threshold=DEFAULT_TILE_NMS_THRESHOLD, max_wh=7680):
+    boxes = boxes + classes.astype(np.float32)[:, None] * max_wh
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        overlap = w * h / (np.minimum(areas[i], areas[rest]) + 1e-9)
+
+        order = rest[overlap <= threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+# Merge per-tile detections into original-image coordinates with cross-tile NMS
+def merge_tile_detections(tile_detections, offsets, nms_threshold=DEFAULT_TILE_NMS_THRESHOLD):
+    shifted = []
+    for detections, (x, y) in zip(tile_detections, offsets):
+        if len(detections):
+            detections = detections.copy()
+            detections[:, [0, 2]] += x
+            detections[:, [1, 3]] += y
+            shifted.append(detections)
+
+    if not shifted:
+        return np.zeros((0, 6), dtype=np.float32)
+
+    merged = np.concatenate(shifted).astype(np.float32)
+    keep = cross_tile_nms(merged[:, :4], merged[:, 4], merged[:, 5], nms_threshold)
+    return merged[keep]
+
+
+# Rows of x1, y1, x2, y2, score, class_id from one YOLO result
+def result_detections(result):
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    data = boxes.data
+    data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+    return np.concatenate([data[:, :4], data[:, -2:]], axis=1).astype(np.float32)
+
+
+# Single-pass detection as on /detect/image: squash to the input size, then map boxes back to the frame
+def detect_resized(model, img, conf_threshold, input_size=(640, 640)):
+    h, w = img.shape[:2]
+    results = model(cv2.resize(img, input_size, interpolation=cv2.INTER_LINEAR), conf=conf_threshold,
+                    imgsz=max(input_size), verbose=False)
+    detections = np.concatenate([result_detections(result) for result in results])
+    detections[:, [0, 2]] *= w / input_size[0]
+    detections[:, [1, 3]] *= h / input_size[1]
+    return detections
+
+
+# Sliced inference: all tiles (plus the whole image) in one batch, merged back to full-image boxes
+def detect_tiled(model, img, conf_threshold=0.25, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_TILE_OVERLAP,
+                 nms_threshold=DEFAULT_TILE_NMS_THRESHOLD, include_full_image=True):
+    """Detect on overlapping ``tile_size`` crops of the original-resolution image.
+
+    Small objects keep their native pixel size inside a tile instead of being
+    shrunk with the whole frame. With ``include_full_image`` the downscaled
+    full frame joins the same batch so objects larger than a tile are still
+    found. Boxes are returned in original-image coordinates. Every input,
+    the full frame included, runs at ``tile_size``, so tiles are not
+    resized and the model input matches what warm-up prepared.
+    """
+    tiles, offsets = make_tiles(img, tile_size, overlap)
+    if include_full_image and len(tiles) > 1:
+        tiles.append(img)
+        offsets.append((0, 0))
+
+    results = model(tiles, conf=conf_threshold, imgsz=int(tile_size), verbose=False)
+    detections = [result_detections(result) for result in results]
+    detections = merge_tile_detections(detections, offsets, nms_threshold)
+    return detections[detections[:, 4] >= conf_threshold]
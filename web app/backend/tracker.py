@@ -0,0 +1,185 @@
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+# Box conversions for the SORT state (center x, center y, area, aspect ratio)
+def xyxy_to_z(box):
+    w = max(float(box[2] - box[0]), 1e-3)
+    h = max(float(box[3] - box[1]), 1e-3)
+    return np.array([box[0] + w / 2, box[1] + h / 2, w * h, w / h], dtype=np.float64)
+
+
+def z_to_xyxy(z):
+    area = max(float(z[2]), 1e-6)
+    ratio = max(float(z[3]), 1e-6)
+    w = np.sqrt(area * ratio)
+    h = area / w
+    return np.array([z[0] - w / 2, z[1] - h / 2, z[0] + w / 2, z[1] + h / 2], dtype=np.float32)
+
+
+# Pairwise IoU between two sets of xyxy boxes
+def iou_matrix(a, b):
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+# Constant-velocity Kalman filter for one tracked box
+class Track:
+    """One object followed across frames, with a SORT-style Kalman filter.
+
+    State is ``[cx, cy, area, ratio, vx, vy, v_area]``; the aspect ratio is
+    assumed constant.
+    """
+
+    # Transition and measurement matrices shared by every track
+    F = np.eye(7)
+    F[0, 4] = F[1, 5] = F[2, 6] = 1.0
+    H = np.eye(4, 7)
+
+    def __init__(self, track_id, detection, frame_index):
+        self.id = track_id
+        self.class_id = int(detection[5])
+        self.score = float(detection[4])
+        self.max_score = self.score
+
+        self.x = np.zeros(7)
+        self.x[:4] = xyxy_to_z(detection)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.Q = np.diag([1.0, 1.0, 1.0, 1e-2, 1e-2, 1e-2, 1e-4])
+        self.R = np.diag([1.0, 1.0, 10.0, 10.0])
+
+        # Lifetime bookkeeping
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.last_detected = frame_index
+        self.hits = 1
+        self.frames_since_update = 0
+
+    def predict(self):
+        # Keep the area from going negative when it is shrinking fast
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        self.frames_since_update += 1
+        return self.box
+
+    def update(self, detection, frame_index):
+        z = xyxy_to_z(detection)
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+
+        self.score = float(detection[4])
+        self.max_score = max(self.max_score, self.score)
+        self.last_detected = frame_index
+        self.hits += 1
+        self.frames_since_update = 0
+
+    @property
+    def box(self):
+        return z_to_xyxy(self.x[:4])
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "track_id": self.id,
+            "class_id": self.class_id,
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "frames": self.last_frame - self.first_frame + 1,
+            "hits": self.hits,
+            "max_score": self.max_score,
+        }
+
+
+# SORT-style multi-object tracker: detect on keyframes, predict in between
+class SortTracker:
+    """Follow detections across frames so detection only has to run on keyframes.
+
+    Call :meth:`update` with the detections of a keyframe and :meth:`predict`
+    on every frame in between. Both return ``[N, 7]`` rows of
+    ``x1, y1, x2, y2, score, class_id, track_id`` for the live tracks.
+    A track is dropped once it has gone ``max_age`` frames without a
+    matching detection, and is only reported after ``min_hits`` detections
+    (unless it was just created on the first keyframes).
+    """
+
+    def __init__(self, max_age: int = 30, min_hits: int = 1, iou_threshold: float = 0.3):
+        self.max_age = max(1, int(max_age))
+        self.min_hits = max(1, int(min_hits))
+        self.iou_threshold = float(iou_threshold)
+        self.tracks: List[Track] = []
+        self.finished: List[Track] = []
+        self.frame_index = -1
+        self._next_id = 1
+
+    def _advance(self):
+        self.frame_index += 1
+        for track in self.tracks:
+            track.predict()
+
+    def _expire(self):
+        alive = []
+        for track in self.tracks:
+            if track.frames_since_update > self.max_age:
+                self.finished.append(track)
+            else:
+                alive.append(track)
+        self.tracks = alive
+
+    def _output(self):
+        rows = []
+        for track in self.tracks:
+            if track.hits >= self.min_hits or self.frame_index < self.min_hits:
+                track.last_frame = self.frame_index
+                rows.append([*track.box, track.score, track.class_id, track.id])
+        return np.asarray(rows, dtype=np.float32).reshape(-1, 7)
+
+    def predict(self):
+        """Advance one frame without detections and return the propagated boxes"""
+        self._advance()
+        self._expire()
+        return self._output()
+
+    def update(self, detections):
+        """Advance one frame and correct the tracks with a keyframe's [N, 6] detections"""
+        self._advance()
+
+        # Greedy IoU association between predicted tracks and detections of the same class
+        track_boxes = np.array([track.box for track in self.tracks], dtype=np.float32).reshape(-1, 4)
+        ious = iou_matrix(track_boxes, detections[:, :4])
+        if ious.size:
+            same_class = (np.array([track.class_id for track in self.tracks])[:, None]
+                          == detections[None, :, 5].astype(np.int64))
+            ious = np.where(same_class, ious, 0.0)
+
+        unmatched = set(range(len(detections)))
+        while ious.size and ious.max() >= self.iou_threshold:
+            t, d = np.unravel_index(ious.argmax(), ious.shape)
+            self.tracks[t].update(detections[d], self.frame_index)
+            unmatched.discard(d)
+            ious[t, :] = 0.0
+            ious[:, d] = 0.0
+
+        # Unmatched detections start new tracks
+        for d in sorted(unmatched):
+            self.tracks.append(Track(self._next_id, detections[d], self.frame_index))
+            self._next_id += 1
+
+        self._expire()
+        return self._output()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Lifetime of every track seen so far, finished ones first"""
+        return [track.summary() for track in self.finished + self.tracks if track.hits >= self.min_hits]
@@ -0,0 +1,203 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Marks the end of the stream on a stage queue
+_END = object()
+
+
+class _Stopped(Exception):
+    """Raised inside a stage thread when another stage failed or the pipeline was stopped"""
+
+
+# One step of a StagedPipeline and its timing counters
+class Stage:
+    """A pipeline step running on its own thread.
+
+    ``fn(item)`` returns the item handed to the next stage, or None to drop
+    it. With ``batch_size`` above 1, ``fn`` receives a list of up to that many
+    items that were already waiting (it never waits for a batch to fill) and
+    returns a list.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], batch_size: int = 1):
+        self.name = name
+        self.fn = fn
+        self.batch_size = max(1, int(batch_size))
+
+        # Seconds spent working, waiting for input and waiting for room downstream
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.items = 0
+        self.calls = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "items": self.items,
+            "mean_batch_size": self.items / self.calls if self.calls else 0.0,
+            "busy_seconds": self.busy,
+            "occupancy": self.busy / elapsed if elapsed > 0 else 0.0,
+            "starved": self.starved / elapsed if elapsed > 0 else 0.0,
+            "blocked": self.blocked / elapsed if elapsed > 0 else 0.0,
+            "mean_queue_depth": self._depth_total / self._depth_samples if self._depth_samples else 0.0,
+        }
+
+
+# Producer/consumer chain with bounded queues between the steps
+class StagedPipeline:
+    """Run ``source`` and each stage on its own thread, connected by queues of ``queue_size`` items.
+
+    Items keep their order through every stage. A full queue blocks the
+    stage feeding it, so memory stays bounded and the throughput is set by
+    the slowest stage instead of the sum of all of them. The stage with the
+    highest occupancy (share of wall time spent working) is the bottleneck.
+    An exception in any stage stops the others and is re-raised by
+    :meth:`run`.
+    """
+
+    def __init__(self, source: Iterable[Any], stages: List[Stage], queue_size: int = 8, source_name: str = "source"):
+        self.source = source
+        self.source_stage = Stage(source_name, None)
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=max(1, int(queue_size))) for _ in stages]
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+        self._started = None
+        self._finished = None
+
+    def stop(self):
+        self._stop.set()
+
+    def _fail(self, error: BaseException):
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _put(self, stage: Stage, outbox: queue.Queue, item):
+        start = time.perf_counter()
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise _Stopped()
+                try:
+                    outbox.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        finally:
+            stage.blocked += time.perf_counter() - start
+
+    def _get(self, stage: Stage, inbox: queue.Queue):
+        start = time.perf_counter()
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise _Stopped()
+                try:
+                    item = inbox.get(timeout=0.1)
+                    stage._depth_total += inbox.qsize()
+                    stage._depth_samples += 1
+                    return item
+                except queue.Empty:
+                    pass
+        finally:
+            stage.starved += time.perf_counter() - start
+
+    def _run_source(self):
+        stage = self.source_stage
+        iterator = iter(self.source)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    stage.busy += time.perf_counter() - start
+                stage.items += 1
+                stage.calls += 1
+                self._put(stage, self.queues[0], item)
+            self._put(stage, self.queues[0], _END)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def _run_stage(self, index: int):
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+
+        ended = False
+        while not ended:
+            # Batching stages take whatever is already queued, up to their batch size
+            batch = []
+            item = self._get(stage, inbox)
+            while item is not _END:
+                batch.append(item)
+                if len(batch) >= stage.batch_size:
+                    break
+                try:
+                    item = inbox.get_nowait()
+                except queue.Empty:
+                    break
+            ended = item is _END
+
+            if batch:
+                start = time.perf_counter()
+                results = stage.fn(batch) if stage.batch_size > 1 else [stage.fn(batch[0])]
+                stage.busy += time.perf_counter() - start
+                stage.items += len(batch)
+                stage.calls += 1
+                if outbox is not None:
+                    for result in results:
+                        if result is not None:
+                            self._put(stage, outbox, result)
+
+        if outbox is not None:
+            self._put(stage, outbox, _END)
+
+    def _guard(self, target, *args):
+        try:
+            target(*args)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def run(self):
+        """Run the pipeline to the end of the source (blocking)"""
+        self._started = time.perf_counter()
+        threads = [threading.Thread(target=self._guard, args=(self._run_source,),
+                                    name=f"pipeline-{self.source_stage.name}", daemon=True)]
+        threads += [threading.Thread(target=self._guard, args=(self._run_stage, index),
+                                     name=f"pipeline-{stage.name}", daemon=True)
+                    for index, stage in enumerate(self.stages)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._finished = time.perf_counter()
+
+        if self._error is not None:
+            raise self._error
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage occupancy and queue depth; safe to call from any stage while running"""
+        if self._started is None:
+            return {"elapsed": 0.0, "bottleneck": None, "stages": []}
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        stages = [stage.summary(elapsed) for stage in [self.source_stage] + self.stages]
+        return {
+            "elapsed": elapsed,
+            "bottleneck": max(stages, key=lambda stage: stage["occupancy"])["name"],
+            "stages": stages,
+        }
@@ -192,17 +192,27 @@ export default function DetectionHistory() {
 
             <CardContent className="space-y-3">
               {/* Detection Image */}
-              {detection.image_path && (
-                <div className="aspect-video bg-gray-800 rounded-lg overflow-hidden">
+              {/* Thumbnail in the card; the full image is only fetched when opened */}
+              {(detection.image_path || detection.image_url) && (
+                <a
+                  href={`http://localhost:8000/image/${detection.id}`}
+                  target="_blank"
+                  rel="noopener noreferrer"
+                  className="block aspect-video bg-gray-800 rounded-lg overflow-hidden"
+                >
                   <img
-                    src={`http://localhost:8000/image/${detection.id}`}
+                    src={
+                      detection.thumbnail_base64
+                        ? `data:image/jpeg;base64,${detection.thumbnail_base64}`
+                        : `http://localhost:8000/image/${detection.id}?variant=thumbnail`
+                    }
                     alt="Detection result"
                     className="w-full h-full object-cover"
                     onError={(e) => {
                       e.currentTarget.style.display = "none"
                     }}
                   />
-                </div>
+                </a>
               )}
 
               {/* Detection Details */}
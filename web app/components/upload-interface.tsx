@@ -27,16 +27,25 @@ export default function UploadInterface() {
       setResult(null)
 
       try {
-        const formData = new FormData()
-        formData.append("file", file)
-        formData.append("conf_threshold", confidence[0].toString())
-
-        const endpoint = file.type.startsWith("image/") ? "/detect/image" : "/detect/video/upload"
-
-        const response = await fetch(`http://localhost:8000${endpoint}`, {
-          method: "POST",
-          body: formData,
-        })
+        let response: Response
+        if (file.type.startsWith("image/")) {
+          const formData = new FormData()
+          formData.append("file", file)
+          formData.append("conf_threshold", confidence[0].toString())
+
+          response = await fetch("http://localhost:8000/detect/image", {
+            method: "POST",
+            body: formData,
+          })
+        } else {
+          // Videos go as the raw request body, so the server writes them to disk as they arrive
+          const params = new URLSearchParams({ conf_threshold: confidence[0].toString() })
+          response = await fetch(`http://localhost:8000/detect/video/stream?${params}`, {
+            method: "POST",
+            headers: { "Content-Type": file.type || "video/mp4" },
+            body: file,
+          })
+        }
 
         if (!response.ok) {
           throw new Error(`Upload failed: ${response.statusText}`)
@@ -10,6 +10,26 @@ import { Alert, AlertDescription } from "@/components/ui/alert"
 import { Camera, Square, Play, AlertTriangle, Settings } from "lucide-react"
 import { useDetectionStore } from "@/store/detection-store"
 
+const FRAME_SOCKET_URL = "ws://localhost:8000/ws/frames"
+const STREAM_ID = "webcam"
+
+// Binary frame message for /ws/frames: 20-byte big-endian header (version, flags, stream id length,
+// capture timestamp, confidence threshold, sequence number), the stream id, then the JPEG bytes
+const packFrame = (jpeg: ArrayBuffer, confThreshold: number, seq: number) => {
+  const streamId = new TextEncoder().encode(STREAM_ID)
+  const message = new Uint8Array(20 + streamId.length + jpeg.byteLength)
+  const header = new DataView(message.buffer)
+  header.setUint8(0, 1)
+  header.setUint8(1, 0)
+  header.setUint16(2, streamId.length)
+  header.setFloat64(4, Date.now() / 1000)
+  header.setFloat32(12, confThreshold)
+  header.setUint32(16, seq)
+  message.set(streamId, 20)
+  message.set(new Uint8Array(jpeg), 20 + streamId.length)
+  return message.buffer
+}
+
 export default function WebcamDetection() {
   const [isStreaming, setIsStreaming] = useState(false)
   const [confidence, setConfidence] = useState([0.25])
@@ -22,6 +42,9 @@ export default function WebcamDetection() {
   const streamRef = useRef<MediaStream | null>(null)
   const intervalRef = useRef<NodeJS.Timeout | null>(null)
   const fpsCounterRef = useRef({ frames: 0, lastTime: Date.now() })
+  const socketRef = useRef<WebSocket | null>(null)
+  const classNamesRef = useRef<Record<number, string>>({})
+  const seqRef = useRef(0)
 
   const { addDetection } = useDetectionStore()
 
@@ -37,6 +60,9 @@ export default function WebcamDetection() {
         streamRef.current = stream
         setIsStreaming(true)
 
+        // Frames go to the backend over one WebSocket; results come back on the same socket
+        openFrameSocket()
+
         // Start detection loop
         intervalRef.current = setInterval(processFrame, 200) // 5 FPS
       }
@@ -57,6 +83,11 @@ export default function WebcamDetection() {
       intervalRef.current = null
     }
 
+    if (socketRef.current) {
+      socketRef.current.close()
+      socketRef.current = null
+    }
+
     if (videoRef.current) {
       videoRef.current.srcObject = null
     }
@@ -66,14 +97,77 @@ export default function WebcamDetection() {
     setFps(0)
   }
 
+  const handleFrameResult = (result: any) => {
+    const classNames = classNamesRef.current
+    const detections = (result.boxes || []).map(([x1, y1, x2, y2, confidence, classId]: number[]) => ({
+      x1,
+      y1,
+      x2,
+      y2,
+      confidence,
+      class_id: classId,
+      class_name: classNames[classId] ?? `Class ${classId}`,
+    }))
+    setCurrentDetections(detections)
+
+    // Update FPS counter
+    const now = Date.now()
+    fpsCounterRef.current.frames++
+    if (now - fpsCounterRef.current.lastTime >= 1000) {
+      setFps(fpsCounterRef.current.frames)
+      fpsCounterRef.current.frames = 0
+      fpsCounterRef.current.lastTime = now
+    }
+
+    // Add to history if weapons detected
+    if (result.weapon_count > 0 && !result.reused_result) {
+      addDetection({
+        id: `webcam-${Date.now()}`,
+        timestamp: new Date().toISOString(),
+        source_type: "Webcam",
+        weapon_count: result.weapon_count,
+        confidence_scores: detections.map((d: any) => d.confidence),
+        processing_time: result.processing_time,
+        class_names: detections.map((d: any) => d.class_name),
+      })
+    }
+  }
+
+  const openFrameSocket = () => {
+    const socket = new WebSocket(FRAME_SOCKET_URL)
+    socket.binaryType = "arraybuffer"
+
+    socket.onmessage = (event) => {
+      try {
+        const message = JSON.parse(event.data)
+        if (message.type === "ready") {
+          classNamesRef.current = message.class_names || {}
+        } else if (message.type === "detections") {
+          handleFrameResult(message)
+        } else if (message.type === "error") {
+          console.error("Frame processing error:", message.message)
+        }
+      } catch (err) {
+        console.error("Frame socket message error:", err)
+      }
+    }
+
+    socket.onerror = () => {
+      setError("Lost connection to the detection server.")
+    }
+
+    socketRef.current = socket
+  }
+
   const processFrame = useCallback(async () => {
-    if (!videoRef.current || !canvasRef.current || !isStreaming) return
+    if (!videoRef.current || !canvasRef.current) return
 
     const video = videoRef.current
     const canvas = canvasRef.current
+    const socket = socketRef.current
     const ctx = canvas.getContext("2d")
 
-    if (!ctx || video.readyState !== 4) return
+    if (!ctx || video.readyState !== 4 || !socket || socket.readyState !== WebSocket.OPEN) return
 
     // Set canvas size to match video
     canvas.width = video.videoWidth
@@ -82,47 +176,14 @@ export default function WebcamDetection() {
     // Draw current frame
     ctx.drawImage(video, 0, 0)
 
-    // Convert to blob and send to API
+    // Convert to JPEG and send it as one binary message; the server keeps only the newest waiting frame
     canvas.toBlob(
       async (blob) => {
-        if (!blob) return
+        if (!blob || socket.readyState !== WebSocket.OPEN) return
 
         try {
-          const formData = new FormData()
-          formData.append("file", blob, "frame.jpg")
-          formData.append("conf_threshold", confidence[0].toString())
-
-          const response = await fetch("http://localhost:8000/detect/frame", {
-            method: "POST",
-            body: formData,
-          })
-
-          if (response.ok) {
-            const result = await response.json()
-            setCurrentDetections(result.detections || [])
-
-            // Update FPS counter
-            const now = Date.now()
-            fpsCounterRef.current.frames++
-            if (now - fpsCounterRef.current.lastTime >= 1000) {
-              setFps(fpsCounterRef.current.frames)
-              fpsCounterRef.current.frames = 0
-              fpsCounterRef.current.lastTime = now
-            }
-
-            // Add to history if weapons detected
-            if (result.weapon_count > 0) {
-              addDetection({
-                id: `webcam-${Date.now()}`,
-                timestamp: new Date().toISOString(),
-                source_type: "Webcam",
-                weapon_count: result.weapon_count,
-                confidence_scores: result.detections.map((d: any) => d.confidence),
-                processing_time: result.processing_time,
-                class_names: result.detections.map((d: any) => d.class_name),
-              })
-            }
-          }
+          seqRef.current = (seqRef.current + 1) % 0x100000000
+          socket.send(packFrame(await blob.arrayBuffer(), confidence[0], seqRef.current))
         } catch (err) {
           console.error("Frame processing error:", err)
         }
@@ -130,7 +191,7 @@ export default function WebcamDetection() {
       "image/jpeg",
       0.8,
     )
-  }, [confidence, isStreaming, addDetection])
+  }, [confidence])
 
   useEffect(() => {
     return () => {
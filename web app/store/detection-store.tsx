@@ -11,6 +11,9 @@ interface Detection {
   confidence_scores: number[]
   processing_time: number
   image_path?: string
+  image_url?: string
+  thumbnail_url?: string
+  thumbnail_base64?: string
   class_names: string[]
 }
 
@@ -205,7 +208,8 @@ export const useDetectionStore = create<DetectionStore>()(
     {
       name: "detection-store",
       partialize: (state) => ({
-        detections: state.detections.slice(0, 100), // Keep only last 100 detections in storage
+        // Keep only last 100 detections in storage, without the live thumbnails (the server still has them)
+        detections: state.detections.slice(0, 100).map(({ thumbnail_base64, ...detection }) => detection),
       }),
     },
   ),